@@ -6,11 +6,16 @@ from collections import defaultdict
 from typing import Any, Dict, List, Optional, Tuple
 
 import pdfplumber
-from core.ai_engine.config import get_vectorstore
+from core.ai_engine import schedule_store
+from core.ai_engine.pdf_pages import iter_page_artifacts, table_preview_rows
+from core.ai_engine.shared_docs import label_shared_docs, user_visibility_filter
+from core.ai_engine.retrieval.main import dense_vectorstores
 from core.ai_engine.retrieval.llm import (
+    HedgedInvokeError,
     build_llm,
     get_backup_models,
     get_runtime_openrouter_config,
+    invoke_hedged,
     invoke_text,
 )
 from core.models import AcademicDocument
@@ -209,33 +214,41 @@ def _detect_pdf_table_fields(docs: List[AcademicDocument]) -> Tuple[List[str], D
         file_name = str(getattr(doc.file, "name", "") or "")
         if not file_name.lower().endswith(".pdf"):
             continue
-        try:
-            file_path = doc.file.path
-        except Exception:
-            continue
-        try:
-            with pdfplumber.open(file_path) as pdf:
-                for page in pdf.pages[:2]:
-                    tables = page.extract_tables() or []
-                    for tb in tables[:5]:
-                        if not tb:
-                            continue
-                        rows = [[str(c or "").strip() for c in row] for row in tb if row]
-                        for row in rows[:2]:
-                            row_text = " | ".join([c for c in row if c])
-                            if not row_text:
-                                continue
-                            row_low = _norm(row_text)
-                            for canon, aliases in TABLE_FIELD_ALIASES.items():
-                                if any(_norm(alias) in row_low for alias in aliases):
-                                    fields.add(canon)
-                                    if len(evidence[canon]) < 3:
-                                        evidence[canon].append(f"pdf:{doc.title}: {row_text[:180]}")
-        except Exception:
-            continue
+        # preview header tabel disimpan saat ingest -> tidak perlu parsing PDF lagi
+        rows = list(getattr(doc, "pdf_table_preview", None) or [])
+        if not rows:
+            try:
+                file_path = doc.file.path
+            except Exception:
+                continue
+            try:
+                with pdfplumber.open(file_path) as pdf:
+                    rows = table_preview_rows(list(iter_page_artifacts(pdf, max_pages=2)))
+            except Exception:
+                continue
+
+        for row in rows:
+            row_text = " | ".join([str(c or "").strip() for c in row if str(c or "").strip()])
+            if not row_text:
+                continue
+            row_low = _norm(row_text)
+            for canon, aliases in TABLE_FIELD_ALIASES.items():
+                if any(_norm(alias) in row_low for alias in aliases):
+                    fields.add(canon)
+                    if len(evidence[canon]) < 3:
+                        evidence[canon].append(f"pdf:{doc.title}: {row_text[:180]}")
     return sorted(fields), dict(evidence)
 
 
+def _detect_schedule_table_fields(user) -> Tuple[List[str], Dict[str, List[str]]]:
+    # baris jadwal terstruktur (tabel ScheduleRow) hasil ingest; tanpa vector search
+    try:
+        fields = schedule_store.detected_fields(user.id)
+    except Exception:
+        return [], {}
+    return fields, {f: [f"schedule_table: kolom {f} terisi"] for f in fields}
+
+
 def _extract_json_object(text: str) -> Dict[str, Any]:
     if not text:
         return {}
@@ -285,17 +298,16 @@ def _llm_profile_fallback(texts: List[Tuple[str, str]]) -> Dict[str, Any]:
     )
 
     backup_models = get_backup_models(str(runtime_cfg.get("model") or ""), runtime_cfg.get("backup_models"))
-    for model_name in backup_models:
-        try:
-            llm = build_llm(model_name, runtime_cfg)
-            raw = invoke_text(llm, prompt)
-            obj = _extract_json_object(raw)
-            if obj:
-                obj["model"] = model_name
-                return obj
-        except Exception:
-            continue
-    return {}
+
+    def _call(model_name: str) -> Dict[str, Any]:
+        return _extract_json_object(invoke_text(build_llm(model_name, runtime_cfg), prompt))
+
+    try:
+        model_name, _, obj = invoke_hedged(backup_models, _call, cfg=runtime_cfg, label="profile LLM")
+    except HedgedInvokeError:
+        return {}
+    obj["model"] = model_name
+    return obj
 
 
 def _build_dynamic_questions(
@@ -391,12 +403,16 @@ def _gather_texts(user) -> Tuple[List[Tuple[str, str]], List[str], List[Academic
             texts.append((f"title:{t}", t))
 
     try:
-        vectorstore = get_vectorstore()
-        chunks = vectorstore.similarity_search(
-            "program studi prodi jurusan semester target karir career pekerjaan",
-            k=25,
-            filter={"user_id": str(user.id)},
-        )
+        chunks = []
+        for vectorstore in dense_vectorstores(user.id):
+            chunks.extend(
+                vectorstore.similarity_search(
+                    "program studi prodi jurusan semester target karir career pekerjaan",
+                    k=25,
+                    filter=user_visibility_filter(user.id),
+                )
+            )
+        label_shared_docs(user.id, chunks)
         for c in chunks:
             content = str(getattr(c, "page_content", "") or "").strip()
             if not content:
@@ -441,7 +457,10 @@ def extract_profile_hints(user) -> Dict[str, Any]:
 
     text_table_fields, text_table_evidence = _detect_table_fields_from_texts(texts)
     pdf_table_fields, pdf_table_evidence = _detect_pdf_table_fields(docs)
-    detected_fields = sorted(set(text_table_fields) | set(pdf_table_fields))
+    schedule_fields, schedule_evidence = _detect_schedule_table_fields(user)
+    for k, ev in schedule_evidence.items():
+        pdf_table_evidence[k] = list(dict.fromkeys((pdf_table_evidence.get(k) or []) + ev))[:3]
+    detected_fields = sorted(set(text_table_fields) | set(pdf_table_fields) | set(schedule_fields))
 
     max_major = max(major_scores.values(), default=0.0)
     max_career = max(career_scores.values(), default=0.0)
@@ -17,6 +17,7 @@ from .models import (
     AcademicDocument,
     ChatHistory,
     ChatSession,
+    IngestionJob,
     PlannerHistory,
     UserQuota,
     LLMConfiguration,
@@ -24,6 +25,8 @@ from .models import (
     UserLoginPresence,
 )
 from .presence import build_presence_summary, cleanup_stale_presence
+from .ai_engine.retrieval import model_health
+from .ai_engine.retrieval.llm import get_runtime_openrouter_config
 from .system_settings import get_concurrent_limit_state, get_maintenance_state, get_registration_limit_state
 
 audit_logger = logging.getLogger("audit")
@@ -111,6 +114,27 @@ class PlannerHistoryAdmin(admin.ModelAdmin):
     short_text.short_description = "Summary"
 
 
+@admin.register(IngestionJob)
+class IngestionJobAdmin(admin.ModelAdmin):
+    list_display = ("id", "user", "filename", "kind", "status", "progress", "stage", "attempts", "created_at", "finished_at")
+    list_filter = ("status", "kind", "created_at")
+    search_fields = ("user__username", "filename", "error")
+    readonly_fields = (
+        "user",
+        "document",
+        "filename",
+        "kind",
+        "progress",
+        "stage",
+        "error",
+        "attempts",
+        "worker",
+        "created_at",
+        "started_at",
+        "finished_at",
+    )
+
+
 @admin.register(UserQuota)
 class UserQuotaAdmin(admin.ModelAdmin):
     list_display = ("user", "quota_bytes", "updated_at")
@@ -389,6 +413,23 @@ def _build_single_log_payload(log_type: str, lines: int = 300) -> dict:
     }
 
 
+def _build_llm_health_rows() -> list[dict]:
+    """
+    Scoreboard model LLM: model dari konfigurasi aktif (urutan prioritas) + model lain
+    yang pernah tercatat.
+    """
+    try:
+        cfg = get_runtime_openrouter_config()
+        names = [str(cfg.get("model") or "").strip()] + list(cfg.get("backup_models") or [])
+    except Exception:
+        names = []
+    seen: list[str] = []
+    for name in names + [row["model"] for row in model_health.get_scoreboard()]:
+        if name and name not in seen:
+            seen.append(name)
+    return model_health.get_scoreboard(seen)
+
+
 def _build_dashboard_metrics() -> dict:
     User = get_user_model()
     cleanup_stale_presence()
@@ -411,6 +452,8 @@ def _build_dashboard_metrics() -> dict:
     concurrent_limit = get_concurrent_limit_state()
     presence = build_presence_summary(limit=100)
 
+    llm_health = _build_llm_health_rows()
+
     reg_limit = max(registration_limit.max_registered_users, 1)
     conc_limit = max(concurrent_limit.max_concurrent_logins, 1)
 
@@ -451,6 +494,8 @@ def _build_dashboard_metrics() -> dict:
         "kpi_concurrent_capacity_status": _cap_status(conc_pct),
         "kpi_online_users": presence.online_users,
         "kpi_recent_registered_users": presence.recent_registered_users,
+        "kpi_llm_health": llm_health,
+        "kpi_llm_open_circuits": sum(1 for row in llm_health if row.get("state") == model_health.STATE_OPEN),
     }
 
 
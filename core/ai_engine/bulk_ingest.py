@@ -0,0 +1,219 @@
+# core/ai_engine/bulk_ingest.py
+"""
+Bulk reingest banyak dokumen sekaligus (mis. 1 angkatan setelah upgrade parser).
+
+Reingest per dokumen = 1 delete + 1 parse + 1 add_texts + 1 save, masing-masing
+transaksi Chroma / DB terpisah. Di sini:
+1. parse + chunking jalan paralel (thread pool, RAG_BULK_REINGEST_WORKERS; default 1 di SQLite)
+2. per user: vector lama seluruh set dokumen dihapus / di-diff dalam 1 operasi batch,
+   chunk baru di-embed + ditulis per batch besar (RAG_BULK_EMBED_BATCH_SIZE)
+3. is_embedded / ingest_status diperbarui dengan 1 bulk_update
+Progress dilaporkan lewat callback (stdout reingest_docs) dan kolom ingest_progress
+dokumen (dibaca API daftar dokumen).
+"""
+from __future__ import annotations
+
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+from django.db import connections
+
+from ..models import AcademicDocument
+from .config import collection_for_user, get_vectorstore
+from .corpus import bump_corpus_version
+from .ingest import _log_upsert, _store_prepared, index_sparse_chunks, prepare_document
+from .vector_ops import delete_vectors_for_docs, embed_batch_size, incremental_reingest_enabled, upsert_doc_chunks
+
+logger = logging.getLogger(__name__)
+
+# progress(stage, done, total, detail)
+BulkProgress = Callable[[str, int, int, str], None]
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.environ.get(name, str(default)))
+    except Exception:
+        return int(default)
+
+
+def bulk_workers() -> int:
+    # parse menulis ke DB (content_hash, ScheduleRow, extraction cache); SQLite hanya
+    # mengizinkan 1 penulis -> default 1 worker kecuali diset eksplisit
+    default = 1 if connections["default"].vendor == "sqlite" else min(4, os.cpu_count() or 1)
+    return max(1, _env_int("RAG_BULK_REINGEST_WORKERS", default))
+
+
+def bulk_batch_size() -> int:
+    return max(embed_batch_size(), _env_int("RAG_BULK_EMBED_BATCH_SIZE", 256))
+
+
+def _report(progress: Optional[BulkProgress], stage: str, done: int, total: int, detail: str = "") -> None:
+    if progress is None:
+        return
+    try:
+        progress(stage, done, total, detail)
+    except Exception as e:
+        # progress hanya informatif; jangan gagalkan reingest
+        logger.debug(" bulk progress callback gagal: %s", e)
+
+
+def _prepare_in_thread(doc, use_extraction_cache: bool) -> Optional[Dict[str, Any]]:
+    try:
+        return prepare_document(doc, use_extraction_cache=use_extraction_cache)
+    finally:
+        # koneksi DB milik thread pool ditutup agar tidak bocor
+        connections.close_all()
+
+
+def _parse_all(
+    docs: List[Any],
+    workers: int,
+    use_extraction_cache: bool,
+    progress: Optional[BulkProgress],
+) -> Dict[int, Optional[Dict[str, Any]]]:
+    total = len(docs)
+    prepared: Dict[int, Optional[Dict[str, Any]]] = {}
+
+    def _done(doc, result) -> None:
+        prepared[doc.id] = result
+        status = "ok" if result else "gagal"
+        if result:
+            AcademicDocument.objects.filter(id=doc.id).update(ingest_progress=50)
+        _report(progress, "parse", len(prepared), total, f"doc_id={doc.id} title='{doc.title}' {status}")
+
+    if workers <= 1 or total <= 1:
+        for doc in docs:
+            _done(doc, prepare_document(doc, use_extraction_cache=use_extraction_cache))
+        return prepared
+
+    with ThreadPoolExecutor(max_workers=min(workers, total), thread_name_prefix="bulk-reingest") as pool:
+        futures = {pool.submit(_prepare_in_thread, doc, use_extraction_cache): doc for doc in docs}
+        for fut in as_completed(futures):
+            doc = futures[fut]
+            try:
+                result = fut.result()
+            except Exception as e:
+                logger.error(" BULK REINGEST parse gagal doc_id=%s err=%r", doc.id, e)
+                result = None
+            _done(doc, result)
+    return prepared
+
+
+def _store_user_docs(user_id: Any, items: List[Dict[str, Any]], batch_size: int) -> Dict[str, int]:
+    """1 set dokumen milik 1 user -> 1 diff/delete batch + add_texts per batch besar."""
+    doc_ids = [str(p["doc"].id) for p in items]
+    if not incremental_reingest_enabled():
+        delete_vectors_for_docs(
+            user_id=str(user_id),
+            doc_ids=doc_ids,
+            sources=[getattr(p["doc"], "title", "") for p in items],
+        )
+
+    ids: List[str] = []
+    texts: List[str] = []
+    metadatas: List[Dict[str, Any]] = []
+    for p in items:
+        ids.extend(p["ids"])
+        texts.extend(p["chunks"])
+        metadatas.extend(p["metadatas"])
+
+    stats = upsert_doc_chunks(
+        get_vectorstore(collection_for_user(user_id)),
+        where={"$and": [{"user_id": str(user_id)}, {"doc_id": {"$in": doc_ids}}]},
+        ids=ids,
+        texts=texts,
+        metadatas=metadatas,
+        batch_size=batch_size,
+    )
+    _log_upsert(f"bulk user_id={user_id} docs={len(items)}", stats)
+    for p in items:
+        index_sparse_chunks(p)
+    bump_corpus_version(user_id)
+    return stats
+
+
+def reingest_documents(
+    docs: Sequence[Any],
+    use_extraction_cache: bool = True,
+    workers: Optional[int] = None,
+    progress: Optional[BulkProgress] = None,
+) -> Dict[str, Any]:
+    """
+    Reingest banyak AcademicDocument sekaligus.
+    Return {"total", "ok_ids", "failed_ids", "added", "deleted", "kept", "elapsed_ms"}.
+    Dokumen yang gagal parse tidak disentuh vector lamanya.
+    """
+    t0 = time.time()
+    docs = list(docs)
+    total = len(docs)
+    result: Dict[str, Any] = {"total": total, "ok_ids": [], "failed_ids": [], "added": 0, "deleted": 0, "kept": 0}
+    if not docs:
+        result["elapsed_ms"] = 0
+        return result
+
+    AcademicDocument.objects.filter(id__in=[d.id for d in docs]).update(
+        ingest_status=AcademicDocument.INGEST_PROCESSING,
+        ingest_progress=0,
+    )
+
+    # 1) parse + chunking paralel
+    prepared = _parse_all(docs, workers or bulk_workers(), use_extraction_cache, progress)
+
+    # 2) tulis vector: chunk bersama per dokumen (dedup per hash), chunk per user 1 set sekaligus
+    ok_ids: set = set()
+    by_user: Dict[Any, List[Dict[str, Any]]] = {}
+    for doc in docs:
+        p = prepared.get(doc.id)
+        if not p:
+            continue
+        if p["shared"]:
+            try:
+                _store_prepared(p)
+                ok_ids.add(doc.id)
+            except Exception as e:
+                logger.error(" BULK REINGEST simpan gagal doc_id=%s err=%r", doc.id, e)
+        else:
+            by_user.setdefault(doc.user_id, []).append(p)
+
+    batch_size = bulk_batch_size()
+    for user_id, items in by_user.items():
+        _report(progress, "embedding", len(ok_ids), total, f"user_id={user_id} docs={len(items)}")
+        try:
+            stats = _store_user_docs(user_id, items, batch_size)
+        except Exception as e:
+            logger.error(" BULK REINGEST simpan gagal user_id=%s docs=%s err=%r", user_id, len(items), e)
+            continue
+        for key in ("added", "deleted", "kept"):
+            result[key] += int(stats.get(key, 0))
+        ok_ids.update(p["doc"].id for p in items)
+
+    # 3) status dokumen: 1 bulk_update
+    for doc in docs:
+        if doc.id in ok_ids:
+            doc.is_embedded = True
+            doc.ingest_status = AcademicDocument.INGEST_READY
+            doc.ingest_progress = 100
+        else:
+            doc.ingest_status = AcademicDocument.INGEST_FAILED
+            doc.ingest_progress = 0
+    AcademicDocument.objects.bulk_update(docs, ["is_embedded", "ingest_status", "ingest_progress"], batch_size=500)
+
+    result["ok_ids"] = [d.id for d in docs if d.id in ok_ids]
+    result["failed_ids"] = [d.id for d in docs if d.id not in ok_ids]
+    result["elapsed_ms"] = int((time.time() - t0) * 1000)
+    _report(progress, "done", len(ok_ids), total, f"ok={len(ok_ids)} gagal={total - len(ok_ids)}")
+    logger.info(
+        " BULK REINGEST selesai docs=%s ok=%s failed=%s added=%s deleted=%s kept=%s ms=%s",
+        total,
+        len(result["ok_ids"]),
+        len(result["failed_ids"]),
+        result["added"],
+        result["deleted"],
+        result["kept"],
+        result["elapsed_ms"],
+    )
+    return result
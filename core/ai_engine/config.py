@@ -1,6 +1,11 @@
-﻿import logging
+﻿import atexit
+import hashlib
+import logging
 import os
-from typing import Iterable, List
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional, Tuple
 
 from django.conf import settings
 from langchain_chroma import Chroma
@@ -20,6 +25,87 @@ def _env_bool(name: str, default: bool = False) -> bool:
     return val in {"1", "true", "yes", "on"}
 
 
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.environ.get(name, str(default)))
+    except Exception:
+        return int(default)
+
+
+class QueryEmbeddingCache:
+    """
+    LRU cache thread-safe untuk embedding query.
+    Key: (model_name, normalize, teks query yang sudah diberi prefix).
+    """
+
+    def __init__(self, max_size: int = 512, ttl_seconds: int = 3600):
+        self.max_size = max(0, int(max_size))
+        self.ttl_seconds = max(0, int(ttl_seconds))
+        self._data: "OrderedDict[Tuple[str, bool, str], Tuple[float, List[float]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Tuple[str, bool, str]) -> Optional[List[float]]:
+        if self.max_size <= 0:
+            return None
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                self.misses += 1
+                return None
+            stored_at, vector = item
+            if self.ttl_seconds and (time.monotonic() - stored_at) > self.ttl_seconds:
+                del self._data[key]
+                self.evictions += 1
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return list(vector)
+
+    def set(self, key: Tuple[str, bool, str], vector: List[float]) -> None:
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            self._data[key] = (time.monotonic(), list(vector))
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "size": len(self._data),
+                "max_size": self.max_size,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / total, 4) if total else 0.0,
+            }
+
+
+QUERY_EMBEDDING_CACHE = QueryEmbeddingCache(
+    max_size=_env_int("RAG_QUERY_EMBED_CACHE_SIZE", 512),
+    ttl_seconds=_env_int("RAG_QUERY_EMBED_CACHE_TTL", 3600),
+)
+
+
+def get_query_embedding_cache_stats() -> Dict[str, Any]:
+    return QUERY_EMBEDDING_CACHE.stats()
+
+
 class PrefixAwareHuggingFaceEmbeddings(HuggingFaceEmbeddings):
     """
     Prefix e5-style query/passage agar retrieval lintas bahasa lebih stabil.
@@ -31,7 +117,8 @@ class PrefixAwareHuggingFaceEmbeddings(HuggingFaceEmbeddings):
         self._use_e5_prefix = bool(use_e5_prefix)
 
     def _with_query_prefix(self, text: str) -> str:
-        t = str(text or "").strip()
+        # whitespace dirapikan agar variasi spasi memakai entry cache yang sama
+        t = " ".join(str(text or "").split())
         if not self._use_e5_prefix:
             return t
         if t.startswith("query:"):
@@ -46,13 +133,45 @@ class PrefixAwareHuggingFaceEmbeddings(HuggingFaceEmbeddings):
             return t
         return f"passage: {t}"
 
+    def _query_cache_key(self, prefixed: str) -> Tuple[str, bool, str]:
+        normalize = bool((self.encode_kwargs or {}).get("normalize_embeddings"))
+        return (str(self.model_name), normalize, prefixed)
+
     def embed_query(self, text: str) -> List[float]:
-        return super().embed_query(self._with_query_prefix(text))
+        prefixed = self._with_query_prefix(text)
+        key = self._query_cache_key(prefixed)
+        cached = QUERY_EMBEDDING_CACHE.get(key)
+        if cached is not None:
+            return cached
+        vector = super().embed_query(prefixed)
+        QUERY_EMBEDDING_CACHE.set(key, vector)
+        return vector
 
     def embed_documents(self, texts: Iterable[str]) -> List[List[float]]:
         prepared = [self._with_passage_prefix(t) for t in texts]
         return super().embed_documents(prepared)
 
+    def embed_queries(self, texts: Iterable[str]) -> List[List[float]]:
+        """
+        Embed beberapa query dalam satu forward pass (batch) dengan prefix query.
+        """
+        prepared = [self._with_query_prefix(t) for t in texts]
+        if not prepared:
+            return []
+        out: List[Optional[List[float]]] = []
+        missing: List[int] = []
+        for i, prefixed in enumerate(prepared):
+            cached = QUERY_EMBEDDING_CACHE.get(self._query_cache_key(prefixed))
+            out.append(cached)
+            if cached is None:
+                missing.append(i)
+        if missing:
+            vectors = HuggingFaceEmbeddings.embed_documents(self, [prepared[i] for i in missing])
+            for i, vector in zip(missing, vectors):
+                QUERY_EMBEDDING_CACHE.set(self._query_cache_key(prepared[i]), vector)
+                out[i] = vector
+        return [v for v in out if v is not None]
+
 
 def _build_embedding(model_name: str, normalize: bool) -> HuggingFaceEmbeddings:
     use_e5_prefix = "e5" in model_name.lower()
@@ -103,9 +222,177 @@ def preprocess_embedding_passage(text: str) -> str:
     return f"passage: {t}"
 
 
-def get_vectorstore():
-    return Chroma(
-        persist_directory=CHROMA_PERSIST_DIR,
-        embedding_function=get_embedding_function(),
-        collection_name="academic_rag",
-    )
+# =========================
+# Vectorstore registry
+# =========================
+# Satu client Chroma per backend (persist dir / server) + satu wrapper Chroma per
+# (backend, collection) untuk seluruh proses. Sebelumnya setiap get_vectorstore()
+# membuka ulang chroma.sqlite3 dan membaca ulang metadata collection.
+DEFAULT_COLLECTION = "academic_rag"
+
+_VS_LOCK = threading.RLock()
+_VS_PID = os.getpid()
+_CHROMA_CLIENTS: Dict[str, Any] = {}
+_VECTORSTORES: Dict[Tuple[str, str], Chroma] = {}
+
+
+def chroma_settings() -> Dict[str, Any]:
+    """
+    Backend Chroma dari env:
+    - RAG_CHROMA_MODE=embedded (default, dev): PersistentClient di chroma_db/
+    - RAG_CHROMA_MODE=http (production multi-worker): HttpClient ke server Chroma
+      (RAG_CHROMA_HOST, RAG_CHROMA_PORT, RAG_CHROMA_SSL, RAG_CHROMA_AUTH_TOKEN)
+      sehingga semua worker gunicorn + reingest_docs memakai 1 index in-memory.
+    """
+    mode = str(os.environ.get("RAG_CHROMA_MODE", "embedded")).strip().lower()
+    if mode not in {"embedded", "http"}:
+        logger.warning("RAG_CHROMA_MODE tidak dikenal=%s; pakai embedded", mode)
+        mode = "embedded"
+    if mode == "embedded":
+        return {"mode": mode, "path": CHROMA_PERSIST_DIR}
+    token = str(os.environ.get("RAG_CHROMA_AUTH_TOKEN", "")).strip()
+    return {
+        "mode": mode,
+        "host": str(os.environ.get("RAG_CHROMA_HOST", "127.0.0.1")).strip() or "127.0.0.1",
+        "port": _env_int("RAG_CHROMA_PORT", 8001),
+        "ssl": _env_bool("RAG_CHROMA_SSL", default=False),
+        "headers": {"Authorization": f"Bearer {token}"} if token else {},
+    }
+
+
+def _client_key(conf: Dict[str, Any]) -> str:
+    if conf["mode"] == "http":
+        scheme = "https" if conf["ssl"] else "http"
+        return f"{scheme}://{conf['host']}:{conf['port']}"
+    return str(conf["path"])
+
+
+def _get_chroma_client(conf: Dict[str, Any]) -> Any:
+    key = _client_key(conf)
+    client = _CHROMA_CLIENTS.get(key)
+    if client is None:
+        import chromadb
+
+        if conf["mode"] == "http":
+            client = chromadb.HttpClient(
+                host=conf["host"],
+                port=conf["port"],
+                ssl=conf["ssl"],
+                headers=conf["headers"] or None,
+            )
+        else:
+            client = chromadb.PersistentClient(path=conf["path"])
+        _CHROMA_CLIENTS[key] = client
+        logger.info("RAG chroma client dibuka mode=%s target=%s", conf["mode"], key)
+    return client
+
+
+def _ensure_same_process() -> None:
+    # pre-fork server (gunicorn) yang import modul sebelum fork: client milik parent tidak dipakai ulang
+    if os.getpid() != _VS_PID:
+        reset_vectorstores()
+
+
+def get_vectorstore(collection_name: str = DEFAULT_COLLECTION) -> Chroma:
+    """
+    Vectorstore bersama (thread-safe) untuk collection ini; dibuat sekali per proses.
+    """
+    _ensure_same_process()
+    conf = chroma_settings()
+    key = (_client_key(conf), collection_name)
+    vs = _VECTORSTORES.get(key)
+    if vs is not None:
+        return vs
+    with _VS_LOCK:
+        vs = _VECTORSTORES.get(key)
+        if vs is None:
+            vs = Chroma(
+                client=_get_chroma_client(conf),
+                embedding_function=get_embedding_function(),
+                collection_name=collection_name,
+            )
+            _VECTORSTORES[key] = vs
+    return vs
+
+
+def sharding_mode() -> str:
+    """
+    RAG_VECTOR_SHARDING:
+    - off (default): semua user di 1 collection `academic_rag` (filter where user_id)
+    - user: 1 collection per user (`academic_rag_u<user_id>`)
+    - bucket: user di-hash ke RAG_VECTOR_SHARD_BUCKETS collection (`academic_rag_b<NNN>`)
+    Chunk bersama (RAG_SHARED_DOCS) tetap di collection dasar.
+    """
+    mode = str(os.environ.get("RAG_VECTOR_SHARDING", "off")).strip().lower()
+    return mode if mode in {"user", "bucket"} else "off"
+
+
+def collection_for_user(user_id: Any) -> str:
+    mode = sharding_mode()
+    uid = str(user_id).strip()
+    if mode == "off" or not uid:
+        return DEFAULT_COLLECTION
+    if mode == "user":
+        return f"{DEFAULT_COLLECTION}_u{uid}"
+    buckets = max(1, _env_int("RAG_VECTOR_SHARD_BUCKETS", 64))
+    bucket = int(hashlib.sha256(uid.encode("utf-8")).hexdigest(), 16) % buckets
+    return f"{DEFAULT_COLLECTION}_b{bucket:03d}"
+
+
+def warmup_vectorstore(load_embedding: bool = True) -> None:
+    """
+    Dipanggil saat startup (RAG_VECTORSTORE_WARMUP=1): buka client + collection,
+    dan (opsional) load model embedding agar request pertama tidak menanggung biayanya.
+    """
+    t0 = time.time()
+    try:
+        vs = get_vectorstore()
+        count = vs._collection.count()
+        if load_embedding:
+            get_embedding_function().embed_query("warmup")
+        logger.info("RAG vectorstore warmup ok vectors=%s ms=%s", count, int((time.time() - t0) * 1000))
+    except Exception as e:
+        logger.warning("RAG vectorstore warmup gagal err=%s", e)
+
+
+def reset_vectorstores() -> None:
+    """Lupakan client/wrapper tanpa menutupnya (dipakai di child setelah fork)."""
+    global _VS_PID, _VS_LOCK
+    _VS_LOCK = threading.RLock()
+    _VS_PID = os.getpid()
+    _VECTORSTORES.clear()
+    _CHROMA_CLIENTS.clear()
+    # chromadb menyimpan System per path di cache class-level; warisan parent tidak boleh dipakai ulang
+    try:
+        from chromadb.api.shared_system_client import SharedSystemClient
+
+        SharedSystemClient.clear_system_cache()
+    except Exception as e:
+        logger.warning("RAG chroma system cache gagal dibersihkan err=%s", e)
+
+
+def close_vectorstores() -> None:
+    """Tutup semua client Chroma milik proses ini (shutdown)."""
+    if os.getpid() != _VS_PID:
+        reset_vectorstores()
+        return
+    with _VS_LOCK:
+        clients = list(_CHROMA_CLIENTS.values())
+        _VECTORSTORES.clear()
+        _CHROMA_CLIENTS.clear()
+    for client in clients:
+        try:
+            close = getattr(client, "close", None)
+            if callable(close):
+                close()
+            else:
+                system = getattr(client, "_system", None)
+                if system is not None:
+                    system.stop()
+        except Exception as e:
+            logger.debug("RAG chroma client close gagal err=%s", e)
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=reset_vectorstores)
+atexit.register(close_vectorstores)
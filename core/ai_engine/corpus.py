@@ -0,0 +1,46 @@
+# core/ai_engine/corpus.py
+"""
+Versi korpus per user.
+
+Setiap upload/reingest/delete yang menyentuh vector user menaikkan versi,
+sehingga cache turunan (mis. answer cache di retrieval) otomatis tidak dipakai lagi.
+Disimpan di DB (model CorpusVersion), bukan Django cache: tanpa CACHES shared,
+cache default adalah LocMemCache per proses sehingga bump dari ingest_worker /
+worker lain tidak akan terlihat oleh worker yang memegang jawaban lama.
+"""
+from __future__ import annotations
+
+import logging
+from typing import Any
+
+from django.db import IntegrityError, transaction
+from django.db.models import F
+
+from ..models import CorpusVersion
+
+logger = logging.getLogger(__name__)
+
+
+def get_corpus_version(user_id: Any) -> int:
+    try:
+        val = CorpusVersion.objects.filter(user_key=str(user_id)).values_list("version", flat=True).first()
+        return int(val or 0)
+    except Exception:
+        return 0
+
+
+def bump_corpus_version(user_id: Any) -> int:
+    key = str(user_id)
+    try:
+        if not CorpusVersion.objects.filter(user_key=key).update(version=F("version") + 1):
+            try:
+                with transaction.atomic():
+                    CorpusVersion.objects.create(user_key=key, version=1)
+                return 1
+            except IntegrityError:
+                # kalah race dengan proses lain yang membuat baris lebih dulu
+                CorpusVersion.objects.filter(user_key=key).update(version=F("version") + 1)
+        return get_corpus_version(user_id)
+    except Exception as e:
+        logger.warning("corpus: bump version gagal user_id=%s err=%r", user_id, e)
+        return 0
@@ -0,0 +1,57 @@
+# core/ai_engine/executor.py
+"""
+Thread pool terbatas untuk kerja blocking (Chroma, embedding, BM25) dari jalur async.
+
+Jalur async (aask_bot) tidak boleh memblok event loop; query Chroma dan encode
+embedding dijalankan di pool ini. Ukuran pool dibatasi agar ratusan chat in-flight
+tidak membuat ratusan thread yang berebut CPU model embedding.
+"""
+from __future__ import annotations
+
+import asyncio
+import contextvars
+import functools
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Optional, TypeVar
+
+T = TypeVar("T")
+
+_LOCK = threading.Lock()
+_EXECUTOR: Optional[ThreadPoolExecutor] = None
+
+
+def _pool_size() -> int:
+    try:
+        return max(1, int(os.environ.get("RAG_BLOCKING_POOL_SIZE", "8")))
+    except Exception:
+        return 8
+
+
+def get_blocking_executor() -> ThreadPoolExecutor:
+    global _EXECUTOR
+    if _EXECUTOR is None:
+        with _LOCK:
+            if _EXECUTOR is None:
+                _EXECUTOR = ThreadPoolExecutor(max_workers=_pool_size(), thread_name_prefix="rag-blocking")
+    return _EXECUTOR
+
+
+async def run_blocking(fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """
+    Jalankan fungsi sync di pool terbatas dan tunggu hasilnya tanpa memblok event loop.
+    Context (contextvars) ikut dibawa supaya logging/request context tetap konsisten.
+    """
+    loop = asyncio.get_running_loop()
+    ctx = contextvars.copy_context()
+    call = functools.partial(ctx.run, fn, *args, **kwargs)
+    return await loop.run_in_executor(get_blocking_executor(), call)
+
+
+def shutdown_blocking_executor(wait: bool = False) -> None:
+    global _EXECUTOR
+    with _LOCK:
+        if _EXECUTOR is not None:
+            _EXECUTOR.shutdown(wait=wait, cancel_futures=True)
+            _EXECUTOR = None
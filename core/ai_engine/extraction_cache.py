@@ -0,0 +1,64 @@
+# core/ai_engine/extraction_cache.py
+"""
+Extraction cache content-addressed untuk ingest.
+
+Parsing PDF (pdfplumber) + LLM row repair adalah tahap termahal ingest, padahal
+hasilnya hanya bergantung pada isi file. Cache ini menyimpan hasil tahap parsing
+(text_content, detected_columns, schedule_rows, hasil repair) per sha256 file +
+versi parser, sehingga reingest cukup re-chunk + re-embed, dan file identik yang
+diunggah banyak user hanya di-parse sekali.
+"""
+from __future__ import annotations
+
+import hashlib
+import logging
+import os
+from typing import Any, Dict, Optional
+
+from django.db import IntegrityError
+from django.db.models import F
+
+from ..models import ExtractionCache
+
+logger = logging.getLogger(__name__)
+
+
+def cache_enabled() -> bool:
+    val = str(os.environ.get("RAG_EXTRACTION_CACHE", "1")).strip().lower()
+    return val in {"1", "true", "yes", "on"}
+
+
+def file_sha256(file_path: str, chunk_size: int = 1024 * 1024) -> str:
+    h = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(chunk_size), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def get_cached(content_hash: str, parser_version: str) -> Optional[Dict[str, Any]]:
+    try:
+        row = ExtractionCache.objects.filter(content_hash=content_hash, parser_version=parser_version).first()
+        if row is None:
+            return None
+        ExtractionCache.objects.filter(id=row.id).update(hits=F("hits") + 1)
+        return dict(row.payload or {})
+    except Exception as e:
+        # cache hanya optimasi; kalau DB bermasalah ingest tetap jalan normal
+        logger.warning(" extraction cache read gagal: %s", e)
+        return None
+
+
+def store(content_hash: str, parser_version: str, file_type: str, payload: Dict[str, Any]) -> None:
+    try:
+        ExtractionCache.objects.update_or_create(
+            content_hash=content_hash,
+            parser_version=parser_version,
+            defaults={"file_type": file_type[:16], "payload": payload},
+        )
+    except IntegrityError:
+        # worker lain menyimpan file yang sama bersamaan -> isi identik, abaikan
+        pass
+    except Exception as e:
+        logger.warning(" extraction cache write gagal: %s", e)
+
@@ -6,11 +6,19 @@ import pdfplumber
 import pandas as pd
 import logging
 import json
-from typing import Any, Dict, List, Optional, Tuple
+import hashlib
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, List, Optional, Tuple
 from uuid import uuid4
 
 from langchain_text_splitters import RecursiveCharacterTextSplitter
-from .config import get_vectorstore
+from .config import collection_for_user, get_vectorstore
+from . import sparse_index
+from .corpus import bump_corpus_version
+from . import extraction_cache, repair_memo, schedule_store, shared_docs
+from .vector_ops import upsert_doc_chunks
+from .pdf_pages import PageArtifact, extract_pages_serial, extract_pdf_pages, table_preview_rows
 try:
     from langchain_openai import ChatOpenAI  # type: ignore
 except Exception:  # pragma: no cover - optional dependency for hybrid mode
@@ -595,6 +603,12 @@ def _row_confidence(row: Dict[str, Any]) -> Tuple[float, List[str]]:
     return max(0.0, min(1.0, score)), issues
 
 
+def _repair_model_name() -> str:
+    return os.environ.get("INGEST_REPAIR_MODEL") or os.environ.get(
+        "OPENROUTER_MODEL", "qwen/qwen3-next-80b-a3b-instruct:free"
+    )
+
+
 def _build_repair_llm() -> Optional[Any]:
     """
     Build LLM client for hybrid repair. Return None if unavailable.
@@ -606,9 +620,7 @@ def _build_repair_llm() -> Optional[Any]:
     if not api_key:
         return None
 
-    model_name = os.environ.get("INGEST_REPAIR_MODEL") or os.environ.get(
-        "OPENROUTER_MODEL", "qwen/qwen3-next-80b-a3b-instruct:free"
-    )
+    model_name = _repair_model_name()
 
     try:
         return ChatOpenAI(
@@ -664,9 +676,103 @@ def _extract_json_from_llm_response(text: str) -> Optional[List[Dict[str, Any]]]
     return None
 
 
+def _repair_payload(idx: int, row: Dict[str, Any], issues: List[str], conf: float) -> Dict[str, Any]:
+    return {
+        "idx": idx,
+        "issues": issues,
+        "confidence": round(conf, 3),
+        "row": {
+            "hari": _norm(row.get("hari", "")),
+            "sesi": _norm(row.get("sesi", "")),
+            "jam": _norm(row.get("jam", "")),
+            "ruang": _norm(row.get("ruang", "")),
+            "semester": _norm(row.get("semester", "")),
+            "mata_kuliah": _norm(row.get("mata_kuliah", "")),
+            "sks": _norm(row.get("sks", "")),
+            "kelas": _norm(row.get("kelas", "")),
+            "dosen": _norm(row.get("dosen", "")),
+            "kode": _norm(row.get("kode", "")),
+            "page": int(row.get("page", 0) or 0),
+        },
+    }
+
+
+def _repair_prompt(payload: List[Dict[str, Any]], source: str, run_id: str) -> str:
+    return (
+        "Anda memperbaiki data jadwal kuliah hasil OCR/PDF.\n"
+        "Tugas: perbaiki hanya field yang rusak/kosong. Jangan halusinasi.\n"
+        "Jika tidak yakin, biarkan nilai lama.\n"
+        "Wajib output JSON ARRAY valid tanpa teks tambahan.\n"
+        "Setiap item wajib punya keys: idx, hari, sesi, jam, ruang, semester, mata_kuliah, sks, kelas, dosen, kode.\n"
+        "Format jam wajib HH:MM-HH:MM.\n"
+        "Hari gunakan: SENIN/SELASA/RABU/KAMIS/JUMAT/SABTU/MINGGU jika bahasa Indonesia.\n"
+        f"Source: {source}\n"
+        f"Run: {run_id}\n"
+        f"Input rows:\n{json.dumps(payload, ensure_ascii=True)}"
+    )
+
+
+def _invoke_repair_batch(llm: Any, prompt: str, retries: int, backoff: float, deadline: float) -> Optional[List[Dict[str, Any]]]:
+    """
+    1 batch repair: retry + backoff eksponensial untuk error / respons non-JSON.
+    Tidak retry lagi jika sudah melewati time budget (deadline). Timeout per call = sisa
+    budget (dibagi retry internal client), sehingga call tidak jalan terus setelah budget habis.
+    """
+    last_err: Optional[Exception] = None
+    client_attempts = max(0, int(getattr(llm, "max_retries", 0) or 0)) + 1
+    for attempt in range(max(0, retries) + 1):
+        if attempt:
+            delay = backoff * (2 ** (attempt - 1))
+            if time.monotonic() + delay >= deadline:
+                break
+            time.sleep(delay)
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            break
+        try:
+            out = llm.invoke(prompt, timeout=remaining / client_attempts)
+            content = out.content if hasattr(out, "content") else str(out)
+            parsed = _extract_json_from_llm_response(content if isinstance(content, str) else str(content))
+            if parsed:
+                return parsed
+            last_err = ValueError("respons repair bukan JSON array")
+        except Exception as e:
+            last_err = e
+    if last_err is not None:
+        logger.warning(" Hybrid LLM repair batch gagal: %s", last_err)
+    return None
+
+
+def _apply_repair_item(rows: List[Dict[str, Any]], item: Dict[str, Any]) -> bool:
+    row = rows[item["idx"]]
+    updates = {
+        "hari": _normalize_day_text(item.get("hari", row.get("hari", ""))),
+        "sesi": _norm(item.get("sesi", row.get("sesi", ""))),
+        "jam": _normalize_time_range(item.get("jam", row.get("jam", ""))),
+        "ruang": _norm(item.get("ruang", row.get("ruang", ""))),
+        "semester": _norm(item.get("semester", row.get("semester", ""))),
+        "mata_kuliah": _norm(item.get("mata_kuliah", row.get("mata_kuliah", ""))),
+        "sks": _norm(item.get("sks", row.get("sks", ""))),
+        "kelas": _norm(item.get("kelas", row.get("kelas", ""))),
+        "dosen": _norm(item.get("dosen", row.get("dosen", ""))),
+        "kode": _norm(item.get("kode", row.get("kode", ""))),
+    }
+
+    before_conf, _ = _row_confidence(row)
+    row.update({k: v for k, v in updates.items() if v != ""})
+    after_conf, after_issues = _row_confidence(row)
+    row["_confidence"] = after_conf
+    row["_issues"] = after_issues
+    return after_conf > before_conf
+
+
 def _repair_rows_with_llm(rows: List[Dict[str, Any]], source: str) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
     """
     Hybrid step: only repair low-confidence rows with LLM strict JSON output.
+
+    Batch dikirim paralel (INGEST_REPAIR_CONCURRENCY) dengan retry/backoff per batch.
+    Hasil digabung deterministik urut idx setelah semua batch selesai; batch yang belum
+    selesai saat time budget (INGEST_REPAIR_BUDGET_SEC) habis diabaikan -> row tetap apa adanya.
     """
     if not rows:
         return rows, {"enabled": False, "checked": 0, "repaired": 0}
@@ -681,7 +787,11 @@ def _repair_rows_with_llm(rows: List[Dict[str, Any]], source: str) -> Tuple[List
 
     threshold = float(os.environ.get("INGEST_REPAIR_THRESHOLD", "0.82"))
     max_rows = int(os.environ.get("INGEST_REPAIR_MAX_ROWS", "220"))
-    batch_size = int(os.environ.get("INGEST_REPAIR_BATCH_SIZE", "25"))
+    batch_size = max(1, int(os.environ.get("INGEST_REPAIR_BATCH_SIZE", "25")))
+    concurrency = max(1, int(os.environ.get("INGEST_REPAIR_CONCURRENCY", "4")))
+    retries = max(0, int(os.environ.get("INGEST_REPAIR_BATCH_RETRIES", "2")))
+    backoff = max(0.0, float(os.environ.get("INGEST_REPAIR_BACKOFF_SEC", "1.0")))
+    budget = max(1.0, float(os.environ.get("INGEST_REPAIR_BUDGET_SEC", "150")))
 
     candidates: List[Tuple[int, Dict[str, Any], List[str], float]] = []
     for idx, row in enumerate(rows):
@@ -700,86 +810,70 @@ def _repair_rows_with_llm(rows: List[Dict[str, Any]], source: str) -> Tuple[List
         return rows, {"enabled": True, "checked": len(rows), "repaired": 0}
 
     candidates = candidates[:max_rows]
-    repaired = 0
     run_id = uuid4().hex[:8]
-
-    for start in range(0, len(candidates), max(1, batch_size)):
-        batch = candidates[start:start + max(1, batch_size)]
-        payload: List[Dict[str, Any]] = []
-        for i, row, issues, conf in batch:
-            payload.append(
-                {
-                    "idx": i,
-                    "issues": issues,
-                    "confidence": round(conf, 3),
-                    "row": {
-                        "hari": _norm(row.get("hari", "")),
-                        "sesi": _norm(row.get("sesi", "")),
-                        "jam": _norm(row.get("jam", "")),
-                        "ruang": _norm(row.get("ruang", "")),
-                        "semester": _norm(row.get("semester", "")),
-                        "mata_kuliah": _norm(row.get("mata_kuliah", "")),
-                        "sks": _norm(row.get("sks", "")),
-                        "kelas": _norm(row.get("kelas", "")),
-                        "dosen": _norm(row.get("dosen", "")),
-                        "kode": _norm(row.get("kode", "")),
-                        "page": int(row.get("page", 0) or 0),
-                    },
-                }
-            )
-
-        prompt = (
-            "Anda memperbaiki data jadwal kuliah hasil OCR/PDF.\n"
-            "Tugas: perbaiki hanya field yang rusak/kosong. Jangan halusinasi.\n"
-            "Jika tidak yakin, biarkan nilai lama.\n"
-            "Wajib output JSON ARRAY valid tanpa teks tambahan.\n"
-            "Setiap item wajib punya keys: idx, hari, sesi, jam, ruang, semester, mata_kuliah, sks, kelas, dosen, kode.\n"
-            "Format jam wajib HH:MM-HH:MM.\n"
-            "Hari gunakan: SENIN/SELASA/RABU/KAMIS/JUMAT/SABTU/MINGGU jika bahasa Indonesia.\n"
-            f"Source: {source}\n"
-            f"Run: {run_id}\n"
-            f"Input rows:\n{json.dumps(payload, ensure_ascii=True)}"
-        )
-
+    t0 = time.monotonic()
+    deadline = t0 + budget
+    payloads = {c[0]: _repair_payload(*c) for c in candidates}
+
+    # memo persisten: row rusak yang sama sudah pernah diperbaiki -> tanpa call LLM
+    items_by_idx: Dict[int, Dict[str, Any]] = {}
+    fingerprints: Dict[int, str] = {}
+    if repair_memo.memo_enabled():
+        model_name = _repair_model_name()
+        fingerprints = {idx: repair_memo.row_fingerprint(p, model_name) for idx, p in payloads.items()}
+        memo = repair_memo.lookup_many(fingerprints.values())
+        for idx, fp in fingerprints.items():
+            if fp in memo:
+                items_by_idx[idx] = dict(memo[fp], idx=idx)
+    memo_hits = len(items_by_idx)
+    misses = [c for c in candidates if c[0] not in items_by_idx]
+
+    batches: List[List[int]] = []
+    prompts: List[str] = []
+    for start in range(0, len(misses), batch_size):
+        batch = misses[start:start + batch_size]
+        batches.append([i for i, _, _, _ in batch])
+        prompts.append(_repair_prompt([payloads[i] for i, _, _, _ in batch], source, run_id))
+
+    results: Dict[int, Optional[List[Dict[str, Any]]]] = {}
+    if prompts:
+        pool = ThreadPoolExecutor(max_workers=min(concurrency, len(prompts)), thread_name_prefix="ingest-repair")
         try:
-            out = llm.invoke(prompt)
-            content = out.content if hasattr(out, "content") else str(out)
-            parsed = _extract_json_from_llm_response(content if isinstance(content, str) else str(content))
-            if not parsed:
-                continue
-
-            for item in parsed:
-                if not isinstance(item, dict):
-                    continue
-                idx = item.get("idx")
-                if not isinstance(idx, int) or idx < 0 or idx >= len(rows):
-                    continue
-                row = rows[idx]
-                if not isinstance(row, dict):
+            futures = {
+                pool.submit(_invoke_repair_batch, llm, prompt, retries, backoff, deadline): b
+                for b, prompt in enumerate(prompts)
+            }
+            done, _pending = wait(futures, timeout=max(0.0, deadline - time.monotonic()))
+            for fut in done:
+                try:
+                    results[futures[fut]] = fut.result()
+                except Exception as e:
+                    logger.warning(" Hybrid LLM repair batch gagal: %s", e)
+        finally:
+            # batch yang belum selesai dibiarkan (tidak ditunggu); hasilnya tidak dipakai
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    # merge deterministik: hanya idx milik batch itu sendiri, diterapkan urut idx
+    from_llm: set = set()
+    for b, parsed in results.items():
+        allowed = set(batches[b])
+        for item in parsed or []:
+            if isinstance(item, dict) and isinstance(item.get("idx"), int) and item["idx"] in allowed:
+                if item["idx"] in items_by_idx:
                     continue
+                items_by_idx[item["idx"]] = item
+                from_llm.add(item["idx"])
 
-                updates = {
-                    "hari": _normalize_day_text(item.get("hari", row.get("hari", ""))),
-                    "sesi": _norm(item.get("sesi", row.get("sesi", ""))),
-                    "jam": _normalize_time_range(item.get("jam", row.get("jam", ""))),
-                    "ruang": _norm(item.get("ruang", row.get("ruang", ""))),
-                    "semester": _norm(item.get("semester", row.get("semester", ""))),
-                    "mata_kuliah": _norm(item.get("mata_kuliah", row.get("mata_kuliah", ""))),
-                    "sks": _norm(item.get("sks", row.get("sks", ""))),
-                    "kelas": _norm(item.get("kelas", row.get("kelas", ""))),
-                    "dosen": _norm(item.get("dosen", row.get("dosen", ""))),
-                    "kode": _norm(item.get("kode", row.get("kode", ""))),
-                }
-
-                before_conf, _ = _row_confidence(row)
-                row.update({k: v for k, v in updates.items() if v != ""})
-                after_conf, after_issues = _row_confidence(row)
-                row["_confidence"] = after_conf
-                row["_issues"] = after_issues
-                if after_conf > before_conf:
-                    repaired += 1
-        except Exception as e:
-            logger.warning(" Hybrid LLM repair batch gagal: %s", e)
+    repaired = 0
+    to_memo: Dict[str, Dict[str, Any]] = {}
+    for idx in sorted(items_by_idx):
+        if not _apply_repair_item(rows, items_by_idx[idx]):
+            continue
+        repaired += 1
+        # memo hanya hasil LLM yang benar-benar menaikkan confidence row
+        if idx in from_llm and idx in fingerprints:
+            to_memo[fingerprints[idx]] = {k: v for k, v in items_by_idx[idx].items() if k != "idx"}
+    repair_memo.store_many(to_memo)
 
     return rows, {
         "enabled": True,
@@ -787,6 +881,12 @@ def _repair_rows_with_llm(rows: List[Dict[str, Any]], source: str) -> Tuple[List
         "candidates": len(candidates),
         "repaired": repaired,
         "run_id": run_id,
+        "batches": len(batches),
+        "batches_ok": sum(1 for r in results.values() if r),
+        "batches_timed_out": len(batches) - len(results),
+        "elapsed_ms": int((time.monotonic() - t0) * 1000),
+        "memo_hits": memo_hits,
+        "memo_misses": len(misses),
     }
 
 
@@ -800,6 +900,15 @@ def _extract_pdf_tables(pdf: pdfplumber.PDF) -> Tuple[str, List[str], List[Dict[
     - detected_columns: list kolom hasil deteksi header tabel (unik)
     - schedule_rows: list row ringkas jadwal (best-effort)
     """
+    return _merge_pdf_pages(extract_pages_serial(pdf))
+
+
+def _merge_pdf_pages(pages: List[PageArtifact]) -> Tuple[str, List[str], List[Dict[str, Any]]]:
+    """
+    Gabungkan hasil ekstraksi mentah per halaman (lihat pdf_pages) menjadi
+    text/kolom/schedule_rows. Dijalankan serial sesuai urutan halaman supaya
+    carry hari/sesi/jam lintas halaman tetap deterministik walau ekstraksi paralel.
+    """
     detected_columns: List[str] = []
     schedule_rows: List[Dict[str, Any]] = []
     text_parts: List[str] = []
@@ -807,13 +916,8 @@ def _extract_pdf_tables(pdf: pdfplumber.PDF) -> Tuple[str, List[str], List[Dict[
     carry_sesi = ""
     carry_jam = ""
 
-    for page_idx, page in enumerate(pdf.pages, start=1):
-        # --- 1) extract tables ---
-        try:
-            tables = page.extract_tables() or []
-        except Exception:
-            tables = []
-
+    for page_idx, tables, page_text in sorted(pages, key=lambda p: p[0]):
+        # --- 1) tables (sudah diekstrak per halaman) ---
         for table in tables:
             if not table:
                 continue
@@ -975,11 +1079,6 @@ def _extract_pdf_tables(pdf: pdfplumber.PDF) -> Tuple[str, List[str], List[Dict[
 
         # --- 3) fallback from page text (very important) ---
         # beberapa PDF tabelnya sulit, tapi textnya mengandung pola hari+jam
-        try:
-            page_text = (page.extract_text() or "").strip()
-        except Exception:
-            page_text = ""
-
         if page_text:
             # normalize
             t = _normalize_time_range(page_text)
@@ -1065,222 +1164,508 @@ def _extract_pdf_tables(pdf: pdfplumber.PDF) -> Tuple[str, List[str], List[Dict[
     return "\n".join(text_parts).strip(), detected_columns, out_rows
 
 
-def process_document(doc_instance) -> bool:
+def _save_pdf_table_preview(doc_instance, rows: List[List[str]]) -> None:
+    # dipakai planner (profile_extractor) untuk deteksi kolom tanpa parsing ulang PDF
+    try:
+        type(doc_instance).objects.filter(pk=doc_instance.pk).update(pdf_table_preview=rows)
+        doc_instance.pdf_table_preview = rows
+    except Exception as e:
+        logger.debug(" simpan pdf_table_preview gagal: %s", e)
+
+
+def _save_content_hash(doc_instance, content_hash: str) -> None:
+    try:
+        type(doc_instance).objects.filter(pk=doc_instance.pk).update(content_hash=content_hash)
+        doc_instance.content_hash = content_hash
+    except Exception as e:
+        logger.debug(" simpan content_hash gagal: %s", e)
+
+
+def _save_schedule_rows(doc_instance, rows: List[Dict[str, Any]]) -> None:
+    # tabel ScheduleRow = sumber baris jadwal; chunk hanya membawa referensi kecil
+    try:
+        normalized = [dict(r, hari=_normalize_day_text(r.get("hari", ""))) for r in rows if isinstance(r, dict)]
+        n = schedule_store.replace_rows(doc_instance, normalized)
+        logger.debug(" ScheduleRow tersimpan doc_id=%s rows=%s", doc_instance.id, n)
+    except Exception as e:
+        logger.warning(" simpan ScheduleRow gagal doc_id=%s err=%s", getattr(doc_instance, "id", None), e)
+
+
+def load_schedule_rows(ref: Any) -> List[Dict[str, Any]]:
+    """Ambil baris jadwal dari metadata chunk `schedule_rows_ref`."""
+    return schedule_store.rows_for_ref(ref)
+
+
+def _chunk_ids(doc_key: str, payloads: List[Dict[str, Any]]) -> List[str]:
     """
-    Membaca file PDF/Excel/CSV/MD/TXT, memecahnya, dan menyimpan ke ChromaDB
-    dengan metadata:
-    - user_id (isolasi data)
-    - doc_id (penting untuk delete/reingest)
-    - source, file_type
-    - columns (schema) termasuk PDF
-    - schedule_rows (khusus KRS/Jadwal; ringkas & dibatasi)
+    ID chunk deterministik dari (doc_id, chunk_kind, hash isi). Chunk identik di
+    dokumen yang sama diberi nomor urut kemunculan supaya tetap unik.
     """
-    file_path = doc_instance.file.path
-    ext = file_path.split(".")[-1].lower()
-    text_content = ""
-    row_chunks: List[str] = []
+    seen: Dict[str, int] = {}
+    out: List[str] = []
+    for p in payloads:
+        kind = str(p.get("chunk_kind") or "text")
+        digest = hashlib.sha256(str(p.get("text") or "").encode("utf-8")).hexdigest()[:32]
+        base = f"{doc_key}:{kind}:{digest}"
+        n = seen.get(base, 0)
+        seen[base] = n + 1
+        out.append(base if n == 0 else f"{base}:{n}")
+    return out
+
+
+def _log_upsert(title: str, stats: Dict[str, int]) -> None:
+    logger.info(
+        " UPSERT chunks source=%s added=%s deleted=%s kept=%s meta_updated=%s",
+        title,
+        stats.get("added", 0),
+        stats.get("deleted", 0),
+        stats.get("kept", 0),
+        stats.get("meta_updated", 0),
+    )
+
+
+def _add_shared_chunks(
+    vectorstore,
+    payloads: List[Dict[str, Any]],
+    chunks: List[str],
+    metadatas: List[Dict[str, Any]],
+    content_hash: str,
+    refresh: bool = False,
+    text_semester: Optional[int] = None,
+) -> None:
+    """
+    Mode dokumen bersama: embedding per isi file disimpan sekali (user_id=SHARED_OWNER).
+    Upload file identik oleh user lain hanya menambah referensi (content_hash di DB).
+    Field milik pengunggah (source = judul, semester dari judul) tidak ikut disimpan;
+    retrieval mengisinya dari AcademicDocument user yang bertanya (shared_docs.label_shared_docs).
+    """
+    col = getattr(vectorstore, "_collection", None)
+    if not refresh and shared_docs.shared_chunks_exist(col, content_hash):
+        logger.info(" SHARED DOC reuse sha256=%s chunks=%s (embedding dilewati)", content_hash[:12], len(chunks))
+        return
+    shared_id = shared_docs.shared_doc_id(content_hash)
+    shared_metas = []
+    for m in metadatas:
+        meta = {k: v for k, v in m.items() if k not in {"source", "semester"}}
+        meta.update(user_id=shared_docs.SHARED_OWNER, doc_id=shared_id, content_hash=content_hash)
+        if text_semester is not None:
+            # semester dari isi file berlaku untuk semua pengunggah
+            meta["semester"] = int(text_semester)
+        shared_metas.append(meta)
+    for m in shared_metas:
+        # doc pengunggah pertama bisa dihapus; referensi bersama lewat hash isi
+        if "schedule_rows_ref" in m:
+            m["schedule_rows_ref"] = shared_id
+    stats = upsert_doc_chunks(
+        vectorstore,
+        where=shared_docs.shared_where(content_hash),
+        ids=_chunk_ids(shared_id, payloads),
+        texts=chunks,
+        metadatas=shared_metas,
+    )
+    _log_upsert(shared_id, stats)
+
+
+ProgressCallback = Callable[[int, str], None]
+
+
+def _report_progress(progress_callback: Optional[ProgressCallback], pct: int, stage: str) -> None:
+    if progress_callback is None:
+        return
+    try:
+        progress_callback(int(pct), stage)
+    except Exception as e:
+        # progress hanya informatif; jangan gagalkan ingest
+        logger.debug(" progress callback gagal: %s", e)
+
 
+# Naikkan jika logika parsing / repair berubah -> entry extraction cache lama tidak dipakai lagi
+EXTRACTION_PARSER_VERSION = "2"
+
+
+def _extraction_version() -> str:
+    hybrid_enabled = (os.environ.get("PDF_HYBRID_LLM_REPAIR", "1") or "1").strip() in {"1", "true", "yes"}
+    return f"{EXTRACTION_PARSER_VERSION}:repair={'on' if hybrid_enabled else 'off'}"
+
+
+def _is_cacheable(parsed: Dict[str, Any]) -> bool:
+    # repair yang gagal karena LLM tidak tersedia jangan dikunci di cache
+    return (parsed.get("repair_stats") or {}).get("reason") != "llm_unavailable"
+
+
+def _parse_document_file(
+    doc_instance,
+    file_path: str,
+    ext: str,
+    progress_callback: Optional[ProgressCallback] = None,
+) -> Optional[Dict[str, Any]]:
+    """
+    Tahap parsing (+ LLM row repair) saja. Hasilnya hanya bergantung pada isi file,
+    sehingga bisa disimpan di extraction cache (key: sha256 file + versi parser).
+    Return None jika file gagal dibaca / kosong.
+    """
+    text_content = ""
+    row_chunks: List[str] = []
     detected_columns: Optional[List[str]] = None
     schedule_rows: Optional[List[Dict[str, Any]]] = None
-    semester_num: Optional[int] = _extract_semester_from_text(getattr(doc_instance, "title", ""))
+    # semester dari isi dokumen (semester dari judul digabung di process_document)
+    semester_num: Optional[int] = None
+    pdf_table_preview: List[List[str]] = []
+    repair_stats: Dict[str, Any] = {}
+
+    if ext == "pdf":
+        with pdfplumber.open(file_path) as pdf:
+            pdf_page_count = len(pdf.pages)
+            pdf_pages = extract_pdf_pages(file_path, pdf)
+            table_text, pdf_columns, pdf_schedule_rows = _merge_pdf_pages(pdf_pages)
+            pdf_table_preview = table_preview_rows(pdf_pages)
+
+            if pdf_columns:
+                detected_columns = pdf_columns
+
+            if pdf_schedule_rows:
+                schedule_rows = pdf_schedule_rows
+                _report_progress(progress_callback, 25, "repair")
+                schedule_rows, repair_stats = _repair_rows_with_llm(schedule_rows, doc_instance.title)
+                if repair_stats.get("enabled"):
+                    logger.info(
+                        " HYBRID_REPAIR source=%s checked=%s candidates=%s repaired=%s run=%s batches=%s ok=%s timed_out=%s elapsed_ms=%s memo_hits=%s memo_misses=%s memo_hit_rate=%.2f",
+                        doc_instance.title,
+                        repair_stats.get("checked", 0),
+                        repair_stats.get("candidates", 0),
+                        repair_stats.get("repaired", 0),
+                        repair_stats.get("run_id", "-"),
+                        repair_stats.get("batches", 0),
+                        repair_stats.get("batches_ok", 0),
+                        repair_stats.get("batches_timed_out", 0),
+                        repair_stats.get("elapsed_ms", 0),
+                        repair_stats.get("memo_hits", 0),
+                        repair_stats.get("memo_misses", 0),
+                        repair_stats.get("memo_hits", 0) / max(1, repair_stats.get("candidates", 0)),
+                    )
+                row_chunks = _schedule_rows_to_row_chunks(schedule_rows)
+                csv_repr, csv_rows, csv_cols = _schedule_rows_to_csv_text(schedule_rows)
+                if csv_repr:
+                    text_content += "\n[CSV_CANONICAL]\n" + csv_repr + "\n"
+                    preview_lines = int(os.getenv("CSV_REVIEW_PREVIEW_LINES", "12") or 12)
+                    preview = _csv_preview(csv_repr, max_lines=max(3, preview_lines))
+                    logger.info(
+                        " CSV canonical review source=%s rows=%s cols=%s\n%s",
+                        doc_instance.title,
+                        csv_rows,
+                        csv_cols,
+                        preview,
+                    )
+                # Baris jadwal terstruktur sudah ada di tabel ScheduleRow; blok JSON canonical
+                # di teks embedding hanya duplikasi -> default mati (JSON_CANONICAL_EMBED_ROWS=0).
+                json_preview_limit = int(os.getenv("JSON_CANONICAL_EMBED_ROWS", "0") or 0)
+                if schedule_rows and json_preview_limit > 0:
+                    try:
+                        json_blob = json.dumps(schedule_rows[:max(20, json_preview_limit)], ensure_ascii=True)
+                        text_content += "\n[JSON_CANONICAL]\n" + json_blob + "\n"
+                    except Exception:
+                        pass
 
-    logger.info(" MULAI PARSING: %s (Type: %s)", doc_instance.title, ext)
+            if table_text:
+                text_content += table_text + "\n"
 
-    try:
-        # =========================
-        # 1) PARSING
-        # =========================
-        if ext == "pdf":
-            with pdfplumber.open(file_path) as pdf:
-                table_text, pdf_columns, pdf_schedule_rows = _extract_pdf_tables(pdf)
-
-                if pdf_columns:
-                    detected_columns = pdf_columns
-
-                if pdf_schedule_rows:
-                    schedule_rows = pdf_schedule_rows
-                    schedule_rows, repair_stats = _repair_rows_with_llm(schedule_rows, doc_instance.title)
-                    if repair_stats.get("enabled"):
-                        logger.info(
-                            " HYBRID_REPAIR source=%s checked=%s candidates=%s repaired=%s run=%s",
-                            doc_instance.title,
-                            repair_stats.get("checked", 0),
-                            repair_stats.get("candidates", 0),
-                            repair_stats.get("repaired", 0),
-                            repair_stats.get("run_id", "-"),
-                        )
-                    row_chunks = _schedule_rows_to_row_chunks(schedule_rows)
-                    csv_repr, csv_rows, csv_cols = _schedule_rows_to_csv_text(schedule_rows)
-                    if csv_repr:
-                        text_content += "\n[CSV_CANONICAL]\n" + csv_repr + "\n"
-                        preview_lines = int(os.getenv("CSV_REVIEW_PREVIEW_LINES", "12") or 12)
-                        preview = _csv_preview(csv_repr, max_lines=max(3, preview_lines))
-                        logger.info(
-                            " CSV canonical review source=%s rows=%s cols=%s\n%s",
-                            doc_instance.title,
-                            csv_rows,
-                            csv_cols,
-                            preview,
-                        )
-                    # Simpan JSON canonical ringkas untuk retrieval dengan format terstruktur.
-                    json_preview_limit = int(os.getenv("JSON_CANONICAL_EMBED_ROWS", "300") or 300)
-                    if schedule_rows:
-                        try:
-                            json_blob = json.dumps(schedule_rows[:max(20, json_preview_limit)], ensure_ascii=True)
-                            text_content += "\n[JSON_CANONICAL]\n" + json_blob + "\n"
-                        except Exception:
-                            pass
-
-                if table_text:
-                    text_content += table_text + "\n"
-
-                # text biasa
-                for page in pdf.pages:
-                    t = page.extract_text() or ""
-                    t = t.strip()
-                    if t:
-                        text_content += t + "\n"
-                        if semester_num is None:
-                            semester_num = _extract_semester_from_text(t)
-
-            logger.debug(" PDF Parsed. columns=%s schedule_rows=%s",
-                         len(detected_columns or []), len(schedule_rows or []))
-
-            # OCR fallback (optional) jika text kosong
-            if not (text_content or "").strip():
-                try:
-                    from pdf2image import convert_from_path  # type: ignore
-                    import pytesseract  # type: ignore
-                    logger.warning(" PDF text kosong -> mencoba OCR fallback")
-                    images = convert_from_path(file_path, first_page=1, last_page=min(2, len(pdf.pages)))
-                    ocr_texts = []
-                    for img in images:
-                        ocr_texts.append(pytesseract.image_to_string(img))
-                    ocr_blob = "\n".join([t.strip() for t in ocr_texts if t and t.strip()])
-                    if ocr_blob:
-                        text_content += ocr_blob + "\n"
-                        if semester_num is None:
-                            semester_num = _extract_semester_from_text(ocr_blob)
-                except Exception as e:
-                    logger.warning(" OCR fallback gagal/tdk tersedia: %s", e)
-
-        elif ext in ["xlsx", "xls"]:
+            # text biasa (sudah diekstrak bersama tabel, tidak parsing ulang)
+            for _, _, t in pdf_pages:
+                if t:
+                    text_content += t + "\n"
+                    if semester_num is None:
+                        semester_num = _extract_semester_from_text(t)
+
+        logger.debug(" PDF Parsed. columns=%s schedule_rows=%s",
+                     len(detected_columns or []), len(schedule_rows or []))
+
+        # OCR fallback (optional) jika text kosong
+        if not (text_content or "").strip():
             try:
-                df = pd.read_excel(file_path).fillna("")
-                detected_columns = [str(c).strip() for c in list(df.columns) if str(c).strip()]
-                text_content = df.to_markdown(index=False)
-                logger.debug(" Excel Parsed: %s baris data.", len(df))
+                from pdf2image import convert_from_path  # type: ignore
+                import pytesseract  # type: ignore
+                logger.warning(" PDF text kosong -> mencoba OCR fallback")
+                images = convert_from_path(file_path, first_page=1, last_page=min(2, pdf_page_count))
+                ocr_texts = []
+                for img in images:
+                    ocr_texts.append(pytesseract.image_to_string(img))
+                ocr_blob = "\n".join([t.strip() for t in ocr_texts if t and t.strip()])
+                if ocr_blob:
+                    text_content += ocr_blob + "\n"
+                    if semester_num is None:
+                        semester_num = _extract_semester_from_text(ocr_blob)
             except Exception as e:
-                logger.error(" Gagal baca Excel %s: %s", doc_instance.title, e, exc_info=True)
-                return False
+                logger.warning(" OCR fallback gagal/tdk tersedia: %s", e)
+
+    elif ext in ["xlsx", "xls"]:
+        try:
+            df = pd.read_excel(file_path).fillna("")
+            detected_columns = [str(c).strip() for c in list(df.columns) if str(c).strip()]
+            text_content = df.to_markdown(index=False)
+            logger.debug(" Excel Parsed: %s baris data.", len(df))
+        except Exception as e:
+            logger.error(" Gagal baca Excel %s: %s", doc_instance.title, e, exc_info=True)
+            return None
 
-        elif ext == "csv":
+    elif ext == "csv":
+        try:
+            df = pd.read_csv(file_path)
+        except Exception as e_comma:
+            logger.warning(" Gagal baca CSV pakai koma, mencoba titik-koma... (%s)", e_comma)
             try:
-                df = pd.read_csv(file_path)
-            except Exception as e_comma:
-                logger.warning(" Gagal baca CSV pakai koma, mencoba titik-koma... (%s)", e_comma)
+                df = pd.read_csv(file_path, sep=";")
+            except Exception as e_semi:
+                logger.warning(" Gagal baca CSV pakai titik-koma, mencoba encoding latin-1... (%s)", e_semi)
                 try:
-                    df = pd.read_csv(file_path, sep=";")
-                except Exception as e_semi:
-                    logger.warning(" Gagal baca CSV pakai titik-koma, mencoba encoding latin-1... (%s)", e_semi)
-                    try:
-                        df = pd.read_csv(file_path, sep=None, engine="python", encoding="latin-1")
-                    except Exception as e_final:
-                        logger.error(" CSV GAGAL TOTAL: %s. Error: %s", doc_instance.title, e_final, exc_info=True)
-                        return False
+                    df = pd.read_csv(file_path, sep=None, engine="python", encoding="latin-1")
+                except Exception as e_final:
+                    logger.error(" CSV GAGAL TOTAL: %s. Error: %s", doc_instance.title, e_final, exc_info=True)
+                    return None
+
+        df = df.fillna("")
+        detected_columns = [str(c).strip() for c in list(df.columns) if str(c).strip()]
+        text_content = df.to_markdown(index=False)
+        logger.debug(" CSV Parsed: %s baris data.", len(df))
+
+    elif ext in ["md", "txt"]:
+        with open(file_path, "r", encoding="utf-8") as f:
+            text_content = f.read()
+        logger.debug(" Text Parsed.")
+
+    else:
+        logger.warning(" Tipe file tidak didukung: %s", ext)
+        return None
 
-            df = df.fillna("")
-            detected_columns = [str(c).strip() for c in list(df.columns) if str(c).strip()]
-            text_content = df.to_markdown(index=False)
-            logger.debug(" CSV Parsed: %s baris data.", len(df))
+    if not (text_content or "").strip():
+        logger.warning(" FILE KOSONG: %s tidak mengandung teks yang bisa dibaca.", doc_instance.title)
+        return None
 
-        elif ext in ["md", "txt"]:
-            with open(file_path, "r", encoding="utf-8") as f:
-                text_content = f.read()
-            logger.debug(" Text Parsed.")
+    return {
+        "text_content": text_content,
+        "detected_columns": detected_columns or [],
+        "schedule_rows": schedule_rows or [],
+        "row_chunks": row_chunks,
+        "text_semester": semester_num,
+        "pdf_table_preview": pdf_table_preview,
+        "repair_stats": repair_stats,
+    }
+
+
+def _prepare_document(
+    doc_instance,
+    progress_callback: Optional[ProgressCallback] = None,
+    use_extraction_cache: bool = True,
+) -> Optional[Dict[str, Any]]:
+    file_path = doc_instance.file.path
+    ext = file_path.split(".")[-1].lower()
+    title_semester = _extract_semester_from_text(getattr(doc_instance, "title", ""))
 
-        else:
-            logger.warning(" Tipe file tidak didukung: %s", ext)
-            return False
+    logger.info(" MULAI PARSING: %s (Type: %s)", doc_instance.title, ext)
+    _report_progress(progress_callback, 5, "parsing")
+
+    # =========================
+    # 1) PARSING (atau ambil dari extraction cache)
+    # =========================
+    use_cache = use_extraction_cache and extraction_cache.cache_enabled()
+    shared_mode = shared_docs.shared_docs_enabled()
+    content_hash = extraction_cache.file_sha256(file_path) if (use_cache or shared_mode) else ""
+    if content_hash:
+        _save_content_hash(doc_instance, content_hash)
+    parsed = extraction_cache.get_cached(content_hash, _extraction_version()) if use_cache else None
+    if parsed is not None:
+        logger.info(" EXTRACTION CACHE HIT: %s sha256=%s", doc_instance.title, content_hash[:12])
+    else:
+        parsed = _parse_document_file(doc_instance, file_path, ext, progress_callback)
+        if parsed is None:
+            return None
+        if use_cache and _is_cacheable(parsed):
+            extraction_cache.store(content_hash, _extraction_version(), ext, parsed)
+
+    text_content = parsed["text_content"]
+    detected_columns = parsed.get("detected_columns") or None
+    schedule_rows = parsed.get("schedule_rows") or None
+    row_chunks = parsed.get("row_chunks") or []
+    semester_num = title_semester if title_semester is not None else parsed.get("text_semester")
+    if parsed.get("pdf_table_preview"):
+        _save_pdf_table_preview(doc_instance, parsed["pdf_table_preview"])
+
+    doc_type = _detect_doc_type(detected_columns, schedule_rows)
+
+    # =========================
+    # 2) CHUNKING
+    # =========================
+    _report_progress(progress_callback, 50, "chunking")
+    chunk_payloads_all = _build_chunk_payloads(
+        doc_type=doc_type,
+        text_content=text_content,
+        row_chunks=row_chunks,
+        schedule_rows=schedule_rows,
+    )
+    chunk_payloads = [x for x in chunk_payloads_all if str(x.get("text") or "").strip()]
+    chunks = [str(x.get("text") or "") for x in chunk_payloads]
+
+    if not chunk_payloads:
+        logger.warning(" CHUNKING GAGAL: Tidak ada potongan teks untuk %s.", doc_instance.title)
+        return None
 
-        if not (text_content or "").strip():
-            logger.warning(" FILE KOSONG: %s tidak mengandung teks yang bisa dibaca.", doc_instance.title)
-            return False
-
-        doc_type = _detect_doc_type(detected_columns, schedule_rows)
-
-        # =========================
-        # 2) CHUNKING
-        # =========================
-        chunk_payloads_all = _build_chunk_payloads(
-            doc_type=doc_type,
-            text_content=text_content,
-            row_chunks=row_chunks,
-            schedule_rows=schedule_rows,
-        )
-        chunk_payloads = [x for x in chunk_payloads_all if str(x.get("text") or "").strip()]
-        chunks = [str(x.get("text") or "") for x in chunk_payloads]
-
-        if not chunk_payloads:
-            logger.warning(" CHUNKING GAGAL: Tidak ada potongan teks untuk %s.", doc_instance.title)
+    base_meta: Dict[str, Any] = {
+        "user_id": str(doc_instance.user.id),
+        "doc_id": str(doc_instance.id),          
+        "source": doc_instance.title,
+        "file_type": ext,
+    }
+
+    if detected_columns:
+        # Chroma metadata hanya menerima primitive -> simpan sebagai JSON string
+        base_meta["columns"] = json.dumps(detected_columns, ensure_ascii=True)
+
+    if schedule_rows:
+        if semester_num is not None:
+            for r in schedule_rows:
+                if isinstance(r, dict) and "semester" not in r:
+                    r["semester"] = str(semester_num)
+        # Baris disimpan sekali di tabel ScheduleRow; chunk hanya membawa referensi kecil.
+        base_meta["schedule_rows_ref"] = str(doc_instance.id)
+        base_meta["schedule_rows_count"] = len(schedule_rows)
+        # Tandai mode hybrid agar mudah audit hasil ingest.
+        hybrid_enabled = (os.environ.get("PDF_HYBRID_LLM_REPAIR", "1") or "1").strip() in {"1", "true", "yes"}
+        base_meta["hybrid_repair"] = "on" if hybrid_enabled else "off"
+
+    # selalu diganti: reingest tanpa tabel jadwal menghapus baris lama
+    _save_schedule_rows(doc_instance, schedule_rows or [])
+
+    if semester_num is not None:
+        base_meta["semester"] = int(semester_num)
+
+    base_meta["doc_type"] = doc_type
+    if row_chunks:
+        base_meta["table_format"] = "csv_canonical"
+    chunk_profile_enabled = (os.environ.get("RAG_DOC_CHUNK_PROFILE", "1") or "1").strip().lower() in {"1", "true", "yes"}
+    base_meta["chunk_profile"] = "on" if chunk_profile_enabled else "off"
+
+    metadatas: List[Dict[str, Any]] = []
+    for payload in chunk_payloads:
+        meta = dict(base_meta)
+        meta["chunk_kind"] = str(payload.get("chunk_kind") or "text")
+        if payload.get("page") is not None and str(payload.get("page")).strip():
+            try:
+                meta["page"] = int(payload.get("page"))
+            except Exception:
+                pass
+        section = str(payload.get("section") or "").strip()
+        if section:
+            meta["section"] = section
+        metadatas.append(meta)
+
+    logger.debug(" Chunk siap disimpan: chunks=%s cols=%s schedule_rows=%s",
+                 len(chunks), len(detected_columns or []), len(schedule_rows or []))
+    return {
+        "doc": doc_instance,
+        "shared": bool(shared_mode and content_hash),
+        "content_hash": content_hash,
+        "refresh": not use_extraction_cache,
+        "text_semester": parsed.get("text_semester"),
+        "payloads": chunk_payloads,
+        "chunks": chunks,
+        "metadatas": metadatas,
+        "ids": _chunk_ids(base_meta["doc_id"], chunk_payloads),
+    }
+
+
+def prepare_document(
+    doc_instance,
+    progress_callback: Optional[ProgressCallback] = None,
+    use_extraction_cache: bool = True,
+) -> Optional[Dict[str, Any]]:
+    """
+    Tahap parsing + chunking process_document tanpa menulis ke Chroma.
+    Return dokumen siap simpan (chunks, metadatas, ids) atau None jika gagal / kosong.
+    Dipakai bulk reingest: parse paralel, lalu tulis vector banyak dokumen sekaligus.
+    Baris jadwal sudah disimpan ke tabel ScheduleRow di tahap ini; metadata chunk
+    hanya membawa schedule_rows_ref.
+    """
+    try:
+        return _prepare_document(doc_instance, progress_callback, use_extraction_cache)
+    except Exception as e:
+        logger.error(" CRITICAL ERROR di ingest.py pada file %s: %s", doc_instance.title, str(e), exc_info=True)
+        return None
+
+
+def index_sparse_chunks(prepared: Dict[str, Any]) -> None:
+    # BM25 tetap per user (teks saja, murah); metadata milik dokumen user sendiri
+    doc_instance = prepared["doc"]
+    sparse_index.add_document_chunks(
+        user_id=doc_instance.user.id,
+        doc_id=doc_instance.id,
+        texts=prepared["chunks"],
+        metadatas=prepared["metadatas"],
+    )
+
+
+def _store_prepared(prepared: Dict[str, Any]) -> None:
+    doc_instance = prepared["doc"]
+    if prepared["shared"]:
+        # chunk bersama di collection dasar
+        _add_shared_chunks(
+            get_vectorstore(),
+            prepared["payloads"],
+            prepared["chunks"],
+            prepared["metadatas"],
+            prepared["content_hash"],
+            refresh=prepared["refresh"],
+            text_semester=prepared.get("text_semester"),
+        )
+    else:
+        # chunk per user di shard user (RAG_VECTOR_SHARDING); upsert diff:
+        # hanya chunk baru yang di-embed, chunk hilang dihapus
+        user_id = str(doc_instance.user.id)
+        stats = upsert_doc_chunks(
+            get_vectorstore(collection_for_user(doc_instance.user.id)),
+            where={"$and": [{"user_id": user_id}, {"doc_id": str(doc_instance.id)}]},
+            ids=prepared["ids"],
+            texts=prepared["chunks"],
+            metadatas=prepared["metadatas"],
+        )
+        _log_upsert(doc_instance.title, stats)
+    index_sparse_chunks(prepared)
+    bump_corpus_version(doc_instance.user.id)
+
+
+def process_document(
+    doc_instance,
+    progress_callback: Optional[ProgressCallback] = None,
+    use_extraction_cache: bool = True,
+) -> bool:
+    """
+    Membaca file PDF/Excel/CSV/MD/TXT, memecahnya, dan menyimpan ke ChromaDB
+    dengan metadata:
+    - user_id (isolasi data)
+    - doc_id (penting untuk delete/reingest)
+    - source, file_type
+    - columns (schema) termasuk PDF
+    - schedule_rows_ref (khusus KRS/Jadwal): referensi ke baris dokumen ini di
+      tabel ScheduleRow (baris jadwal disimpan di tabel, bukan di metadata chunk)
+
+    progress_callback(pct, stage) opsional, dipanggil di tiap tahap
+    (parsing -> repair -> chunking -> embedding -> done) untuk antrian ingest.
+
+    Hasil parsing di-cache per sha256 file (RAG_EXTRACTION_CACHE=1); reingest file
+    yang tidak berubah langsung ke chunking. use_extraction_cache=False memaksa parse ulang
+    (dan embed ulang chunk bersama bila RAG_SHARED_DOCS=1).
+    """
+    try:
+        prepared = _prepare_document(doc_instance, progress_callback, use_extraction_cache)
+        if prepared is None:
             return False
 
         # =========================
         # 3) EMBEDDING & STORAGE
         # =========================
-        vectorstore = get_vectorstore()
-
-        base_meta: Dict[str, Any] = {
-            "user_id": str(doc_instance.user.id),
-            "doc_id": str(doc_instance.id),          
-            "source": doc_instance.title,
-            "file_type": ext,
-        }
-
-        if detected_columns:
-            # Chroma metadata hanya menerima primitive -> simpan sebagai JSON string
-            base_meta["columns"] = json.dumps(detected_columns, ensure_ascii=True)
-
-        if schedule_rows:
-            if semester_num is not None:
-                for r in schedule_rows:
-                    if isinstance(r, dict) and "semester" not in r:
-                        r["semester"] = str(semester_num)
-            # simpan lebih banyak agar dokumen jadwal besar tidak banyak terpotong.
-            base_meta["schedule_rows"] = json.dumps(schedule_rows[:1200], ensure_ascii=True)
-            # Tandai mode hybrid agar mudah audit hasil ingest.
-            hybrid_enabled = (os.environ.get("PDF_HYBRID_LLM_REPAIR", "1") or "1").strip() in {"1", "true", "yes"}
-            base_meta["hybrid_repair"] = "on" if hybrid_enabled else "off"
-
-        if semester_num is not None:
-            base_meta["semester"] = int(semester_num)
-
-        base_meta["doc_type"] = doc_type
-        if row_chunks:
-            base_meta["table_format"] = "csv_canonical"
-        chunk_profile_enabled = (os.environ.get("RAG_DOC_CHUNK_PROFILE", "1") or "1").strip().lower() in {"1", "true", "yes"}
-        base_meta["chunk_profile"] = "on" if chunk_profile_enabled else "off"
-
-        metadatas: List[Dict[str, Any]] = []
-        for payload in chunk_payloads:
-            meta = dict(base_meta)
-            meta["chunk_kind"] = str(payload.get("chunk_kind") or "text")
-            if payload.get("page") is not None and str(payload.get("page")).strip():
-                try:
-                    meta["page"] = int(payload.get("page"))
-                except Exception:
-                    pass
-            section = str(payload.get("section") or "").strip()
-            if section:
-                meta["section"] = section
-            metadatas.append(meta)
-
-        logger.debug(" Menyimpan ke ChromaDB... chunks=%s cols=%s schedule_rows=%s",
-                     len(chunks), len(detected_columns or []), len(schedule_rows or []))
-
-        vectorstore.add_texts(texts=chunks, metadatas=metadatas)
+        _report_progress(progress_callback, 65, "embedding")
+        _store_prepared(prepared)
 
         logger.info(" INGEST SELESAI: %s berhasil masuk Knowledge Base.", doc_instance.title)
+        _report_progress(progress_callback, 100, "done")
         return True
 
     except Exception as e:
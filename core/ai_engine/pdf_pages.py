@@ -0,0 +1,177 @@
+# core/ai_engine/pdf_pages.py
+"""
+Ekstraksi mentah halaman PDF (tabel + teks) untuk ingest.
+
+Parsing layout pdfplumber adalah bagian paling berat (CPU-bound) dari ingest PDF.
+Modul ini sengaja ringan (hanya pdfplumber) supaya bisa dijalankan di process pool:
+tiap worker membuka PDF sekali lalu mengekstrak satu rentang halaman. Hasilnya
+digabung kembali sesuai urutan halaman; state lintas halaman (carry hari/sesi/jam)
+diselesaikan di ingest._merge_pdf_pages secara serial dan deterministik.
+
+Tiap halaman di-parse sekali menjadi PageArtifact (sel tabel + teks); semua konsumen
+(tabel/schedule_rows, teks RAG, preview header tabel untuk planner) membaca artifact
+ini, dan cache layout halaman langsung dilepas supaya memori tetap datar.
+"""
+from __future__ import annotations
+
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Iterator, List, NamedTuple, Optional, Tuple
+
+import pdfplumber
+
+logger = logging.getLogger(__name__)
+
+
+class PageArtifact(NamedTuple):
+    page: int  # 1-based
+    tables: List[List[List[Any]]]  # sel tabel mentah (pdfplumber extract_tables)
+    text: str  # teks halaman (strip)
+
+
+_POOL_LOCK = threading.Lock()
+_POOL: Optional[ProcessPoolExecutor] = None
+_POOL_SIZE = 0
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.environ.get(name, str(default)))
+    except Exception:
+        return default
+
+
+def parallel_workers() -> int:
+    # 0/1 = serial; default jumlah core
+    return max(1, _env_int("PDF_PARALLEL_WORKERS", os.cpu_count() or 1))
+
+
+def parallel_min_pages() -> int:
+    # PDF kecil lebih cepat serial (overhead start worker + buka PDF per worker)
+    return max(2, _env_int("PDF_PARALLEL_MIN_PAGES", 8))
+
+
+def _release_page(page) -> None:
+    # pdfplumber menyimpan objek layout per halaman sampai PDF ditutup;
+    # lepas segera supaya RSS tidak tumbuh linear dengan jumlah halaman
+    for name in ("flush_cache", "close"):
+        fn = getattr(page, name, None)
+        if callable(fn):
+            try:
+                fn()
+            except Exception:
+                pass
+
+
+def extract_page_artifact(page, page_idx: int) -> PageArtifact:
+    """
+    Parse 1 halaman sekali: char/objek layout di-cache pdfplumber pada objek page,
+    dipakai bersama oleh extract_tables() dan extract_text(), lalu dilepas.
+    """
+    try:
+        try:
+            tables = page.extract_tables() or []
+        except Exception:
+            tables = []
+        try:
+            text = (page.extract_text() or "").strip()
+        except Exception:
+            text = ""
+        return PageArtifact(page_idx, tables, text)
+    finally:
+        _release_page(page)
+
+
+def iter_page_artifacts(pdf, max_pages: Optional[int] = None) -> Iterator[PageArtifact]:
+    pages = pdf.pages if max_pages is None else pdf.pages[:max_pages]
+    for i, page in enumerate(pages, start=1):
+        yield extract_page_artifact(page, i)
+
+
+def extract_page_range(file_path: str, start: int, end: int) -> List[PageArtifact]:
+    """Worker: buka PDF sekali, ekstrak halaman [start, end) (0-based)."""
+    out: List[PageArtifact] = []
+    with pdfplumber.open(file_path) as pdf:
+        for i in range(start, min(end, len(pdf.pages))):
+            out.append(extract_page_artifact(pdf.pages[i], i + 1))
+    return out
+
+
+def extract_pages_serial(pdf) -> List[PageArtifact]:
+    return list(iter_page_artifacts(pdf))
+
+
+def table_preview_rows(
+    pages: List[PageArtifact],
+    max_pages: int = 2,
+    max_tables: int = 5,
+    max_rows: int = 2,
+) -> List[List[str]]:
+    """
+    Baris awal (kandidat header) tabel di halaman pertama. Disimpan saat ingest
+    supaya planner tidak perlu membuka & parsing ulang PDF untuk deteksi kolom.
+    """
+    out: List[List[str]] = []
+    for art in pages[:max_pages]:
+        for tb in (art.tables or [])[:max_tables]:
+            if not tb:
+                continue
+            rows = [[str(c or "").strip() for c in row] for row in tb if row]
+            out.extend(rows[:max_rows])
+    return out
+
+
+def _get_pool(size: int) -> ProcessPoolExecutor:
+    global _POOL, _POOL_SIZE
+    with _POOL_LOCK:
+        if _POOL is None or _POOL_SIZE != size:
+            if _POOL is not None:
+                _POOL.shutdown(wait=False, cancel_futures=True)
+            # spawn: aman dipakai dari proses yang punya thread (ingest_worker, runserver)
+            ctx = multiprocessing.get_context(os.environ.get("PDF_PARALLEL_START_METHOD", "spawn"))
+            _POOL = ProcessPoolExecutor(max_workers=size, mp_context=ctx)
+            _POOL_SIZE = size
+        return _POOL
+
+
+def shutdown_pool() -> None:
+    global _POOL, _POOL_SIZE
+    with _POOL_LOCK:
+        if _POOL is not None:
+            _POOL.shutdown(wait=False, cancel_futures=True)
+        _POOL = None
+        _POOL_SIZE = 0
+
+
+def _page_ranges(page_count: int, workers: int) -> List[Tuple[int, int]]:
+    # ~2 rentang per worker supaya halaman berat tidak menumpuk di satu worker
+    n_chunks = max(1, min(page_count, workers * 2))
+    step = -(-page_count // n_chunks)
+    return [(s, min(s + step, page_count)) for s in range(0, page_count, step)]
+
+
+def extract_pdf_pages(file_path: str, pdf) -> List[PageArtifact]:
+    """
+    Ekstrak semua halaman, paralel bila PDF cukup besar dan PDF_PARALLEL_WORKERS > 1.
+    Hasil selalu urut halaman; jika pool gagal, fallback ke serial memakai `pdf` terbuka.
+    """
+    page_count = len(pdf.pages)
+    workers = min(parallel_workers(), page_count)
+    if workers <= 1 or page_count < parallel_min_pages():
+        return extract_pages_serial(pdf)
+
+    try:
+        pool = _get_pool(workers)
+        futures = [pool.submit(extract_page_range, file_path, s, e) for s, e in _page_ranges(page_count, workers)]
+        pages: List[PageArtifact] = []
+        for fut in futures:  # urutan submit == urutan halaman
+            pages.extend(fut.result())
+        logger.info(" PDF parallel extract pages=%s workers=%s", page_count, workers)
+        return pages
+    except Exception as e:
+        logger.warning(" PDF parallel extract gagal, fallback serial: %r", e)
+        shutdown_pool()
+        return extract_pages_serial(pdf)
@@ -0,0 +1,69 @@
+# core/ai_engine/repair_memo.py
+"""
+Memo persisten untuk hybrid LLM row repair.
+
+Row jadwal yang rusak (nama mata kuliah terpotong, jam rusak, dst.) berulang di
+setiap salinan PDF jadwal fakultas dan setiap reingest. Hasil repair LLM disimpan
+per fingerprint row (payload["row"] tanpa nomor halaman + issues + model repair),
+sehingga row yang sama berikutnya diperbaiki dari tabel ini tanpa call LLM dan hasilnya
+deterministik. Ganti INGEST_REPAIR_MODEL -> memo model lama tidak dipakai.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+from typing import Any, Dict, Iterable
+
+from django.db.models import F
+
+from ..models import RowRepairMemo
+
+logger = logging.getLogger(__name__)
+
+# Naikkan jika prompt / format output repair berubah -> memo lama tidak dipakai lagi
+REPAIR_MEMO_VERSION = "1"
+
+
+def memo_enabled() -> bool:
+    val = str(os.environ.get("RAG_REPAIR_MEMO", "1")).strip().lower()
+    return val in {"1", "true", "yes", "on"}
+
+
+def row_fingerprint(payload: Dict[str, Any], model_name: str = "") -> str:
+    row = {k: v for k, v in (payload.get("row") or {}).items() if k != "page"}
+    key = {
+        "v": REPAIR_MEMO_VERSION,
+        "model": str(model_name or ""),
+        "row": row,
+        "issues": sorted(payload.get("issues") or []),
+    }
+    return hashlib.sha256(json.dumps(key, sort_keys=True, ensure_ascii=True).encode("utf-8")).hexdigest()
+
+
+def lookup_many(fingerprints: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+    fps = sorted(set(fingerprints))
+    if not fps:
+        return {}
+    try:
+        found = dict(RowRepairMemo.objects.filter(fingerprint__in=fps).values_list("fingerprint", "repaired"))
+        if found:
+            RowRepairMemo.objects.filter(fingerprint__in=list(found)).update(hits=F("hits") + 1)
+        return {fp: dict(item or {}) for fp, item in found.items()}
+    except Exception as e:
+        # memo hanya optimasi; kalau DB bermasalah semua row dianggap miss
+        logger.warning(" repair memo read gagal: %s", e)
+        return {}
+
+
+def store_many(items: Dict[str, Dict[str, Any]]) -> None:
+    if not items:
+        return
+    try:
+        RowRepairMemo.objects.bulk_create(
+            [RowRepairMemo(fingerprint=fp, repaired=item) for fp, item in items.items()],
+            ignore_conflicts=True,
+        )
+    except Exception as e:
+        logger.warning(" repair memo write gagal: %s", e)
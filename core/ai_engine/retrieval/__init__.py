@@ -1,3 +1,3 @@
-from .main import ask_bot
+from .main import aask_bot, ask_bot, ask_bot_stream
 
-__all__ = ["ask_bot"]
+__all__ = ["aask_bot", "ask_bot", "ask_bot_stream"]
@@ -1,8 +1,11 @@
 import logging
 from typing import Any, Dict, List, Sequence, Tuple
 
+from langchain_core.documents import Document
 from rank_bm25 import BM25Okapi
 
+from .. import sparse_index
+
 logger = logging.getLogger(__name__)
 
 
@@ -19,7 +22,7 @@ def _doc_key(doc: Any) -> str:
 
 
 def _tokenize(text: str) -> List[str]:
-    return [x for x in str(text or "").lower().strip().split() if x]
+    return sparse_index.tokenize(text)
 
 
 def retrieve_dense(vectorstore: Any, query: str, k: int, filter_where: Dict[str, Any] | None = None) -> List[DocScore]:
@@ -29,7 +32,79 @@ def retrieve_dense(vectorstore: Any, query: str, k: int, filter_where: Dict[str,
         return []
 
 
-def retrieve_sparse_bm25(query: str, docs_pool: Sequence[Any], k: int) -> List[DocScore]:
+def _embed_queries(embedding: Any, queries: Sequence[str]) -> List[List[float]]:
+    batch_fn = getattr(embedding, "embed_queries", None)
+    if callable(batch_fn):
+        return batch_fn(list(queries))
+    return [embedding.embed_query(q) for q in queries]
+
+
+def retrieve_dense_multi(
+    vectorstore: Any,
+    queries: Sequence[str],
+    k: int,
+    filter_where: Dict[str, Any] | None = None,
+) -> List[List[DocScore]]:
+    """
+    Dense retrieval untuk beberapa varian query sekaligus:
+    1 forward pass embedding (batch) + 1 query batched ke collection Chroma.
+    Fallback ke retrieve_dense per varian jika jalur batch gagal.
+    """
+    queries = [q for q in queries if str(q or "").strip()]
+    if not queries:
+        return []
+    try:
+        embedding = getattr(vectorstore, "embeddings", None)
+        col = getattr(vectorstore, "_collection", None)
+        if embedding is None or col is None:
+            raise RuntimeError("vectorstore tidak mendukung batch query")
+        vectors = _embed_queries(embedding, queries)
+        res = col.query(
+            query_embeddings=vectors,
+            n_results=max(1, int(k)),
+            where=filter_where or None,
+            include=["documents", "metadatas", "distances"],
+        )
+        out: List[List[DocScore]] = []
+        docs_rows = res.get("documents") or []
+        metas_rows = res.get("metadatas") or []
+        dists_rows = res.get("distances") or []
+        for i in range(len(queries)):
+            docs = docs_rows[i] if i < len(docs_rows) else []
+            metas = metas_rows[i] if i < len(metas_rows) else []
+            dists = dists_rows[i] if i < len(dists_rows) else []
+            scored: List[DocScore] = []
+            for j, text in enumerate(docs or []):
+                if text is None:
+                    continue
+                meta = (metas[j] if j < len(metas) else None) or {}
+                dist = float(dists[j]) if j < len(dists) else 0.0
+                scored.append((Document(page_content=text, metadata=dict(meta)), dist))
+            out.append(scored)
+        return out
+    except Exception as e:
+        logger.debug("Batch dense retrieval fallback per-query err=%s", e)
+        return [retrieve_dense(vectorstore, q, k=k, filter_where=filter_where) for q in queries]
+
+
+def retrieve_sparse_bm25(
+    query: str,
+    docs_pool: Sequence[Any],
+    k: int,
+    user_id: Any = None,
+    filter_where: Dict[str, Any] | None = None,
+) -> List[DocScore]:
+    """
+    BM25 atas korpus user (index persisten) jika user_id diberikan dan index tersedia.
+    Fallback: BM25 ad-hoc atas docs_pool (data lama yang belum ter-index).
+    """
+    if user_id is not None and sparse_index.has_index(user_id):
+        try:
+            hits = sparse_index.search(user_id, query, k=k, filter_where=filter_where)
+            if hits:
+                return hits
+        except Exception as e:
+            logger.warning("BM25 index search gagal user_id=%s err=%s; fallback pool", user_id, e)
     if not docs_pool:
         return []
     tokenized_corpus = [_tokenize(getattr(d, "page_content", "")) for d in docs_pool]
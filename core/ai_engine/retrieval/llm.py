@@ -1,9 +1,17 @@
+import asyncio
+import logging
 import os
-from typing import Dict, Any
-from django.db import OperationalError, ProgrammingError
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple, TypeVar
+from asgiref.sync import sync_to_async
+from django.db import OperationalError, ProgrammingError, connections
 
 from langchain_openai import ChatOpenAI
 
+from . import model_health
+
 DEFAULT_MODEL = "qwen/qwen3-next-80b-a3b-instruct:free"
 DEFAULT_BACKUP_MODELS = [
     "nvidia/nemotron-3-nano-30b-a3b:free",
@@ -13,6 +21,10 @@ DEFAULT_BACKUP_MODELS = [
     "meta-llama/llama-3.3-70b-instruct:free",
 ]
 
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
 
 def _parse_models(raw: str | None) -> list[str]:
     text = (raw or "").replace("\r", "\n")
@@ -21,7 +33,83 @@ def _parse_models(raw: str | None) -> list[str]:
     return [x for x in items if x]
 
 
+# Cache config + registry client per proses.
+# Invalidasi lewat signal LLMConfiguration (core/signals.py); TTL sebagai pengaman
+# untuk worker lain yang tidak menerima signal dari proses admin.
+_CONFIG_LOCK = threading.Lock()
+_CONFIG_CACHE: Dict[str, Any] = {"cfg": None, "loaded_at": 0.0, "env": None}
+_CONFIG_ENV_KEYS = (
+    "OPENROUTER_API_KEY",
+    "OPENROUTER_MODEL",
+    "OPENROUTER_BACKUP_MODELS",
+    "OPENROUTER_TIMEOUT",
+    "OPENROUTER_MAX_RETRIES",
+    "OPENROUTER_TEMPERATURE",
+    "OPENROUTER_HEDGE_DELAY",
+    "OPENROUTER_HEDGE_MAX_PARALLEL",
+)
+_CLIENT_LOCK = threading.Lock()
+_CLIENTS: Dict[Tuple[str, str, int, float, int], ChatOpenAI] = {}
+_HTTP_CLIENTS: Dict[int, Any] = {}
+
+
+def _config_ttl_seconds() -> float:
+    try:
+        return float(os.environ.get("OPENROUTER_CONFIG_CACHE_TTL", "30"))
+    except Exception:
+        return 30.0
+
+
 def get_runtime_openrouter_config() -> Dict[str, Any]:
+    """
+    Config OpenRouter aktif (DB > env), di-cache per proses.
+    Return salinan dict supaya caller bebas memodifikasi.
+    """
+    ttl = _config_ttl_seconds()
+    now = time.monotonic()
+    env_fp = tuple(os.environ.get(k) for k in _CONFIG_ENV_KEYS)
+    with _CONFIG_LOCK:
+        cached = _CONFIG_CACHE.get("cfg")
+        if (
+            cached is not None
+            and ttl > 0
+            and _CONFIG_CACHE.get("env") == env_fp
+            and (now - float(_CONFIG_CACHE["loaded_at"])) < ttl
+        ):
+            return _copy_cfg(cached)
+
+    cfg = _load_runtime_openrouter_config()
+    with _CONFIG_LOCK:
+        _CONFIG_CACHE["cfg"] = cfg
+        _CONFIG_CACHE["loaded_at"] = now
+        _CONFIG_CACHE["env"] = env_fp
+    return _copy_cfg(cfg)
+
+
+def _copy_cfg(cfg: Dict[str, Any]) -> Dict[str, Any]:
+    out = dict(cfg)
+    out["backup_models"] = list(cfg.get("backup_models") or [])
+    return out
+
+
+def invalidate_runtime_openrouter_config() -> None:
+    with _CONFIG_LOCK:
+        _CONFIG_CACHE["cfg"] = None
+        _CONFIG_CACHE["loaded_at"] = 0.0
+        _CONFIG_CACHE["env"] = None
+
+
+def _env_float_or_none(name: str) -> Optional[float]:
+    raw = str(os.environ.get(name, "") or "").strip()
+    if not raw:
+        return None
+    try:
+        return float(raw)
+    except Exception:
+        return None
+
+
+def _load_runtime_openrouter_config() -> Dict[str, Any]:
     env_backups = _parse_models(os.environ.get("OPENROUTER_BACKUP_MODELS", ""))
     if not env_backups:
         env_backups = list(DEFAULT_BACKUP_MODELS)
@@ -33,6 +121,9 @@ def get_runtime_openrouter_config() -> Dict[str, Any]:
         "timeout": int(os.environ.get("OPENROUTER_TIMEOUT", "45")),
         "max_retries": int(os.environ.get("OPENROUTER_MAX_RETRIES", "1")),
         "temperature": float(os.environ.get("OPENROUTER_TEMPERATURE", "0.2")),
+        # kosong -> hedge_delay_for() menurunkan jeda dari p95 latency model
+        "hedge_delay": _env_float_or_none("OPENROUTER_HEDGE_DELAY"),
+        "hedge_max_parallel": int(os.environ.get("OPENROUTER_HEDGE_MAX_PARALLEL", "3")),
     }
 
     try:
@@ -70,22 +161,77 @@ def get_backup_models(primary_model: str, configured_backup_models: list[str] |
         if not name or name in out:
             continue
         out.append(name)
-    return out
+    # model dengan circuit OPEN / error rate tinggi dipindah ke belakang
+    return model_health.order_models(out)
 
 
-def build_llm(model_name: str, cfg: Dict[str, Any]) -> ChatOpenAI:
-    return ChatOpenAI(
-        openai_api_key=cfg.get("api_key"),
-        openai_api_base="https://openrouter.ai/api/v1",
-        model_name=model_name,
-        temperature=float(cfg.get("temperature", 0.2)),
-        request_timeout=int(cfg.get("timeout", 45)),
-        max_retries=int(cfg.get("max_retries", 1)),
-        default_headers={
-            "HTTP-Referer": "http://localhost:8000",
-            "X-Title": "AcademicChatbot",
-        },
+def _shared_http_client(timeout: int) -> Any:
+    """
+    httpx.Client dengan keep-alive pool, dibagi semua ChatOpenAI dengan timeout sama.
+    Return None jika httpx tidak tersedia (ChatOpenAI akan membuat client sendiri).
+    """
+    client = _HTTP_CLIENTS.get(timeout)
+    if client is not None:
+        return client
+    try:
+        import httpx
+    except Exception:
+        return None
+    client = httpx.Client(
+        timeout=timeout,
+        limits=httpx.Limits(max_connections=50, max_keepalive_connections=20, keepalive_expiry=60),
     )
+    _HTTP_CLIENTS[timeout] = client
+    return client
+
+
+def build_llm(model_name: str, cfg: Dict[str, Any]) -> ChatOpenAI:
+    """
+    Ambil ChatOpenAI dari registry per (model, api_key, timeout, temperature, max_retries).
+    Instance dipakai ulang antar request agar koneksi HTTP (TLS) tidak dibuka ulang.
+    """
+    api_key = str(cfg.get("api_key") or "")
+    timeout = int(cfg.get("timeout", 45))
+    temperature = float(cfg.get("temperature", 0.2))
+    max_retries = int(cfg.get("max_retries", 1))
+    key = (model_name, api_key, timeout, temperature, max_retries)
+
+    with _CLIENT_LOCK:
+        llm = _CLIENTS.get(key)
+        if llm is not None:
+            return llm
+
+        kwargs: Dict[str, Any] = {}
+        http_client = _shared_http_client(timeout)
+        if http_client is not None:
+            kwargs["http_client"] = http_client
+        llm = ChatOpenAI(
+            openai_api_key=api_key or None,
+            openai_api_base="https://openrouter.ai/api/v1",
+            model_name=model_name,
+            temperature=temperature,
+            request_timeout=timeout,
+            max_retries=max_retries,
+            default_headers={
+                "HTTP-Referer": "http://localhost:8000",
+                "X-Title": "AcademicChatbot",
+            },
+            **kwargs,
+        )
+        _CLIENTS[key] = llm
+        return llm
+
+
+def clear_llm_clients() -> None:
+    """Kosongkan registry client (mis. setelah API key diganti)."""
+    with _CLIENT_LOCK:
+        _CLIENTS.clear()
+        for client in _HTTP_CLIENTS.values():
+            try:
+                client.close()
+            except Exception:
+                pass
+        _HTTP_CLIENTS.clear()
 
 
 def invoke_text(llm: ChatOpenAI, prompt: str) -> str:
@@ -95,5 +241,231 @@ def invoke_text(llm: ChatOpenAI, prompt: str) -> str:
     return str(out)
 
 
+async def ainvoke_text(llm: ChatOpenAI, prompt: str) -> str:
+    out = await llm.ainvoke(prompt)
+    if hasattr(out, "content"):
+        return out.content or ""
+    return str(out)
+
+
 def llm_fallback_message(last_error: str) -> Dict[str, Any]:
     return {"answer": f"Maaf, semua server AI sedang sibuk. (Error: {last_error})", "sources": []}
+
+
+class HedgedInvokeError(Exception):
+    """Semua model gagal / tidak memberi jawaban valid."""
+
+    def __init__(self, last_error: str = ""):
+        super().__init__(last_error or "no valid answer")
+        self.last_error = last_error or "no valid answer"
+
+
+def hedge_delay_for(model_name: str, cfg: Dict[str, Any]) -> float:
+    """
+    Jeda sebelum hedge ke model berikutnya.
+    OPENROUTER_HEDGE_DELAY eksplisit dipakai apa adanya. Default: p95 latency sukses
+    model pertama (min 5 sampel di window health), atau 0.8 x timeout jika belum ada data,
+    sehingga hedge hanya terjadi untuk call yang benar-benar lebih lambat dari biasanya.
+    """
+    explicit = cfg.get("hedge_delay")
+    if explicit is not None:
+        return max(0.0, float(explicit))
+    timeout = max(1.0, float(cfg.get("timeout") or 45))
+    try:
+        stats = model_health.get_model_stats(model_name)
+        if stats["p95_ms"] and stats["calls"] - stats["errors"] >= 5:
+            return min(timeout, max(1.0, stats["p95_ms"] / 1000.0))
+    except Exception as e:
+        logger.debug("hedge delay: stats gagal model=%s err=%r", model_name, e)
+    return 0.8 * timeout
+
+
+def invoke_hedged(
+    models: list[str],
+    call: Callable[[str], T],
+    cfg: Dict[str, Any] | None = None,
+    is_valid: Optional[Callable[[T], bool]] = None,
+    request_id: str = "-",
+    label: str = "LLM",
+) -> Tuple[str, int, T]:
+    """
+    Jalankan `call(model_name)` secara hedged di atas daftar model (urut prioritas).
+
+    - Model pertama dijalankan dulu.
+    - Jika belum selesai setelah hedge_delay_for() detik, atau ada model yang gagal,
+      model berikutnya ikut dijalankan paralel (maks `hedge_max_parallel`).
+    - Jawaban valid pertama yang dipakai; sisa request dibatalkan (yang belum
+      mulai dibatalkan, yang sedang berjalan diabaikan hasilnya).
+
+    Return (model_name, idx, result). Raise HedgedInvokeError jika semua gagal.
+    """
+    cfg = cfg or {}
+    max_parallel = max(1, int(cfg.get("hedge_max_parallel", 3)))
+    check = is_valid or bool
+
+    names = [m for m in models if (m or "").strip()]
+    if not names:
+        raise HedgedInvokeError("no model configured")
+    hedge_delay = hedge_delay_for(names[0], cfg)
+
+    executor = ThreadPoolExecutor(max_workers=min(max_parallel, len(names)), thread_name_prefix="llm-hedge")
+    pending: Dict[Future, Tuple[int, str]] = {}
+    next_idx = 0
+    last_error = ""
+
+    def _timed_call(name: str) -> T:
+        t0 = time.monotonic()
+        try:
+            try:
+                result = call(name)
+            except Exception as e:
+                model_health.record_result(name, time.monotonic() - t0, ok=False, error=str(e))
+                raise
+            model_health.record_result(name, time.monotonic() - t0, ok=check(result), error="empty answer")
+            return result
+        finally:
+            # koneksi DB milik thread hedge ditutup agar tidak bocor
+            connections.close_all()
+
+    def _launch_next() -> None:
+        nonlocal next_idx
+        idx, name = next_idx, names[next_idx]
+        next_idx += 1
+        logger.info(" %s try idx=%s model=%s", label, idx, name, extra={"request_id": request_id})
+        pending[executor.submit(_timed_call, name)] = (idx, name)
+
+    try:
+        _launch_next()
+        while pending:
+            can_hedge = next_idx < len(names) and len(pending) < max_parallel
+            done, _ = wait(list(pending), timeout=hedge_delay if can_hedge else None, return_when=FIRST_COMPLETED)
+            if not done:
+                # model yang berjalan lambat -> hedge ke model berikutnya
+                _launch_next()
+                continue
+
+            for fut in sorted(done, key=lambda f: pending[f][0]):
+                idx, name = pending.pop(fut)
+                try:
+                    result = fut.result()
+                except Exception as e:
+                    last_error = str(e)
+                    err_preview = last_error if len(last_error) <= 200 else last_error[:200] + "..."
+                    logger.warning(
+                        " %s fail idx=%s model=%s err=%s",
+                        label, idx, name, err_preview,
+                        extra={"request_id": request_id},
+                    )
+                    continue
+                if check(result):
+                    for other in pending:
+                        other.cancel()
+                    return name, idx, result
+                last_error = f"empty answer from {name}"
+                logger.warning(" %s empty idx=%s model=%s", label, idx, name, extra={"request_id": request_id})
+
+            # kegagalan langsung memicu model berikutnya (tanpa menunggu hedge_delay)
+            if next_idx < len(names) and len(pending) < max_parallel:
+                _launch_next()
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    raise HedgedInvokeError(last_error)
+
+
+def _closing_db(fn: Callable[..., T]) -> Callable[..., T]:
+    """Bungkus fungsi DB yang dijalankan di thread executor: koneksi thread ditutup setelahnya."""
+    def _wrapped(*args, **kwargs) -> T:
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            connections.close_all()
+    return _wrapped
+
+
+# scoreboard kesehatan ada di DB -> dicatat dari thread, bukan dari event loop
+_arecord = sync_to_async(_closing_db(model_health.record_result), thread_sensitive=False)
+
+
+async def ainvoke_hedged(
+    models: list[str],
+    call: Callable[[str], Awaitable[T]],
+    cfg: Dict[str, Any] | None = None,
+    is_valid: Optional[Callable[[T], bool]] = None,
+    request_id: str = "-",
+    label: str = "LLM",
+) -> Tuple[str, int, T]:
+    """
+    Versi async invoke_hedged(): aturan hedging sama, tetapi setiap model berjalan
+    sebagai task di event loop, dan task yang kalah benar-benar di-cancel.
+    """
+    cfg = cfg or {}
+    max_parallel = max(1, int(cfg.get("hedge_max_parallel", 3)))
+    check = is_valid or bool
+
+    names = [m for m in models if (m or "").strip()]
+    if not names:
+        raise HedgedInvokeError("no model configured")
+    hedge_delay = await sync_to_async(_closing_db(hedge_delay_for), thread_sensitive=False)(names[0], cfg)
+
+    pending: Dict[asyncio.Task, Tuple[int, str]] = {}
+    next_idx = 0
+    last_error = ""
+
+    async def _timed_call(name: str) -> T:
+        t0 = time.monotonic()
+        try:
+            result = await call(name)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            await _arecord(name, time.monotonic() - t0, ok=False, error=str(e))
+            raise
+        await _arecord(name, time.monotonic() - t0, ok=check(result), error="empty answer")
+        return result
+
+    def _launch_next() -> None:
+        nonlocal next_idx
+        idx, name = next_idx, names[next_idx]
+        next_idx += 1
+        logger.info(" %s try idx=%s model=%s", label, idx, name, extra={"request_id": request_id})
+        pending[asyncio.ensure_future(_timed_call(name))] = (idx, name)
+
+    try:
+        _launch_next()
+        while pending:
+            can_hedge = next_idx < len(names) and len(pending) < max_parallel
+            done, _ = await asyncio.wait(
+                list(pending),
+                timeout=hedge_delay if can_hedge else None,
+                return_when=asyncio.FIRST_COMPLETED,
+            )
+            if not done:
+                _launch_next()
+                continue
+
+            for task in sorted(done, key=lambda t: pending[t][0]):
+                idx, name = pending.pop(task)
+                try:
+                    result = task.result()
+                except Exception as e:
+                    last_error = str(e)
+                    err_preview = last_error if len(last_error) <= 200 else last_error[:200] + "..."
+                    logger.warning(
+                        " %s fail idx=%s model=%s err=%s",
+                        label, idx, name, err_preview,
+                        extra={"request_id": request_id},
+                    )
+                    continue
+                if check(result):
+                    return name, idx, result
+                last_error = f"empty answer from {name}"
+                logger.warning(" %s empty idx=%s model=%s", label, idx, name, extra={"request_id": request_id})
+
+            if next_idx < len(names) and len(pending) < max_parallel:
+                _launch_next()
+    finally:
+        for task in pending:
+            task.cancel()
+
+    raise HedgedInvokeError(last_error)
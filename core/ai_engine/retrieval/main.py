@@ -1,19 +1,46 @@
 import os
 import re
 import time
+import math
+import hashlib
 import logging
-from typing import Dict, Any, List
+from typing import Dict, Any, Iterator, List, Optional
+
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
 
 from langchain_classic.chains.combine_documents import create_stuff_documents_chain
 from langchain_core.prompts import ChatPromptTemplate
 
-from ..config import get_vectorstore
-from .hybrid import retrieve_dense, retrieve_sparse_bm25, fuse_rrf
+from ..config import (
+    DEFAULT_COLLECTION,
+    collection_for_user,
+    get_embedding_function,
+    get_query_embedding_cache_stats,
+    get_vectorstore,
+)
+from ..corpus import get_corpus_version
+from ..executor import run_blocking
+from .. import schedule_store
+from ..shared_docs import label_shared_docs, semester_filter, shared_docs_enabled, user_visibility_filter
+from .hybrid import retrieve_dense, retrieve_dense_multi, retrieve_sparse_bm25, fuse_rrf
 from .rerank import rerank_documents
 from .rules import _SEMESTER_RE, infer_doc_type
 from .utils import build_sources_from_docs, looks_like_markdown_table, has_interactive_sections
-from .llm import get_runtime_openrouter_config, get_backup_models, build_llm, invoke_text, llm_fallback_message
+from . import model_health
+from .llm import (
+    HedgedInvokeError,
+    ainvoke_hedged,
+    ainvoke_text,
+    build_llm,
+    get_backup_models,
+    get_runtime_openrouter_config,
+    invoke_hedged,
+    invoke_text,
+    llm_fallback_message,
+)
 from .prompt import LLM_FIRST_TEMPLATE
+from .schedule_answer import answer_schedule_lookup
 
 logger = logging.getLogger(__name__)
 
@@ -31,19 +58,21 @@ def _env_int(name: str, default: int) -> int:
 
 
 def _build_chroma_filter(user_id: int, query: str) -> Dict[str, Any]:
-    base_filter: Dict[str, Any] = {"user_id": str(user_id)}
+    # dokumen yang terlihat user: miliknya sendiri (+ chunk bersama jika RAG_SHARED_DOCS=1)
+    visible = user_visibility_filter(user_id)
+    clauses: List[Dict[str, Any]] = []
     sem_match = _SEMESTER_RE.search(query)
     if sem_match:
         try:
-            base_filter["semester"] = int(sem_match.group(1))
+            clauses.append(semester_filter(user_id, int(sem_match.group(1))))
         except Exception:
             pass
     doc_type = infer_doc_type(query)
     if doc_type:
-        base_filter["doc_type"] = doc_type
-    if len(base_filter) == 1:
-        return base_filter
-    return {"$and": [{"user_id": str(user_id)}] + [{k: v} for k, v in base_filter.items() if k != "user_id"]}
+        clauses.append({"doc_type": doc_type})
+    if not clauses:
+        return visible
+    return {"$and": [visible] + clauses}
 
 
 def _dedup_docs(docs: List[Any]) -> List[Any]:
@@ -78,6 +107,13 @@ def _rewrite_queries(query: str) -> List[str]:
     return list(dict.fromkeys([v.strip() for v in variants if v.strip()]))[:3]
 
 
+_MISSING_API_KEY_ANSWER = "OpenRouter API key belum di-set. Atur di Django Admin (LLM Configuration) atau .env."
+_LOW_EVIDENCE_ANSWER = (
+    "Informasi dari dokumen belum cukup untuk menjawab dengan akurat. "
+    "Upload/cek dokumen jadwal/transkrip yang relevan, atau jelaskan semester/hari/kelas yang dimaksud."
+)
+
+
 _CITATION_RE = re.compile(r"\[(?:source:[^\]]+|\d+)\]", re.IGNORECASE)
 
 
@@ -90,18 +126,155 @@ def _needs_doc_grounding(query: str) -> bool:
     return doc_type in {"schedule", "transcript"}
 
 
-def ask_bot(user_id, query, request_id: str = "-") -> Dict[str, Any]:
-    runtime_cfg = get_runtime_openrouter_config()
-    api_key = (runtime_cfg.get("api_key") or "").strip()
-    if not api_key:
-        return {
-            "answer": "OpenRouter API key belum di-set. Atur di Django Admin (LLM Configuration) atau .env.",
-            "sources": [],
-        }
+# =========================
+# Answer cache
+# =========================
+_ANSWER_CACHE_PREFIX = "rag:answer"
+_ANSWER_INDEX_MAX = 50
 
-    q = (query or "").strip()
 
-    t0 = time.time()
+def _normalize_cache_query(query: str) -> str:
+    q = str(query or "").lower()
+    q = re.sub(r"[^\w\s:.-]+", " ", q)
+    return " ".join(q.split())
+
+
+def _llm_config_fingerprint(runtime_cfg: Dict[str, Any]) -> str:
+    raw = "|".join(
+        [
+            str(runtime_cfg.get("model") or ""),
+            ",".join(runtime_cfg.get("backup_models") or []),
+            str(runtime_cfg.get("temperature") or ""),
+        ]
+    )
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()[:12]
+
+
+def _answer_cache_scope(user_id, runtime_cfg: Dict[str, Any], stream: bool = False) -> str:
+    version = get_corpus_version(user_id)
+    # jawaban stream tidak lewat perbaikan sitasi & enrich -> scope terpisah
+    mode = ":stream" if stream else ""
+    return f"{_ANSWER_CACHE_PREFIX}{mode}:{user_id}:v{version}:{_llm_config_fingerprint(runtime_cfg)}"
+
+
+def _answer_cache_key(scope: str, norm_query: str) -> str:
+    digest = hashlib.sha1(norm_query.encode("utf-8")).hexdigest()
+    return f"{scope}:q:{digest}"
+
+
+def _cosine(a: List[float], b: List[float]) -> float:
+    if not a or not b or len(a) != len(b):
+        return 0.0
+    dot = sum(x * y for x, y in zip(a, b))
+    na = math.sqrt(sum(x * x for x in a))
+    nb = math.sqrt(sum(y * y for y in b))
+    if not na or not nb:
+        return 0.0
+    return dot / (na * nb)
+
+
+def _embed_for_answer_cache(query: str) -> Optional[List[float]]:
+    try:
+        return list(get_embedding_function().embed_query(query))
+    except Exception:
+        return None
+
+
+def _answer_cache_get(scope: str, norm_query: str, query: str) -> Optional[Dict[str, Any]]:
+    try:
+        hit = cache.get(_answer_cache_key(scope, norm_query))
+        if hit:
+            return hit
+        if not _env_bool("RAG_ANSWER_CACHE_SEMANTIC", default=False):
+            return None
+        index = cache.get(f"{scope}:index") or []
+        if not index:
+            return None
+        vec = _embed_for_answer_cache(query)
+        if vec is None:
+            return None
+        threshold = float(os.environ.get("RAG_ANSWER_CACHE_SIM_THRESHOLD", "0.97"))
+        best_key, best_sim = "", 0.0
+        for item_key, item_vec in index:
+            sim = _cosine(vec, item_vec)
+            if sim > best_sim:
+                best_key, best_sim = item_key, sim
+        if best_key and best_sim >= threshold:
+            return cache.get(best_key)
+    except Exception as e:
+        logger.debug("answer cache get gagal err=%s", e)
+    return None
+
+
+def _answer_cache_set(scope: str, norm_query: str, query: str, payload: Dict[str, Any]) -> None:
+    ttl = _env_int("RAG_ANSWER_CACHE_TTL", 900)
+    key = _answer_cache_key(scope, norm_query)
+    try:
+        cache.set(key, payload, timeout=ttl)
+        if not _env_bool("RAG_ANSWER_CACHE_SEMANTIC", default=False):
+            return
+        vec = _embed_for_answer_cache(query)
+        if vec is None:
+            return
+        index = [x for x in (cache.get(f"{scope}:index") or []) if x[0] != key]
+        index.append((key, vec))
+        cache.set(f"{scope}:index", index[-_ANSWER_INDEX_MAX:], timeout=ttl)
+    except Exception as e:
+        logger.debug("answer cache set gagal err=%s", e)
+
+
+def _lookup_answer_cache(
+    user_id, q: str, runtime_cfg: Dict[str, Any], request_id: str, t0: float, stream: bool = False
+):
+    """
+    Return (cache_scope, cache_query, cached_payload). cache_scope kosong = cache nonaktif.
+    """
+    cache_query = _normalize_cache_query(q)
+    if not (_env_bool("RAG_ANSWER_CACHE", default=True) and cache_query):
+        return "", cache_query, None
+    cache_scope = _answer_cache_scope(user_id, runtime_cfg, stream=stream)
+    cached = _answer_cache_get(cache_scope, cache_query, q)
+    if cached:
+        logger.info(
+            " RAG answer cache hit user_id=%s ms=%s",
+            user_id,
+            int((time.time() - t0) * 1000),
+            extra={"request_id": request_id},
+        )
+    return cache_scope, cache_query, cached
+
+
+def dense_vectorstores(user_id) -> List[Any]:
+    """
+    Collection yang dicari untuk user: shard user (RAG_VECTOR_SHARDING) dan, jika
+    mode dokumen bersama aktif, collection dasar tempat chunk bersama disimpan.
+    """
+    name = collection_for_user(user_id)
+    stores = [get_vectorstore(name)]
+    if name != DEFAULT_COLLECTION and shared_docs_enabled():
+        stores.append(get_vectorstore())
+    return stores
+
+
+def _schedule_table_docs(user_id, q: str) -> Any:
+    """
+    Lookup eksak tabel ScheduleRow untuk pertanyaan jadwal.
+    Return (docs, exact): exact=True jika pertanyaan menyebut hari/kode (cukup tanpa vector search).
+    """
+    if infer_doc_type(q) != "schedule" or not _env_bool("RAG_SCHEDULE_TABLE", default=True):
+        return [], False
+    try:
+        filters = schedule_store.lookup_filters(q)
+        if not filters:
+            return [], False
+        rows = schedule_store.query_rows(user_id, limit=_env_int("RAG_SCHEDULE_TABLE_MAX_ROWS", 80), **filters)
+        return schedule_store.rows_to_documents(rows), bool({"hari", "kode"} & set(filters))
+    except Exception as e:
+        logger.warning(" schedule table lookup gagal user_id=%s err=%r", user_id, e)
+        return [], False
+
+
+def _retrieve_docs(user_id, q: str, request_id: str = "-") -> List[Any]:
     dense_k = _env_int("RAG_DENSE_K", 30)
     bm25_k = _env_int("RAG_BM25_K", 40)
     rerank_top_n = _env_int("RAG_RERANK_TOP_N", 8)
@@ -122,41 +295,82 @@ def ask_bot(user_id, query, request_id: str = "-") -> Dict[str, Any]:
         extra={"request_id": request_id},
     )
 
-    vectorstore = get_vectorstore()
+    table_docs, table_exact = _schedule_table_docs(user_id, q)
+    if table_docs and table_exact and _env_bool("RAG_SCHEDULE_TABLE_SKIP_DENSE", default=True):
+        logger.info(
+            " RAG schedule table hit docs=%s (vector search dilewati)",
+            len(table_docs),
+            extra={"request_id": request_id},
+        )
+        return table_docs
+
+    vectorstores = dense_vectorstores(user_id)
     chroma_where = _build_chroma_filter(user_id=user_id, query=q)
     dense_all: List[Any] = []
     dense_scored = []
 
     retrieval_t0 = time.time()
     query_variants = _rewrite_queries(q) if use_query_rewrite else [q]
-    for query_variant in query_variants:
-        scored = retrieve_dense(vectorstore=vectorstore, query=query_variant, k=dense_k, filter_where=chroma_where)
-        if scored:
-            dense_scored.extend(scored)
+    for vectorstore in vectorstores:
+        if len(query_variants) > 1:
+            # semua varian di-embed sekali jalan + 1 query batched ke Chroma
+            for scored in retrieve_dense_multi(
+                vectorstore=vectorstore,
+                queries=query_variants,
+                k=dense_k,
+                filter_where=chroma_where,
+            ):
+                if scored:
+                    dense_scored.extend(scored)
+        else:
+            for query_variant in query_variants:
+                scored = retrieve_dense(vectorstore=vectorstore, query=query_variant, k=dense_k, filter_where=chroma_where)
+                if scored:
+                    dense_scored.extend(scored)
+    if len(vectorstores) > 1:
+        # gabungan shard user + collection bersama: urut jarak (kecil = lebih mirip)
+        dense_scored.sort(key=lambda x: x[1])
     dense_docs = [d for d, _ in dense_scored]
     dense_docs = _dedup_docs(dense_docs)
     dense_all.extend(dense_docs)
 
     # fallback: jika filter ketat tidak kena, retry user-only filter.
     if not dense_all and isinstance(chroma_where, dict) and "$and" in chroma_where:
-        fallback_scored = retrieve_dense(
-            vectorstore=vectorstore,
-            query=q,
-            k=dense_k,
-            filter_where={"user_id": str(user_id)},
-        )
+        fallback_scored = []
+        for vectorstore in vectorstores:
+            fallback_scored.extend(
+                retrieve_dense(
+                    vectorstore=vectorstore,
+                    query=q,
+                    k=dense_k,
+                    filter_where=user_visibility_filter(user_id),
+                )
+                or []
+            )
+        if len(vectorstores) > 1:
+            fallback_scored.sort(key=lambda x: x[1])
         dense_all = _dedup_docs([d for d, _ in fallback_scored])
         dense_scored = fallback_scored
+    # chunk bersama: source/semester diambil dari dokumen user yang bertanya
+    label_shared_docs(user_id, [d for d, _ in dense_scored])
 
     final_docs = list(dense_all)
     final_scored = list(dense_scored)
     bm25_hits = 0
-    if use_hybrid and dense_all:
-        sparse_scored = retrieve_sparse_bm25(query=q, docs_pool=dense_all, k=bm25_k)
+    if use_hybrid:
+        # BM25 dari index persisten per user (seluruh korpus), bukan hanya dense hits.
+        sparse_scored = retrieve_sparse_bm25(
+            query=q,
+            docs_pool=dense_all,
+            k=bm25_k,
+            user_id=user_id,
+            filter_where=chroma_where,
+        )
         bm25_hits = len(sparse_scored)
-        fused = fuse_rrf(dense_docs=dense_scored, sparse_docs=sparse_scored, k=max(dense_k, bm25_k))
-        final_docs = [d for d, _ in fused]
-        final_scored = list(fused)
+        if dense_scored or sparse_scored:
+            fused = fuse_rrf(dense_docs=dense_scored, sparse_docs=sparse_scored, k=max(dense_k, bm25_k))
+            final_docs = [d for d, _ in fused]
+            final_scored = list(fused)
 
     retrieval_ms = int((time.time() - retrieval_t0) * 1000)
 
@@ -172,12 +386,13 @@ def ask_bot(user_id, query, request_id: str = "-") -> Dict[str, Any]:
         rerank_ms = int((time.time() - rerank_t0) * 1000)
 
     final_limit = rerank_top_n if use_rerank else dense_k
-    docs = final_docs[: max(1, final_limit)]
-    sources = build_sources_from_docs(docs)
+    # baris tabel jadwal (eksak) didahulukan sebelum hasil vector
+    docs = (table_docs + final_docs)[: max(1, final_limit)]
 
     top_score = float(final_scored[0][1]) if final_scored else 0.0
+    qcache = get_query_embedding_cache_stats()
     logger.info(
-        " RAG retrieval done mode=%s query_variants=%s dense_hits=%s bm25_hits=%s final_docs=%s top_score=%.4f retrieval_ms=%s rerank_ms=%s",
+        " RAG retrieval done mode=%s query_variants=%s dense_hits=%s bm25_hits=%s final_docs=%s top_score=%.4f retrieval_ms=%s rerank_ms=%s qcache_hits=%s qcache_misses=%s",
         "hybrid" if use_hybrid else "dense",
         len(query_variants),
         len(dense_all),
@@ -186,55 +401,47 @@ def ask_bot(user_id, query, request_id: str = "-") -> Dict[str, Any]:
         top_score,
         retrieval_ms,
         rerank_ms,
+        qcache.get("hits", 0),
+        qcache.get("misses", 0),
         extra={"request_id": request_id},
     )
+    return docs
 
-    template = LLM_FIRST_TEMPLATE
-    PROMPT = ChatPromptTemplate.from_template(template)
 
-    backup_models = get_backup_models(
-        str(runtime_cfg.get("model") or ""),
-        runtime_cfg.get("backup_models"),
+def _chain_answer_text(result: Any) -> str:
+    if isinstance(result, dict):
+        answer = result.get("answer") or result.get("output_text") or ""
+    else:
+        answer = str(result)
+    return (answer or "").strip() or "Maaf, tidak ada jawaban."
+
+
+def _citation_prompt(answer: str) -> str:
+    return (
+        "Perbaiki jawaban agar setiap klaim faktual spesifik menyertakan sitasi `[source: ...]` "
+        "berdasarkan konteks yang sama. Jangan tambah fakta baru.\n\n"
+        f"Jawaban saat ini:\n{answer}"
     )
-    last_error = ""
-    for idx, model_name in enumerate(backup_models):
-        model_t0 = time.time()
-        try:
-            logger.info(
-                " LLM try idx=%s model=%s",
-                idx, model_name,
-                extra={"request_id": request_id},
-            )
 
-            llm = build_llm(model_name, runtime_cfg)
-            qa_chain = create_stuff_documents_chain(llm, PROMPT)
-            result = qa_chain.invoke({"input": q, "context": docs})
-
-            if isinstance(result, dict):
-                answer = result.get("answer") or result.get("output_text") or ""
-            else:
-                answer = str(result)
-            answer = (answer or "").strip() or "Maaf, tidak ada jawaban."
-
-            if docs and not _has_citation(answer):
-                citation_prompt = (
-                    "Perbaiki jawaban agar setiap klaim faktual spesifik menyertakan sitasi `[source: ...]` "
-                    "berdasarkan konteks yang sama. Jangan tambah fakta baru.\n\n"
-                    f"Jawaban saat ini:\n{answer}"
-                )
-                cited = invoke_text(llm, citation_prompt).strip()
-                if cited and _has_citation(cited):
-                    answer = cited
-
-            if (not docs) and _needs_doc_grounding(q):
-                answer = (
-                    "Informasi dari dokumen belum cukup untuk menjawab dengan akurat. "
-                    "Upload/cek dokumen jadwal/transkrip yang relevan, atau jelaskan semester/hari/kelas yang dimaksud."
-                )
+
+def _schedule_rephrase_prompt(query: str, answer: str) -> str:
+    return (
+        "Rapikan kalimat pembuka jawaban berikut agar natural untuk pertanyaan user. "
+        "Tabel markdown dan sitasi `[source: ...]` WAJIB disalin persis tanpa perubahan.\n\n"
+        f"Pertanyaan: {query}\n\nJawaban:\n{answer}"
+    )
+
+
+def _schedule_rephraser(runtime_cfg: Dict[str, Any]):
+    def _rephrase(query: str, answer: str) -> str:
+        llm = build_llm(str(runtime_cfg.get("model") or ""), runtime_cfg)
+        return invoke_text(llm, _schedule_rephrase_prompt(query, answer))
+
+    return _rephrase
 
-            # Pastikan ada lapisan interaktif
-            if looks_like_markdown_table(answer) and (not has_interactive_sections(answer)):
-                enrich_prompt = f"""
+
+def _enrich_prompt(answer: str) -> str:
+    return f"""
 Tambahkan lapisan interaktif TANPA mengubah isi tabel & tanpa menambah data baru.
 
 Aturan:
@@ -252,47 +459,302 @@ Aturan:
 JAWABAN:
 {answer}
 """
-                enriched = invoke_text(llm, enrich_prompt).strip()
-                if enriched:
-                    answer = enriched
 
-            model_dur = round(time.time() - model_t0, 2)
-            total_dur = round(time.time() - t0, 2)
+
+def _needs_interactive_layer(answer: str) -> bool:
+    # Pastikan ada lapisan interaktif
+    return looks_like_markdown_table(answer) and (not has_interactive_sections(answer))
+
+
+def _log_llm_ok(idx: int, model_name: str, t0: float, answer: str, sources: List[Dict[str, Any]], request_id: str) -> None:
+    total_dur = round(time.time() - t0, 2)
+    logger.info(
+        " LLM ok idx=%s model=%s total_time=%ss answer_len=%s sources=%s",
+        idx, model_name, total_dur, len(answer), len(sources),
+        extra={"request_id": request_id},
+    )
+    if idx > 0:
+        logger.warning(
+            " Fallback used idx=%s model=%s",
+            idx, model_name,
+            extra={"request_id": request_id},
+        )
+
+
+def _finalize_answer(llm, q: str, docs: List[Any], answer: str, request_id: str = "-") -> str:
+    """Perbaikan sitasi + enrich dengan model pemenang hedging (tidak di-hedge)."""
+    if docs and not _has_citation(answer):
+        try:
+            cited = invoke_text(llm, _citation_prompt(answer)).strip()
+            if cited and _has_citation(cited):
+                answer = cited
+        except Exception as e:
+            logger.warning(" citation repair gagal err=%r", e, extra={"request_id": request_id})
+
+    if (not docs) and _needs_doc_grounding(q):
+        answer = _LOW_EVIDENCE_ANSWER
+
+    if _needs_interactive_layer(answer):
+        try:
+            enriched = invoke_text(llm, _enrich_prompt(answer)).strip()
+            if enriched:
+                answer = enriched
+        except Exception as e:
+            logger.warning(" enrich gagal err=%r", e, extra={"request_id": request_id})
+    return answer
+
+
+async def _afinalize_answer(llm, q: str, docs: List[Any], answer: str, request_id: str = "-") -> str:
+    if docs and not _has_citation(answer):
+        try:
+            cited = (await ainvoke_text(llm, _citation_prompt(answer))).strip()
+            if cited and _has_citation(cited):
+                answer = cited
+        except Exception as e:
+            logger.warning(" citation repair gagal err=%r", e, extra={"request_id": request_id})
+
+    if (not docs) and _needs_doc_grounding(q):
+        answer = _LOW_EVIDENCE_ANSWER
+
+    if _needs_interactive_layer(answer):
+        try:
+            enriched = (await ainvoke_text(llm, _enrich_prompt(answer))).strip()
+            if enriched:
+                answer = enriched
+        except Exception as e:
+            logger.warning(" enrich gagal err=%r", e, extra={"request_id": request_id})
+    return answer
+
+
+def ask_bot(user_id, query, request_id: str = "-") -> Dict[str, Any]:
+    runtime_cfg = get_runtime_openrouter_config()
+    api_key = (runtime_cfg.get("api_key") or "").strip()
+    if not api_key:
+        return {"answer": _MISSING_API_KEY_ANSWER, "sources": []}
+
+    q = (query or "").strip()
+
+    # lookup jadwal sederhana: jawab langsung dari tabel ScheduleRow (tanpa retrieval/LLM)
+    fast = answer_schedule_lookup(user_id, q, rephrase=_schedule_rephraser(runtime_cfg), request_id=request_id)
+    if fast:
+        return fast
+
+    t0 = time.time()
+    cache_scope, cache_query, cached = _lookup_answer_cache(user_id, q, runtime_cfg, request_id, t0)
+    if cached:
+        return {"answer": cached.get("answer", ""), "sources": list(cached.get("sources") or [])}
+
+    docs = _retrieve_docs(user_id, q, request_id=request_id)
+    sources = build_sources_from_docs(docs)
+
+    template = LLM_FIRST_TEMPLATE
+    PROMPT = ChatPromptTemplate.from_template(template)
+
+    backup_models = get_backup_models(
+        str(runtime_cfg.get("model") or ""),
+        runtime_cfg.get("backup_models"),
+    )
+
+    # hanya call pertama (jawaban utama) yang di-hedge; perbaikan sitasi & enrich
+    # memakai model pemenang, supaya 1 request tidak menyalakan 3 pipeline paralel
+    def _answer_with_model(model_name: str) -> str:
+        llm = build_llm(model_name, runtime_cfg)
+        qa_chain = create_stuff_documents_chain(llm, PROMPT)
+        return _chain_answer_text(qa_chain.invoke({"input": q, "context": docs}))
+
+    try:
+        model_name, idx, answer = invoke_hedged(
+            backup_models,
+            _answer_with_model,
+            cfg=runtime_cfg,
+            request_id=request_id,
+        )
+    except HedgedInvokeError as e:
+        logger.error(
+            " All models failed last_err=%s",
+            e.last_error[:200],
+            extra={"request_id": request_id},
+        )
+        return llm_fallback_message(e.last_error)
+
+    answer = _finalize_answer(build_llm(model_name, runtime_cfg), q, docs, answer, request_id)
+
+    _log_llm_ok(idx, model_name, t0, answer, sources, request_id)
+    if cache_scope:
+        _answer_cache_set(cache_scope, cache_query, q, {"answer": answer, "sources": sources})
+    return {"answer": answer, "sources": sources}
+
+
+async def aask_bot(user_id, query, request_id: str = "-") -> Dict[str, Any]:
+    """
+    Versi async ask_bot untuk view ASGI.
+    - Config LLM dibaca via sync_to_async (akses DB).
+    - Cache lookup, Chroma, embedding & BM25 dijalankan di thread pool terbatas.
+    - Call LLM memakai ainvoke() + hedging async, sehingga menunggu OpenRouter
+      tidak menahan thread worker.
+    """
+    runtime_cfg = await sync_to_async(get_runtime_openrouter_config)()
+    api_key = (runtime_cfg.get("api_key") or "").strip()
+    if not api_key:
+        return {"answer": _MISSING_API_KEY_ANSWER, "sources": []}
+
+    q = (query or "").strip()
+
+    fast = await run_blocking(
+        answer_schedule_lookup, user_id, q, rephrase=_schedule_rephraser(runtime_cfg), request_id=request_id
+    )
+    if fast:
+        return fast
+
+    t0 = time.time()
+    cache_scope, cache_query, cached = await run_blocking(_lookup_answer_cache, user_id, q, runtime_cfg, request_id, t0)
+    if cached:
+        return {"answer": cached.get("answer", ""), "sources": list(cached.get("sources") or [])}
+
+    docs = await run_blocking(_retrieve_docs, user_id, q, request_id=request_id)
+    sources = build_sources_from_docs(docs)
+
+    PROMPT = ChatPromptTemplate.from_template(LLM_FIRST_TEMPLATE)
+    backup_models = await run_blocking(
+        get_backup_models,
+        str(runtime_cfg.get("model") or ""),
+        runtime_cfg.get("backup_models"),
+    )
+
+    async def _answer_with_model(model_name: str) -> str:
+        llm = build_llm(model_name, runtime_cfg)
+        qa_chain = create_stuff_documents_chain(llm, PROMPT)
+        return _chain_answer_text(await qa_chain.ainvoke({"input": q, "context": docs}))
+
+    try:
+        model_name, idx, answer = await ainvoke_hedged(
+            backup_models,
+            _answer_with_model,
+            cfg=runtime_cfg,
+            request_id=request_id,
+        )
+    except HedgedInvokeError as e:
+        logger.error(
+            " All models failed last_err=%s",
+            e.last_error[:200],
+            extra={"request_id": request_id},
+        )
+        return llm_fallback_message(e.last_error)
+
+    answer = await _afinalize_answer(build_llm(model_name, runtime_cfg), q, docs, answer, request_id)
+
+    _log_llm_ok(idx, model_name, t0, answer, sources, request_id)
+    if cache_scope:
+        await run_blocking(_answer_cache_set, cache_scope, cache_query, q, {"answer": answer, "sources": sources})
+    return {"answer": answer, "sources": sources}
+
+
+def ask_bot_stream(user_id, query, request_id: str = "-") -> Iterator[Dict[str, Any]]:
+    """
+    Versi streaming ask_bot. Yield event berurutan:
+    - {"type": "sources", "sources": [...]}   (setelah retrieval)
+    - {"type": "token", "delta": "..."}       (potongan jawaban dari LLM)
+    - {"type": "done", "answer": "...", "sources": [...]}
+
+    Catatan: perbaikan sitasi & enrich tabel (2 call LLM tambahan) tidak dijalankan
+    di mode ini agar token pertama bisa langsung dikirim.
+    """
+    runtime_cfg = get_runtime_openrouter_config()
+    api_key = (runtime_cfg.get("api_key") or "").strip()
+    if not api_key:
+        yield {"type": "sources", "sources": []}
+        yield {"type": "token", "delta": _MISSING_API_KEY_ANSWER}
+        yield {"type": "done", "answer": _MISSING_API_KEY_ANSWER, "sources": []}
+        return
+
+    q = (query or "").strip()
+
+    fast = answer_schedule_lookup(user_id, q, rephrase=_schedule_rephraser(runtime_cfg), request_id=request_id)
+    if fast:
+        yield {"type": "sources", "sources": fast["sources"]}
+        yield {"type": "token", "delta": fast["answer"]}
+        yield {"type": "done", "answer": fast["answer"], "sources": fast["sources"]}
+        return
+
+    t0 = time.time()
+    cache_scope, cache_query, cached = _lookup_answer_cache(user_id, q, runtime_cfg, request_id, t0, stream=True)
+    if cached:
+        answer = cached.get("answer", "")
+        sources = list(cached.get("sources") or [])
+        yield {"type": "sources", "sources": sources}
+        yield {"type": "token", "delta": answer}
+        yield {"type": "done", "answer": answer, "sources": sources}
+        return
+
+    docs = _retrieve_docs(user_id, q, request_id=request_id)
+    sources = build_sources_from_docs(docs)
+    yield {"type": "sources", "sources": sources}
+
+    if (not docs) and _needs_doc_grounding(q):
+        yield {"type": "token", "delta": _LOW_EVIDENCE_ANSWER}
+        yield {"type": "done", "answer": _LOW_EVIDENCE_ANSWER, "sources": sources}
+        return
+
+    PROMPT = ChatPromptTemplate.from_template(LLM_FIRST_TEMPLATE)
+    backup_models = get_backup_models(
+        str(runtime_cfg.get("model") or ""),
+        runtime_cfg.get("backup_models"),
+    )
+    last_error = ""
+    for idx, model_name in enumerate(backup_models):
+        model_t0 = time.time()
+        parts: List[str] = []
+        first_token_ms = None
+        try:
             logger.info(
-                " LLM ok idx=%s model=%s model_time=%ss total_time=%ss answer_len=%s sources=%s",
-                idx, model_name, model_dur, total_dur, len(answer), len(sources),
+                " LLM stream try idx=%s model=%s",
+                idx, model_name,
                 extra={"request_id": request_id},
             )
+            llm = build_llm(model_name, runtime_cfg)
+            qa_chain = create_stuff_documents_chain(llm, PROMPT)
+            for chunk in qa_chain.stream({"input": q, "context": docs}):
+                delta = chunk if isinstance(chunk, str) else str(getattr(chunk, "content", chunk) or "")
+                if not delta:
+                    continue
+                if first_token_ms is None:
+                    first_token_ms = int((time.time() - t0) * 1000)
+                parts.append(delta)
+                yield {"type": "token", "delta": delta}
 
-            if idx > 0:
-                logger.warning(
-                    " Fallback used idx=%s model=%s",
-                    idx, model_name,
-                    extra={"request_id": request_id},
-                )
+            answer = "".join(parts).strip()
+            if not answer:
+                answer = "Maaf, tidak ada jawaban."
+                yield {"type": "token", "delta": answer}
 
-            return {"answer": answer, "sources": sources}
+            model_health.record_result(model_name, time.time() - model_t0, ok=True)
+            logger.info(
+                " LLM stream ok idx=%s model=%s ttft_ms=%s total_time=%ss answer_len=%s sources=%s",
+                idx, model_name, first_token_ms, round(time.time() - t0, 2), len(answer), len(sources),
+                extra={"request_id": request_id},
+            )
+            if cache_scope:
+                _answer_cache_set(cache_scope, cache_query, q, {"answer": answer, "sources": sources})
+            yield {"type": "done", "answer": answer, "sources": sources}
+            return
 
         except Exception as e:
-            model_dur = round(time.time() - model_t0, 2)
             last_error = str(e)
             err_preview = last_error if len(last_error) <= 200 else last_error[:200] + "..."
-
+            model_health.record_result(model_name, time.time() - model_t0, ok=False, error=last_error)
             logger.warning(
-                " LLM fail idx=%s model=%s dur=%ss err=%s",
-                idx, model_name, model_dur, err_preview,
+                " LLM stream fail idx=%s model=%s dur=%ss err=%s",
+                idx, model_name, round(time.time() - model_t0, 2), err_preview,
                 extra={"request_id": request_id},
             )
-
+            if parts:
+                # token sudah terkirim ke client; tidak bisa ganti model di tengah jawaban.
+                yield {"type": "done", "answer": "".join(parts).strip(), "sources": sources, "error": err_preview}
+                return
             if idx < len(backup_models) - 1:
                 time.sleep(0.8)
                 continue
 
-            logger.error(
-                " All models failed last_err=%s",
-                err_preview,
-                extra={"request_id": request_id},
-                exc_info=True,
-            )
-
-    return llm_fallback_message(last_error)
+    fallback = llm_fallback_message(last_error)
+    yield {"type": "token", "delta": fallback["answer"]}
+    yield {"type": "done", **fallback}
@@ -0,0 +1,222 @@
+# core/ai_engine/retrieval/model_health.py
+"""
+Circuit breaker + scoreboard kesehatan per model OpenRouter.
+
+Setiap call LLM dicatat (latency, sukses/gagal, 429). Data disimpan di DB
+(model LlmModelHealth), bukan Django cache: tanpa CACHES shared, cache default adalah
+LocMemCache per proses sehingga circuit yang OPEN di 1 worker tidak terlihat worker lain.
+
+- Model yang gagal beruntun >= RAG_LLM_CB_FAILURES kali -> circuit OPEN selama
+  RAG_LLM_CB_COOLDOWN detik, lalu HALF_OPEN (1 percobaan boleh lewat).
+- order_models() menaruh model sehat di depan, model OPEN di belakang (tidak dibuang,
+  supaya tetap ada yang dicoba jika semua model bermasalah).
+"""
+from __future__ import annotations
+
+import logging
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from django.db import transaction
+
+from ...models import LlmModelHealth
+
+logger = logging.getLogger(__name__)
+
+_LOCK = threading.Lock()
+
+STATE_CLOSED = "CLOSED"
+STATE_OPEN = "OPEN"
+STATE_HALF_OPEN = "HALF_OPEN"
+
+
+def _env_bool(name: str, default: bool = False) -> bool:
+    val = str(os.environ.get(name, "1" if default else "0")).strip().lower()
+    return val in {"1", "true", "yes", "on"}
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.environ.get(name, str(default)))
+    except Exception:
+        return default
+
+
+def _window_seconds() -> int:
+    return max(30, _env_int("RAG_LLM_HEALTH_WINDOW", 600))
+
+
+def _max_samples() -> int:
+    return max(5, _env_int("RAG_LLM_HEALTH_MAX_SAMPLES", 50))
+
+
+def _failure_threshold() -> int:
+    return max(1, _env_int("RAG_LLM_CB_FAILURES", 3))
+
+
+def _cooldown_seconds() -> int:
+    return max(1, _env_int("RAG_LLM_CB_COOLDOWN", 60))
+
+
+def _empty_entry(model_name: str) -> Dict[str, Any]:
+    return {"model": model_name, "samples": [], "consecutive_failures": 0, "open_until": 0.0}
+
+
+def _entry_from_row(row: LlmModelHealth) -> Dict[str, Any]:
+    return {
+        "model": row.model_name,
+        "samples": list(row.samples or []),
+        "consecutive_failures": int(row.consecutive_failures or 0),
+        "open_until": float(row.open_until or 0.0),
+    }
+
+
+def _load(model_name: str) -> Dict[str, Any]:
+    try:
+        row = LlmModelHealth.objects.filter(model_name=model_name).first()
+    except Exception:
+        row = None
+    if row is None:
+        return _empty_entry(model_name)
+    return _entry_from_row(row)
+
+
+def _load_many(model_names: List[str]) -> Dict[str, Dict[str, Any]]:
+    """Ambil entry beberapa model sekaligus (1 query); model tanpa baris diberi entry kosong."""
+    rows = LlmModelHealth.objects.filter(model_name__in=list(model_names))
+    found = {row.model_name: _entry_from_row(row) for row in rows}
+    return {name: found.get(name) or _empty_entry(name) for name in model_names}
+
+
+def _is_rate_limited(error: str) -> bool:
+    low = (error or "").lower()
+    return "429" in low or "rate limit" in low or "rate-limit" in low
+
+
+def record_result(model_name: str, latency_s: float, ok: bool, error: str = "") -> None:
+    """
+    Catat hasil 1 call LLM. Read-modify-write 1 baris dalam transaksi (select_for_update),
+    sehingga update dari beberapa worker tidak saling menimpa.
+    """
+    name = (model_name or "").strip()
+    if not name:
+        return
+    now = time.time()
+    try:
+        with _LOCK, transaction.atomic():
+            row, _ = LlmModelHealth.objects.select_for_update().get_or_create(model_name=name)
+            cutoff = now - _window_seconds()
+            samples = [s for s in row.samples or [] if s and s[0] >= cutoff]
+            samples.append([now, round(float(latency_s), 3), bool(ok), (not ok) and _is_rate_limited(error)])
+            row.samples = samples[-_max_samples():]
+
+            if ok:
+                row.consecutive_failures = 0
+                row.open_until = 0.0
+            else:
+                row.consecutive_failures = int(row.consecutive_failures or 0) + 1
+                if row.consecutive_failures >= _failure_threshold():
+                    row.open_until = now + _cooldown_seconds()
+                    logger.warning(
+                        "llm circuit OPEN model=%s failures=%s cooldown=%ss",
+                        name, row.consecutive_failures, _cooldown_seconds(),
+                    )
+            row.save()
+    except Exception as e:
+        logger.warning("llm health: record gagal model=%s err=%r", name, e)
+
+
+def _percentile(values: List[float], pct: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    idx = min(len(ordered) - 1, max(0, int(round(pct / 100.0 * (len(ordered) - 1)))))
+    return ordered[idx]
+
+
+def _stats_from_entry(entry: Dict[str, Any], now: float) -> Dict[str, Any]:
+    cutoff = now - _window_seconds()
+    samples = [s for s in entry.get("samples") or [] if s and s[0] >= cutoff]
+    calls = len(samples)
+    errors = sum(1 for s in samples if not s[2])
+    ok_latencies = [float(s[1]) for s in samples if s[2]]
+    open_until = float(entry.get("open_until") or 0.0)
+
+    if open_until > now:
+        state = STATE_OPEN
+    elif int(entry.get("consecutive_failures") or 0) >= _failure_threshold():
+        state = STATE_HALF_OPEN
+    else:
+        state = STATE_CLOSED
+
+    p50 = _percentile(ok_latencies, 50)
+    p95 = _percentile(ok_latencies, 95)
+    return {
+        "model": entry["model"],
+        "state": state,
+        "calls": calls,
+        "errors": errors,
+        "rate_limited": sum(1 for s in samples if len(s) > 3 and s[3]),
+        "error_rate": round(errors / calls, 3) if calls else 0.0,
+        "p50_ms": int(p50 * 1000) if p50 is not None else None,
+        "p95_ms": int(p95 * 1000) if p95 is not None else None,
+        "consecutive_failures": int(entry.get("consecutive_failures") or 0),
+        "open_until": open_until if state == STATE_OPEN else None,
+    }
+
+
+def get_model_stats(model_name: str) -> Dict[str, Any]:
+    return _stats_from_entry(_load(model_name), time.time())
+
+
+def is_open(model_name: str) -> bool:
+    return get_model_stats(model_name)["state"] == STATE_OPEN
+
+
+def order_models(models: List[str]) -> List[str]:
+    """
+    Urutkan ulang daftar fallback berdasarkan kesehatan terbaru.
+    Kunci: (circuit OPEN, bucket error rate, p95 bucket, urutan konfigurasi).
+    Bucket dibuat kasar agar urutan tidak berubah-ubah karena noise kecil.
+    """
+    if not _env_bool("RAG_LLM_HEALTH_ROUTING", default=True) or len(models) <= 1:
+        return list(models)
+
+    def _sort_key(item):
+        pos, name = item
+        st = stats[name]
+        err_bucket = round(st["error_rate"], 1) if st["calls"] >= 3 else 0.0
+        p95_bucket = (st["p95_ms"] or 0) // 10000
+        return (st["state"] == STATE_OPEN, err_bucket, p95_bucket, pos)
+
+    try:
+        now = time.time()
+        stats = {name: _stats_from_entry(entry, now) for name, entry in _load_many(models).items()}
+        return [name for _, name in sorted(enumerate(models), key=_sort_key)]
+    except Exception as e:
+        logger.warning("llm health: order gagal err=%r", e)
+        return list(models)
+
+
+def get_scoreboard(models: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+    try:
+        names = list(models) if models is not None else list(
+            LlmModelHealth.objects.order_by("id").values_list("model_name", flat=True)
+        )
+    except Exception:
+        names = list(models or [])
+    now = time.time()
+    try:
+        entries = _load_many(names)
+    except Exception:
+        entries = {n: _empty_entry(n) for n in names}
+    return [_stats_from_entry(entries[n], now) for n in names]
+
+
+def reset_health(model_name: Optional[str] = None) -> None:
+    rows = LlmModelHealth.objects.all()
+    if model_name:
+        rows = rows.filter(model_name=model_name)
+    rows.delete()
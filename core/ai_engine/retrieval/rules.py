@@ -7,6 +7,15 @@ _WEIGHT_RE = re.compile(r"(?:bobot|weight)\s*[:=]?\s*(\d{1,3})", re.IGNORECASE)
 _TARGET_NUM_RE = re.compile(r"(?:target|nilai akhir|final)\s*[:=]?\s*(\d{2,3})", re.IGNORECASE)
 _TARGET_LETTER_RE = re.compile(r"(?:target|supaya|agar)\s*(?:nilai\s*)?([abcde])\b", re.IGNORECASE)
 
+# filter lookup jadwal terstruktur (kelas A / kelas 2B, kode IF301, dosen/pak/bu <nama>)
+_KELAS_RE = re.compile(r"\bkelas\s+([a-z]\d{0,2}|\d{1,2}[a-z]?)\b", re.IGNORECASE)
+_KODE_RE = re.compile(r"\b([a-z]{2,4}[\s-]?\d{3,4}[a-z]?)\b", re.IGNORECASE)
+_DOSEN_RE = re.compile(
+    r"\b(?:dosen|pak|bu|ibu|bapak)\s+([a-z][a-z.' ]{2,40}?)(?=\s+(?:hari|semester|kelas|jam|di|yang|pada)\b|[?.,!]|$)",
+    re.IGNORECASE,
+)
+_DOSEN_STOPWORDS = {"pengampu", "pengajar", "siapa", "apa", "nya", "yang"}
+
 _GRADE_KEYWORDS = [
     "hitung nilai",
     "berapa nilai",
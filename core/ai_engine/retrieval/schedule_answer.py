@@ -0,0 +1,156 @@
+"""
+Fast-path jawaban lookup jadwal tanpa LLM.
+
+Pertanyaan seperti "jadwal hari Senin semester 3" / "kelas IF301 kelas A" cukup
+dijawab dari tabel ScheduleRow: parse filter (hari/semester/kelas/kode/dosen),
+query ber-index, lalu render tabel markdown langsung. Tidak ada dense retrieval
+maupun round-trip OpenRouter, sehingga jam/ruang tidak mungkin dihalusinasi.
+LLM hanya dipakai (opsional) untuk merapikan kalimat pembuka.
+"""
+from __future__ import annotations
+
+import logging
+import os
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from .. import schedule_store
+from .rules import infer_doc_type
+from .utils import build_sources_from_docs
+
+logger = logging.getLogger(__name__)
+
+# pertanyaan yang butuh penalaran (bukan sekadar lookup) tetap lewat jalur LLM
+_REASONING_WORDS = {
+    "kenapa", "mengapa", "bagaimana", "bentrok", "rekomendasi", "saran", "sebaiknya",
+    "hitung", "total", "berapa", "jelaskan", "bandingkan",
+}
+_COLUMNS = [
+    ("hari", "Hari"),
+    ("jam", "Jam"),
+    ("kode", "Kode"),
+    ("mata_kuliah", "Mata Kuliah"),
+    ("sks", "SKS"),
+    ("kelas", "Kelas"),
+    ("ruang", "Ruang"),
+    ("dosen", "Dosen"),
+]
+
+
+def _env_bool(name: str, default: bool = False) -> bool:
+    val = str(os.environ.get(name, "1" if default else "0")).strip().lower()
+    return val in {"1", "true", "yes", "on"}
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.environ.get(name, str(default)))
+    except Exception:
+        return int(default)
+
+
+def fast_path_enabled() -> bool:
+    return _env_bool("RAG_SCHEDULE_FAST_PATH", default=True)
+
+
+def parse_lookup(query: str) -> Optional[Dict[str, Any]]:
+    """Filter lookup jika pertanyaan adalah lookup jadwal sederhana; None jika bukan."""
+    q = str(query or "")
+    if infer_doc_type(q) != "schedule":
+        return None
+    words = set(q.lower().replace("?", " ").split())
+    if words & _REASONING_WORDS:
+        return None
+    filters = schedule_store.lookup_filters(q)
+    return filters or None
+
+
+def _cell(value: Any) -> str:
+    return str(value or "").replace("|", "/").replace("\n", " ").strip() or "-"
+
+
+def render_table(rows: List[Any]) -> str:
+    cols = [(key, label) for key, label in _COLUMNS if any(getattr(r, key) for r in rows)]
+    lines = [
+        "| " + " | ".join(label for _, label in cols) + " |",
+        "| " + " | ".join("---" for _ in cols) + " |",
+    ]
+    for r in rows:
+        lines.append("| " + " | ".join(_cell(getattr(r, key)) for key, _ in cols) + " |")
+    return "\n".join(lines)
+
+
+def _describe_filters(filters: Dict[str, Any]) -> str:
+    parts = []
+    if filters.get("hari"):
+        parts.append(f"hari {filters['hari']}")
+    if filters.get("semester") is not None:
+        parts.append(f"semester {filters['semester']}")
+    if filters.get("kode"):
+        parts.append(f"kode {filters['kode']}")
+    if filters.get("kelas"):
+        parts.append(f"kelas {filters['kelas']}")
+    if filters.get("dosen"):
+        parts.append(f"dosen {filters['dosen']}")
+    return ", ".join(parts)
+
+
+def build_answer(rows: List[Any], filters: Dict[str, Any], truncated: bool = False) -> str:
+    titles = list(dict.fromkeys(str(r.document.title or "") for r in rows))
+    intro = f"Berikut jadwal {_describe_filters(filters)} dari dokumen kamu ({len(rows)} kelas):"
+    citations = " ".join(f"[source: {t}]" for t in titles if t)
+    answer = f"{intro}\n\n{render_table(rows)}\n\n{citations}".strip()
+    if truncated:
+        answer += "\n\nHasil dipotong; persempit dengan hari/semester/kelas untuk melihat sisanya."
+    return answer
+
+
+def answer_schedule_lookup(
+    user_id: Any,
+    query: str,
+    rephrase: Optional[Callable[[str, str], str]] = None,
+    request_id: str = "-",
+) -> Optional[Dict[str, Any]]:
+    """
+    Jawab lookup jadwal langsung dari tabel ScheduleRow.
+    Return {"answer", "sources"} atau None (bukan lookup / tidak ada baris) -> jalur RAG biasa.
+    `rephrase(query, answer)` opsional (RAG_SCHEDULE_FAST_PATH_LLM=1) untuk merapikan kalimat.
+    """
+    if not fast_path_enabled():
+        return None
+    filters = parse_lookup(query)
+    if not filters:
+        return None
+
+    t0 = time.time()
+    max_rows = _env_int("RAG_SCHEDULE_FAST_PATH_MAX_ROWS", 60)
+    try:
+        rows = schedule_store.query_rows(user_id, limit=max_rows + 1, **filters)
+    except Exception as e:
+        logger.warning(" schedule fast-path gagal user_id=%s err=%r", user_id, e, extra={"request_id": request_id})
+        return None
+    if not rows:
+        return None
+
+    # query_rows sudah mengurutkan (hari, jam, kode) sebelum limit
+    truncated = len(rows) > max_rows
+    rows = rows[:max_rows]
+    answer = build_answer(rows, filters, truncated=truncated)
+    if rephrase is not None and _env_bool("RAG_SCHEDULE_FAST_PATH_LLM", default=False):
+        try:
+            phrased = str(rephrase(query, answer) or "").strip()
+            # tabel harus tetap utuh; kalau LLM merusaknya pakai jawaban deterministik
+            if phrased and render_table(rows) in phrased:
+                answer = phrased
+        except Exception as e:
+            logger.warning(" schedule fast-path rephrase gagal err=%r", e, extra={"request_id": request_id})
+
+    sources = build_sources_from_docs(schedule_store.rows_to_documents(rows))
+    logger.info(
+        " RAG schedule fast-path rows=%s filters=%s ms=%s",
+        len(rows),
+        filters,
+        int((time.time() - t0) * 1000),
+        extra={"request_id": request_id},
+    )
+    return {"answer": answer, "sources": sources}
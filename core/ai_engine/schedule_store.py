@@ -0,0 +1,203 @@
+# core/ai_engine/schedule_store.py
+"""
+Tabel jadwal terstruktur (model ScheduleRow).
+
+Baris jadwal hasil `_extract_pdf_tables` + `_repair_rows_with_llm` disimpan sekali
+per dokumen di tabel relasional (index: user, dokumen, hari, semester, kode).
+Metadata chunk Chroma hanya membawa `schedule_rows_ref`; planner dan retrieval
+membaca baris jadwal langsung dari tabel ini, sehingga lookup jadwal eksak
+("jadwal hari Senin semester 3") tidak perlu vector search.
+"""
+from __future__ import annotations
+
+import re
+from typing import Any, Dict, Iterable, List, Optional
+
+from django.db import transaction
+from django.db.models import Case, IntegerField, Value, When
+from langchain_core.documents import Document
+
+from ..models import ScheduleRow
+
+ROW_FIELDS = ("hari", "sesi", "jam", "kode", "mata_kuliah", "sks", "kelas", "ruang", "dosen")
+_FIELD_MAX = {f: ScheduleRow._meta.get_field(f).max_length for f in ROW_FIELDS}
+DAY_ORDER = ["senin", "selasa", "rabu", "kamis", "jumat", "sabtu", "minggu"]
+
+
+def _to_int(value: Any) -> Optional[int]:
+    raw = str(value if value is not None else "").strip()
+    return int(raw) if raw.isdigit() else None
+
+
+def _build_row(doc, idx: int, row: Dict[str, Any]) -> ScheduleRow:
+    values = {f: str(row.get(f) or "").strip()[: _FIELD_MAX[f]] for f in ROW_FIELDS}
+    extra = {
+        str(k): str(v)
+        for k, v in row.items()
+        if k not in ROW_FIELDS and k not in {"semester", "page"} and str(v or "").strip()
+    }
+    return ScheduleRow(
+        user_id=doc.user_id,
+        document_id=doc.id,
+        row_index=idx,
+        semester=_to_int(row.get("semester")),
+        page=_to_int(row.get("page")),
+        extra=extra,
+        **values,
+    )
+
+
+def replace_rows(doc, rows: Iterable[Dict[str, Any]]) -> int:
+    """Ganti seluruh baris jadwal 1 dokumen (reingest idempotent). Return jumlah baris."""
+    objs = [_build_row(doc, idx, r) for idx, r in enumerate(rows or []) if isinstance(r, dict)]
+    with transaction.atomic():
+        ScheduleRow.objects.filter(document_id=doc.id).delete()
+        ScheduleRow.objects.bulk_create(objs, batch_size=500)
+    return len(objs)
+
+
+def row_to_dict(row: ScheduleRow) -> Dict[str, Any]:
+    out: Dict[str, Any] = {f: getattr(row, f) for f in ROW_FIELDS if getattr(row, f)}
+    if row.semester is not None:
+        out["semester"] = str(row.semester)
+    if row.page is not None:
+        out["page"] = row.page
+    out.update(row.extra or {})
+    return out
+
+
+def rows_for_document(doc_id: Any) -> List[Dict[str, Any]]:
+    return [row_to_dict(r) for r in ScheduleRow.objects.filter(document_id=doc_id)]
+
+
+def rows_for_ref(ref: Any) -> List[Dict[str, Any]]:
+    """
+    Resolve `schedule_rows_ref` dari metadata chunk.
+    ref = doc_id (chunk per user) atau "sha256:<hash>" (chunk bersama).
+    """
+    ref = str(ref or "").strip()
+    if ref.isdigit():
+        return rows_for_document(int(ref))
+    if ref.startswith("sha256:"):
+        doc_id = (
+            ScheduleRow.objects.filter(document__content_hash__startswith=ref.split(":", 1)[1])
+            .values_list("document_id", flat=True)
+            .first()
+        )
+        return rows_for_document(doc_id) if doc_id else []
+    return []
+
+
+def query_rows(
+    user_id: Any,
+    hari: str = "",
+    semester: Optional[int] = None,
+    kode: str = "",
+    kelas: str = "",
+    dosen: str = "",
+    doc_ids: Optional[Iterable[Any]] = None,
+    limit: int = 200,
+) -> List[ScheduleRow]:
+    qs = ScheduleRow.objects.filter(user_id=user_id).select_related("document")
+    if doc_ids is not None:
+        qs = qs.filter(document_id__in=list(doc_ids))
+    if hari:
+        qs = qs.filter(hari__iexact=hari)
+    if semester is not None:
+        qs = qs.filter(semester=semester)
+    if kode:
+        # "IF301" juga cocok dengan "IF 301" / "IF-301" di dokumen
+        parts = re.match(r"([a-z]+)[\s-]*(\d+[a-z]?)$", kode.strip(), re.IGNORECASE)
+        if parts:
+            qs = qs.filter(kode__iregex=rf"^{parts.group(1)}[ -]?{parts.group(2)}$")
+        else:
+            qs = qs.filter(kode__iexact=kode)
+    if kelas:
+        qs = qs.filter(kelas__iexact=kelas)
+    if dosen:
+        qs = qs.filter(dosen__icontains=dosen)
+    # urutan tampil (hari, jam, kode) diterapkan di query agar limit memotong baris yang benar
+    day_idx = Case(
+        *[When(hari__iexact=day, then=Value(i)) for i, day in enumerate(DAY_ORDER)],
+        default=Value(len(DAY_ORDER)),
+        output_field=IntegerField(),
+    )
+    qs = qs.order_by(day_idx, "jam", "kode", "document_id", "row_index")
+    return list(qs[: max(1, int(limit))])
+
+
+def detected_fields(user_id: Any) -> List[str]:
+    """Kolom jadwal yang benar-benar terisi di dokumen user (untuk planner)."""
+    qs = ScheduleRow.objects.filter(user_id=user_id)
+    fields = [f for f in ROW_FIELDS if qs.exclude(**{f: ""}).exists()]
+    if qs.filter(semester__isnull=False).exists():
+        fields.append("semester")
+    return sorted(fields)
+
+
+
+_KODE_PREFIX_SKIP = {"jam", "sesi", "smt", "sem", "sks", "hari", "lt"}
+
+
+def lookup_filters(query: str) -> Dict[str, Any]:
+    """
+    Filter eksak dari pertanyaan user untuk lookup tabel jadwal:
+    hari, semester, kelas, kode mata kuliah, dosen.
+    """
+    from .ingest import _DAY_CANON
+    from .retrieval.rules import _DOSEN_RE, _DOSEN_STOPWORDS, _KELAS_RE, _KODE_RE, _SEMESTER_RE
+
+    text = str(query or "")
+    out: Dict[str, Any] = {}
+    for w in re.findall(r"[a-z']+", text.lower()):
+        day = _DAY_CANON.get(w.replace("'", ""))
+        if day:
+            out["hari"] = day
+            break
+    sem_match = _SEMESTER_RE.search(text)
+    if sem_match:
+        out["semester"] = int(sem_match.group(1))
+    kelas_match = _KELAS_RE.search(text)
+    if kelas_match:
+        out["kelas"] = kelas_match.group(1).upper()
+    for m in _KODE_RE.finditer(text):
+        token = m.group(1)
+        if re.match(r"[a-z]+", token, re.IGNORECASE).group(0).lower() in _KODE_PREFIX_SKIP:
+            continue
+        out["kode"] = re.sub(r"[\s-]+", "", token).upper()
+        break
+    dosen_match = _DOSEN_RE.search(text)
+    if dosen_match:
+        name = dosen_match.group(1).strip(" .'")
+        if name and name.lower() not in _DOSEN_STOPWORDS:
+            out["dosen"] = name
+    return out
+
+
+def rows_to_documents(rows: List[ScheduleRow], rows_per_doc: int = 20) -> List[Document]:
+    """Baris tabel -> Document (format CSV_ROW seperti row chunk ingest) untuk konteks LLM."""
+    from .ingest import _schedule_rows_to_row_chunks
+
+    grouped: Dict[int, List[ScheduleRow]] = {}
+    for r in rows:
+        grouped.setdefault(r.document_id, []).append(r)
+
+    docs: List[Document] = []
+    for doc_id, doc_rows in grouped.items():
+        title = str(doc_rows[0].document.title or "")
+        for start in range(0, len(doc_rows), max(1, rows_per_doc)):
+            part = doc_rows[start:start + rows_per_doc]
+            lines = _schedule_rows_to_row_chunks([row_to_dict(r) for r in part])
+            if not lines:
+                continue
+            meta: Dict[str, Any] = {
+                "user_id": str(part[0].user_id),
+                "doc_id": str(doc_id),
+                "source": title,
+                "doc_type": "schedule",
+                "chunk_kind": "schedule_table",
+            }
+            if part[0].semester is not None:
+                meta["semester"] = part[0].semester
+            docs.append(Document(page_content="\n".join(lines), metadata=meta))
+    return docs
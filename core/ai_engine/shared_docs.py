@@ -0,0 +1,156 @@
+# core/ai_engine/shared_docs.py
+"""
+Mode dokumen bersama (RAG_SHARED_DOCS=1).
+
+Banyak mahasiswa mengunggah PDF resmi fakultas yang sama persis. Dalam mode ini
+chunk + embedding untuk satu isi file (sha256) hanya disimpan sekali di Chroma
+dengan user_id=SHARED_OWNER dan metadata content_hash. Tiap AcademicDocument user
+menyimpan content_hash-nya; retrieval memakai filter "dokumen yang terlihat user":
+chunk miliknya sendiri ATAU chunk bersama yang hash-nya ada di dokumen miliknya.
+User tetap tidak bisa melihat isi file yang tidak pernah ia unggah.
+"""
+from __future__ import annotations
+
+import logging
+import os
+import re
+from typing import Any, Dict, List
+
+from ..models import AcademicDocument
+
+logger = logging.getLogger(__name__)
+
+SHARED_OWNER = "__shared__"
+
+_SEMESTER_RE = re.compile(r"\bsemester\s*(\d+)\b", re.IGNORECASE)
+
+
+def shared_docs_enabled() -> bool:
+    val = str(os.environ.get("RAG_SHARED_DOCS", "0")).strip().lower()
+    return val in {"1", "true", "yes", "on"}
+
+
+def shared_doc_id(content_hash: str) -> str:
+    return f"sha256:{content_hash[:32]}"
+
+
+def shared_where(content_hash: str) -> Dict[str, Any]:
+    return {"$and": [{"user_id": SHARED_OWNER}, {"content_hash": str(content_hash)}]}
+
+
+def visible_shared_hashes(user_id: Any) -> List[str]:
+    qs = (
+        AcademicDocument.objects.filter(user_id=user_id)
+        .exclude(content_hash="")
+        .values_list("content_hash", flat=True)
+        .distinct()
+    )
+    return sorted(str(h) for h in qs)
+
+
+def user_shared_labels(user_id: Any) -> Dict[str, Dict[str, Any]]:
+    """
+    content_hash -> metadata milik user untuk chunk bersama: source (judul dokumen
+    user sendiri) dan semester jika judul menyebut semester.
+    """
+    labels: Dict[str, Dict[str, Any]] = {}
+    qs = (
+        AcademicDocument.objects.filter(user_id=user_id)
+        .exclude(content_hash="")
+        .order_by("-uploaded_at")
+        .values_list("content_hash", "title")
+    )
+    for content_hash, title in qs:
+        if content_hash in labels:
+            continue
+        label: Dict[str, Any] = {"source": str(title or "")}
+        m = _SEMESTER_RE.search(str(title or ""))
+        if m:
+            label["semester"] = int(m.group(1))
+        labels[str(content_hash)] = label
+    return labels
+
+
+def label_shared_docs(user_id: Any, docs: List[Any]) -> None:
+    """Isi source/semester chunk bersama (in-place) dari AcademicDocument user yang bertanya."""
+    shared = [d for d in docs if (getattr(d, "metadata", None) or {}).get("user_id") == SHARED_OWNER]
+    if not shared:
+        return
+    try:
+        labels = user_shared_labels(user_id)
+    except Exception as e:
+        logger.warning("shared_docs: gagal ambil label user_id=%s err=%r", user_id, e)
+        return
+    for d in shared:
+        label = labels.get(str(d.metadata.get("content_hash") or ""))
+        if label:
+            d.metadata.update(label)
+
+
+def semester_filter(user_id: Any, semester: int) -> Dict[str, Any]:
+    """
+    Filter semester. Chunk bersama tidak membawa semester dari judul pengunggah,
+    jadi hash dokumen user yang judulnya menyebut semester ini ikut dicocokkan.
+    """
+    clause: Dict[str, Any] = {"semester": int(semester)}
+    if not shared_docs_enabled():
+        return clause
+    try:
+        hashes = sorted(h for h, label in user_shared_labels(user_id).items() if label.get("semester") == int(semester))
+    except Exception as e:
+        logger.warning("shared_docs: gagal ambil hash semester user_id=%s err=%r", user_id, e)
+        return clause
+    if not hashes:
+        return clause
+    return {"$or": [clause, {"content_hash": {"$in": hashes}}]}
+
+
+def user_visibility_filter(user_id: Any) -> Dict[str, Any]:
+    """
+    Filter Chroma untuk semua chunk yang boleh dilihat user.
+    Mode bersama mati -> persis {"user_id": ...} seperti sebelumnya.
+    """
+    own = {"user_id": str(user_id)}
+    if not shared_docs_enabled():
+        return own
+    try:
+        hashes = visible_shared_hashes(user_id)
+    except Exception as e:
+        logger.warning("shared_docs: gagal ambil hash user_id=%s err=%r", user_id, e)
+        return own
+    if not hashes:
+        return own
+    shared = {"$and": [{"user_id": SHARED_OWNER}, {"content_hash": {"$in": hashes}}]}
+    return {"$or": [own, shared]}
+
+
+def shared_chunks_exist(collection, content_hash: str) -> bool:
+    if collection is None or not content_hash:
+        return False
+    try:
+        got = collection.get(where=shared_where(content_hash), limit=1, include=[])
+        return bool(got.get("ids"))
+    except Exception as e:
+        logger.warning("shared_docs: cek chunk bersama gagal hash=%s err=%r", content_hash[:12], e)
+        return False
+
+
+def release_if_unreferenced(collection, content_hash: str) -> int:
+    """
+    Hapus chunk bersama jika tidak ada lagi AcademicDocument yang memakai hash ini.
+    Return jumlah vector terhapus (best effort).
+    """
+    if collection is None or not content_hash:
+        return 0
+    if AcademicDocument.objects.filter(content_hash=content_hash).exists():
+        return 0
+    where = shared_where(content_hash)
+    try:
+        ids = collection.get(where=where, include=[]).get("ids") or []
+        if ids:
+            collection.delete(ids=ids)
+            logger.info("shared_docs: chunk bersama dilepas hash=%s vectors=%s", content_hash[:12], len(ids))
+        return len(ids)
+    except Exception as e:
+        logger.warning("shared_docs: release gagal hash=%s err=%r", content_hash[:12], e)
+        return 0
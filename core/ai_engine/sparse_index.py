@@ -0,0 +1,249 @@
+# core/ai_engine/sparse_index.py
+"""
+Index BM25 persisten per user.
+
+Index dibangun dari chunk yang ditulis process_document() dan disimpan di disk
+(folder `bm25_index/` di samping `chroma_db/`). Query BM25 berjalan atas seluruh
+korpus user, bukan hanya hasil dense, sehingga mode hybrid bisa menemukan chunk
+yang terlewat oleh dense search.
+"""
+from __future__ import annotations
+
+import json
+import logging
+import os
+import re
+import threading
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+try:  # POSIX
+    import fcntl
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None
+    import msvcrt
+
+from django.conf import settings
+from langchain_core.documents import Document
+from rank_bm25 import BM25Okapi
+
+logger = logging.getLogger(__name__)
+
+BM25_INDEX_DIR = os.environ.get("RAG_BM25_INDEX_DIR") or os.path.join(settings.BASE_DIR, "bm25_index")
+_INDEX_VERSION = 1
+
+# metadata besar tidak perlu ikut disimpan di index sparse
+_SKIP_META_KEYS = {"schedule_rows", "columns"}
+
+_LOCK = threading.RLock()
+# user_id -> (mtime_ns, entries, bm25)
+_CACHE: Dict[str, Tuple[int, List[Dict[str, Any]], Optional[BM25Okapi]]] = {}
+
+
+def tokenize(text: str) -> List[str]:
+    return [x for x in str(text or "").lower().strip().split() if x]
+
+
+def _safe_user_key(user_id: Any) -> str:
+    return re.sub(r"[^0-9A-Za-z_-]+", "_", str(user_id or "").strip()) or "_"
+
+
+def _index_path(user_id: Any) -> str:
+    return os.path.join(BM25_INDEX_DIR, f"user_{_safe_user_key(user_id)}.json")
+
+
+@contextmanager
+def _file_lock(user_id: Any) -> Iterator[None]:
+    """
+    Lock antar proses (web worker, ingest_worker, management command) untuk
+    read-modify-write file index 1 user; _LOCK hanya melindungi thread di proses yang sama.
+    """
+    os.makedirs(BM25_INDEX_DIR, exist_ok=True)
+    with _LOCK, open(f"{_index_path(user_id)}.lock", "a+b") as fh:
+        if fcntl is not None:
+            fcntl.flock(fh.fileno(), fcntl.LOCK_EX)
+        else:
+            fh.seek(0)
+            msvcrt.locking(fh.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(fh.fileno(), fcntl.LOCK_UN)
+            else:
+                fh.seek(0)
+                msvcrt.locking(fh.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def _slim_meta(meta: Dict[str, Any] | None) -> Dict[str, Any]:
+    return {k: v for k, v in (meta or {}).items() if k not in _SKIP_META_KEYS}
+
+
+def _load_entries(user_id: Any) -> List[Dict[str, Any]]:
+    path = _index_path(user_id)
+    if not os.path.exists(path):
+        return []
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        if not isinstance(data, dict) or int(data.get("version", 0)) != _INDEX_VERSION:
+            return []
+        entries = data.get("entries") or []
+        return [e for e in entries if isinstance(e, dict)]
+    except Exception as e:
+        logger.warning("sparse_index: gagal baca index user_id=%s err=%r", user_id, e)
+        return []
+
+
+def _write_entries(user_id: Any, entries: List[Dict[str, Any]]) -> None:
+    path = _index_path(user_id)
+    if not entries:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        _CACHE.pop(str(user_id), None)
+        return
+
+    os.makedirs(BM25_INDEX_DIR, exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({"version": _INDEX_VERSION, "entries": entries}, f, ensure_ascii=True)
+    os.replace(tmp_path, path)
+    _CACHE.pop(str(user_id), None)
+
+
+def _get_index(user_id: Any) -> Tuple[List[Dict[str, Any]], Optional[BM25Okapi]]:
+    """
+    Ambil entries + BM25 dari cache proses; rebuild hanya jika file berubah.
+    """
+    key = str(user_id)
+    path = _index_path(user_id)
+    try:
+        mtime_ns = os.stat(path).st_mtime_ns
+    except OSError:
+        _CACHE.pop(key, None)
+        return [], None
+
+    with _LOCK:
+        cached = _CACHE.get(key)
+        if cached and cached[0] == mtime_ns:
+            return cached[1], cached[2]
+
+        entries = _load_entries(user_id)
+        tokenized = [tokenize(e.get("text", "")) for e in entries]
+        bm25 = BM25Okapi(tokenized) if any(tokenized) else None
+        _CACHE[key] = (mtime_ns, entries, bm25)
+        return entries, bm25
+
+
+def _same_doc(entry: Dict[str, Any], doc_id: Optional[str], source: Optional[str]) -> bool:
+    meta = entry.get("metadata") or {}
+    if doc_id:
+        return str(meta.get("doc_id") or "") == str(doc_id)
+    if source:
+        return str(meta.get("source") or "") == str(source)
+    return False
+
+
+def add_document_chunks(user_id: Any, doc_id: Any, texts: Sequence[str], metadatas: Sequence[Dict[str, Any]]) -> int:
+    """
+    Tambah/replace chunk untuk 1 dokumen (idempotent per doc_id).
+    Return jumlah chunk yang tersimpan di index untuk dokumen tersebut.
+    """
+    doc_key = str(doc_id)
+    new_entries: List[Dict[str, Any]] = []
+    for text, meta in zip(texts, metadatas):
+        t = str(text or "").strip()
+        if not t:
+            continue
+        new_entries.append({"text": t, "metadata": _slim_meta(meta)})
+
+    try:
+        with _file_lock(user_id):
+            entries = [e for e in _load_entries(user_id) if not _same_doc(e, doc_key, None)]
+            entries.extend(new_entries)
+            _write_entries(user_id, entries)
+        return len(new_entries)
+    except Exception as e:
+        logger.warning("sparse_index: add gagal user_id=%s doc_id=%s err=%r", user_id, doc_id, e)
+        return 0
+
+
+def remove_document(user_id: Any, doc_id: Optional[str] = None, source: Optional[str] = None) -> int:
+    if not doc_id and not source:
+        return 0
+    try:
+        with _file_lock(user_id):
+            entries = _load_entries(user_id)
+            kept = [e for e in entries if not _same_doc(e, doc_id, source)]
+            removed = len(entries) - len(kept)
+            if removed:
+                _write_entries(user_id, kept)
+            return removed
+    except Exception as e:
+        logger.warning("sparse_index: remove gagal user_id=%s doc_id=%s err=%r", user_id, doc_id, e)
+        return 0
+
+
+def purge_user(user_id: Any) -> int:
+    try:
+        with _file_lock(user_id):
+            count = len(_load_entries(user_id))
+            _write_entries(user_id, [])
+            return count
+    except Exception as e:
+        logger.warning("sparse_index: purge gagal user_id=%s err=%r", user_id, e)
+        return 0
+
+
+def has_index(user_id: Any) -> bool:
+    return os.path.exists(_index_path(user_id))
+
+
+def _match_where(meta: Dict[str, Any], where: Dict[str, Any] | None) -> bool:
+    """
+    Subset filter Chroma yang dipakai retrieval: equality, `$in`, `$and`, `$or`.
+    """
+    if not where:
+        return True
+    if "$and" in where:
+        return all(_match_where(meta, cond) for cond in where.get("$and") or [] if isinstance(cond, dict))
+    if "$or" in where:
+        return any(_match_where(meta, cond) for cond in where.get("$or") or [] if isinstance(cond, dict))
+    for key, val in where.items():
+        if isinstance(val, dict):
+            if "$in" in val:
+                if str(meta.get(key)) not in {str(v) for v in val.get("$in") or []}:
+                    return False
+            # operator lain tidak dipakai di retrieval; anggap lolos
+            continue
+        if str(meta.get(key)) != str(val):
+            return False
+    return True
+
+
+def search(user_id: Any, query: str, k: int, filter_where: Dict[str, Any] | None = None) -> List[Tuple[Document, float]]:
+    entries, bm25 = _get_index(user_id)
+    if not entries or bm25 is None:
+        return []
+    q_tokens = tokenize(query)
+    if not q_tokens:
+        return []
+
+    # IDF BM25Okapi bisa negatif untuk term yang ada di >= separuh chunk (korpus kecil),
+    # jadi jangan potong di skor <= 0; cukup buang chunk yang tidak berbagi token query.
+    q_set = set(q_tokens)
+    scores = bm25.get_scores(q_tokens)
+    ranked = sorted(range(len(entries)), key=lambda i: scores[i], reverse=True)
+    out: List[Tuple[Document, float]] = []
+    for i in ranked:
+        if len(out) >= max(1, int(k)):
+            break
+        if not q_set.intersection(tokenize(entries[i].get("text", ""))):
+            continue
+        meta = dict(entries[i].get("metadata") or {})
+        if not _match_where(meta, filter_where):
+            continue
+        out.append((Document(page_content=entries[i].get("text", ""), metadata=meta), float(scores[i])))
+    return out
@@ -1,11 +1,14 @@
 # core/ai_engine/vector_ops.py
 from __future__ import annotations
 
-from typing import Optional, Tuple
+from typing import Any, Dict, List, Optional, Sequence, Tuple
 import logging
+import os
 import time
 
-from .config import get_vectorstore
+from .config import collection_for_user, get_vectorstore, sharding_mode
+from . import sparse_index
+from .corpus import bump_corpus_version
 
 logger = logging.getLogger(__name__)
 
@@ -22,48 +25,167 @@ def _get_collection(vectorstore):
     return col
 
 
+def incremental_reingest_enabled() -> bool:
+    """
+    True -> reingest tidak menghapus vector lama dulu; process_document melakukan
+    upsert berbasis chunk id deterministik (hanya chunk baru yang di-embed).
+    """
+    val = str(os.environ.get("RAG_INCREMENTAL_REINGEST", "1")).strip().lower()
+    return val in {"1", "true", "yes", "on"}
+
+
+def embed_batch_size() -> int:
+    try:
+        return max(1, int(os.environ.get("RAG_EMBED_BATCH_SIZE", "64")))
+    except Exception:
+        return 64
+
+
+def upsert_doc_chunks(
+    vectorstore,
+    where: Dict[str, Any],
+    ids: Sequence[str],
+    texts: Sequence[str],
+    metadatas: Sequence[Dict[str, Any]],
+    batch_size: Optional[int] = None,
+) -> Dict[str, int]:
+    """
+    Diff-based upsert chunk 1 dokumen (where = identitas dokumen di Chroma):
+    - id baru            -> embed + add
+    - id hilang          -> delete
+    - id sama            -> tidak di-embed ulang; metadata di-update jika berubah
+    Return statistik {"added", "deleted", "kept", "meta_updated"}.
+    """
+    col = _get_collection(vectorstore)
+    existing_meta: Dict[str, Dict[str, Any]] = {}
+    if col is not None:
+        try:
+            got = col.get(where=where, include=["metadatas"])
+            for cid, meta in zip(got.get("ids") or [], got.get("metadatas") or []):
+                existing_meta[str(cid)] = meta or {}
+        except Exception as e:
+            logger.warning("vector_ops upsert: baca chunk lama gagal where=%s err=%r", where, e)
+
+    new_idx = [i for i, cid in enumerate(ids) if cid not in existing_meta]
+    keep_ids = set(ids)
+    stale_ids = [cid for cid in existing_meta if cid not in keep_ids]
+    changed = [i for i, cid in enumerate(ids) if cid in existing_meta and existing_meta[cid] != metadatas[i]]
+
+    if stale_ids and col is not None:
+        col.delete(ids=stale_ids)
+    if changed and col is not None:
+        col.update(ids=[ids[i] for i in changed], metadatas=[metadatas[i] for i in changed])
+    # embed + tulis per batch: memori embedding & payload Chroma tetap terbatas
+    step = max(1, int(batch_size or embed_batch_size()))
+    for start in range(0, len(new_idx), step):
+        part = new_idx[start:start + step]
+        vectorstore.add_texts(
+            texts=[texts[i] for i in part],
+            metadatas=[metadatas[i] for i in part],
+            ids=[ids[i] for i in part],
+        )
+
+    return {
+        "added": len(new_idx),
+        "deleted": len(stale_ids),
+        "kept": len(ids) - len(new_idx),
+        "meta_updated": len(changed),
+    }
+
+
+def delete_batch_size() -> int:
+    try:
+        return max(1, int(os.environ.get("RAG_DELETE_BATCH_SIZE", "500")))
+    except Exception:
+        return 500
+
+
+def _get_ids(col, where) -> List[str]:
+    # include=[] -> hanya id; dokumen/metadata (bisa MB per dokumen besar) tidak ikut dibaca
+    got = col.get(where=where, include=[])
+    return [str(i) for i in (got.get("ids", []) or [])]
+
+
+def _delete_ids(col, ids: Sequence[str], batch_size: Optional[int] = None) -> None:
+    step = max(1, int(batch_size or delete_batch_size()))
+    for start in range(0, len(ids), step):
+        col.delete(ids=list(ids[start:start + step]))
+
+
 def delete_vectors_for_doc(user_id: str, doc_id: Optional[str] = None, source: Optional[str] = None) -> int:
     """
     Hapus embeddings lama untuk 1 dokumen.
     Prioritas: user_id + doc_id.
     Fallback: user_id + source (untuk data lama yang belum punya doc_id).
 
-    Return jumlah vector terhapus (best effort; kadang Chroma tidak mengembalikan count).
+    Return jumlah vector terhapus.
     """
-    vs = get_vectorstore()
+    vs = get_vectorstore(collection_for_user(user_id))
     col = _get_collection(vs)
     if col is None:
         logger.warning("vector_ops: collection not found; skip delete")
         return 0
 
-    if doc_id:
-        where = {"$and": [{"user_id": str(user_id)}, {"doc_id": str(doc_id)}]}
-    elif source:
-        where = {"$and": [{"user_id": str(user_id)}, {"source": str(source)}]}
-    else:
+    where = _build_where(user_id=user_id, doc_id=doc_id, source=source)
+    if where is None:
         # unsafe: jangan delete kalau tidak ada identitas dokumen
         return 0
 
-    # best-effort count
-    count = 0
-    try:
-        got = col.get(where=where)
-        count = len(got.get("ids", []) or [])
-    except Exception:
-        pass
-
     try:
-        col.delete(where=where)
+        ids = _get_ids(col, where)
+        _delete_ids(col, ids)
         try:
             vs.persist()
         except Exception:
             pass
-        return count
+        sparse_index.remove_document(user_id, doc_id=doc_id, source=source)
+        bump_corpus_version(user_id)
+        return len(ids)
     except Exception as e:
         logger.warning("vector_ops: delete_vectors_for_doc failed err=%r where=%s", e, where)
         return 0
 
 
+def delete_vectors_for_docs(user_id: str, doc_ids: Sequence[Any], sources: Optional[Sequence[str]] = None) -> int:
+    """
+    Hapus embeddings banyak dokumen milik 1 user dalam 1 operasi batch
+    (1x ambil id dengan where doc_id $in, lalu delete per batch id). Dipakai bulk reingest.
+    Fallback `sources`: chunk lama tanpa doc_id (data lama) dicocokkan lewat source.
+    """
+    doc_keys = [str(d) for d in doc_ids]
+    if not doc_keys:
+        return 0
+    vs = get_vectorstore(collection_for_user(user_id))
+    col = _get_collection(vs)
+    if col is None:
+        logger.warning("vector_ops: collection not found; skip delete")
+        return 0
+
+    where = {"$and": [{"user_id": str(user_id)}, {"doc_id": {"$in": doc_keys}}]}
+    try:
+        ids = _get_ids(col, where)
+        source_keys = sorted({str(s) for s in (sources or []) if s})
+        if source_keys:
+            got = col.get(
+                where={"$and": [{"user_id": str(user_id)}, {"source": {"$in": source_keys}}]},
+                include=["metadatas"],
+            )
+            # hanya chunk tanpa doc_id; chunk dokumen lain dengan judul sama tidak ikut terhapus
+            ids.extend(
+                str(i)
+                for i, m in zip(got.get("ids", []) or [], got.get("metadatas", []) or [])
+                if not (m or {}).get("doc_id")
+            )
+        _delete_ids(col, ids)
+        for doc_id in doc_keys:
+            sparse_index.remove_document(user_id, doc_id=doc_id)
+        bump_corpus_version(user_id)
+        return len(ids)
+    except Exception as e:
+        logger.warning("vector_ops: delete_vectors_for_docs failed err=%r where=%s", e, where)
+        return 0
+
+
 def _build_where(user_id: str, doc_id: Optional[str] = None, source: Optional[str] = None):
     if doc_id:
         return {"$and": [{"user_id": str(user_id)}, {"doc_id": str(doc_id)}]}
@@ -73,8 +195,7 @@ def _build_where(user_id: str, doc_id: Optional[str] = None, source: Optional[st
 
 
 def _count_ids(col, where) -> int:
-    got = col.get(where=where)
-    return len(got.get("ids", []) or [])
+    return len(_get_ids(col, where))
 
 
 def delete_vectors_for_doc_strict(
@@ -86,9 +207,11 @@ def delete_vectors_for_doc_strict(
 ) -> Tuple[bool, int]:
     """
     Strict delete untuk memastikan vector benar-benar hilang.
+    Alur normal 1 putaran: ambil id saja -> delete per batch id -> verifikasi hitung id.
+    Retry (dengan jeda) hanya jika verifikasi masih menemukan sisa.
     Return: (ok, remaining_vectors)
     """
-    vs = get_vectorstore()
+    vs = get_vectorstore(collection_for_user(user_id))
     col = _get_collection(vs)
     if col is None:
         logger.error("vector_ops strict: collection not found")
@@ -99,9 +222,13 @@ def delete_vectors_for_doc_strict(
         logger.error("vector_ops strict: missing identity user_id=%s doc_id=%s source=%s", user_id, doc_id, source)
         return False, -1
 
+    remaining = -1
+    ids: Optional[List[str]] = None
     for attempt in range(1, max(1, retries) + 1):
         try:
-            col.delete(where=where)
+            if ids is None:
+                ids = _get_ids(col, where)
+            _delete_ids(col, ids)
             try:
                 vs.persist()
             except Exception:
@@ -110,23 +237,21 @@ def delete_vectors_for_doc_strict(
             logger.warning("vector_ops strict: delete failed attempt=%s where=%s err=%r", attempt, where, e)
 
         try:
-            remaining = _count_ids(col, where)
+            ids = _get_ids(col, where)
+            remaining = len(ids)
         except Exception as e:
             logger.warning("vector_ops strict: verify failed attempt=%s where=%s err=%r", attempt, where, e)
+            ids = None
             remaining = -1
 
         if remaining == 0:
+            sparse_index.remove_document(user_id, doc_id=doc_id, source=source)
+            bump_corpus_version(user_id)
             return True, 0
 
         if attempt < retries:
             time.sleep(max(0, sleep_ms) / 1000.0)
 
-    # final verify (best effort)
-    try:
-        remaining = _count_ids(col, where)
-    except Exception:
-        remaining = -1
-
     logger.error(
         "vector_ops strict: vectors still present user_id=%s doc_id=%s source=%s remaining=%s",
         user_id,
@@ -142,7 +267,7 @@ def purge_vectors_for_user(user_id: int) -> int:
     Hapus SEMUA embeddings milik user tertentu.
     Return jumlah vector terhapus (best effort).
     """
-    vs = get_vectorstore()
+    vs = get_vectorstore(collection_for_user(user_id))
     col = _get_collection(vs)
     if col is None:
         logger.warning("vector_ops: collection not found; skip purge")
@@ -150,11 +275,25 @@ def purge_vectors_for_user(user_id: int) -> int:
 
     where = {"user_id": str(user_id)}
 
-    # best-effort count
+    if sharding_mode() == "user":
+        # collection milik user sendiri -> hapus semua id tanpa filter metadata.
+        # Collection tidak di-drop: proses lain (web worker, ingest_worker) memegang handle
+        # collection ini di registry dan akan kena NotFoundError jika collection dihapus.
+        try:
+            ids = [str(i) for i in (col.get(include=[]).get("ids", []) or [])]
+            _delete_ids(col, ids)
+            sparse_index.purge_user(user_id)
+            bump_corpus_version(user_id)
+            logger.warning(" PURGE vectors user_id=%s deleted=%s (shard user)", user_id, len(ids))
+            return len(ids)
+        except Exception as e:
+            logger.warning("vector_ops: purge shard user gagal user_id=%s err=%r", user_id, e)
+            return 0
+
+    # best-effort count (id saja)
     count = 0
     try:
-        got = col.get(where=where)
-        count = len(got.get("ids", []) or [])
+        count = _count_ids(col, where)
     except Exception:
         pass
 
@@ -165,6 +304,8 @@ def purge_vectors_for_user(user_id: int) -> int:
         except Exception:
             pass
 
+        sparse_index.purge_user(user_id)
+        bump_corpus_version(user_id)
         logger.warning(" PURGE vectors user_id=%s deleted≈%s", user_id, count)
         return count
     except Exception as e:
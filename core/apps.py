@@ -1,5 +1,16 @@
+import os
+
 from django.apps import AppConfig
 
 
 class CoreConfig(AppConfig):
     name = 'core'
+
+    def ready(self):
+        from . import signals  # noqa: F401
+
+        # opt-in: buka Chroma + load embedding saat startup, bukan saat request pertama
+        if os.environ.get("RAG_VECTORSTORE_WARMUP", "0").strip().lower() in {"1", "true", "yes", "on"}:
+            from .ai_engine.config import warmup_vectorstore
+
+            warmup_vectorstore()
@@ -0,0 +1,219 @@
+from __future__ import annotations
+
+import logging
+import os
+import socket
+import threading
+from datetime import timedelta
+from typing import Any, Dict, List, Optional
+
+from django.db.models import F
+from django.utils import timezone
+
+from .ai_engine.ingest import process_document
+from .ai_engine.vector_ops import delete_vectors_for_doc, incremental_reingest_enabled
+from .models import AcademicDocument, IngestionJob
+
+logger = logging.getLogger(__name__)
+
+
+def _env_bool(name: str, default: bool = False) -> bool:
+    val = str(os.environ.get(name, "1" if default else "0")).strip().lower()
+    return val in {"1", "true", "yes", "on"}
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.environ.get(name, str(default)))
+    except Exception:
+        return default
+
+
+# sama dengan cabang parser di process_document(); dicek di awal agar file yang
+# pasti ditolak tidak sempat masuk antrian
+SUPPORTED_EXTENSIONS = {"pdf", "xlsx", "xls", "csv", "md", "txt"}
+
+
+def ingest_queue_enabled() -> bool:
+    """
+    True -> upload/reingest API hanya membuat job; ingest dijalankan `ingest_worker`.
+    False (default) -> ingest inline di request (perilaku lama). Aktifkan hanya jika
+    worker sudah berjalan, kalau tidak job akan menunggu selamanya.
+    """
+    return _env_bool("RAG_INGEST_QUEUE", default=False)
+
+
+def max_concurrent_jobs() -> int:
+    # ingest berat di CPU (parsing + embedding) -> default = jumlah core
+    return max(1, _env_int("RAG_INGEST_MAX_CONCURRENCY", os.cpu_count() or 1))
+
+
+def is_supported_filename(name: str) -> bool:
+    return str(name or "").rsplit(".", 1)[-1].lower() in SUPPORTED_EXTENSIONS
+
+
+def default_worker_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}:{threading.get_ident()}"
+
+
+def enqueue_document(doc: AcademicDocument, kind: str = IngestionJob.KIND_UPLOAD) -> IngestionJob:
+    AcademicDocument.objects.filter(id=doc.id).update(
+        ingest_status=AcademicDocument.INGEST_PENDING,
+        ingest_progress=0,
+        ingest_error="",
+    )
+    return IngestionJob.objects.create(
+        user=doc.user,
+        document=doc,
+        filename=(doc.title or os.path.basename(getattr(doc.file, "name", "") or ""))[:255],
+        kind=kind,
+    )
+
+
+def serialize_job(job: IngestionJob) -> Dict[str, Any]:
+    return {
+        "job_id": job.id,
+        "doc_id": job.document_id,
+        "filename": job.filename,
+        "kind": job.kind,
+        "status": job.status,
+        "progress": int(job.progress or 0),
+        "stage": job.stage,
+        "error": job.error,
+        "created_at": job.created_at.strftime("%Y-%m-%d %H:%M:%S") if job.created_at else None,
+        "finished_at": job.finished_at.strftime("%Y-%m-%d %H:%M:%S") if job.finished_at else None,
+    }
+
+
+def list_jobs_for_user(user, job_ids: Optional[List[int]] = None, limit: int = 50) -> List[Dict[str, Any]]:
+    qs = IngestionJob.objects.filter(user=user).order_by("-created_at")
+    if job_ids:
+        qs = qs.filter(id__in=job_ids)
+    return [serialize_job(j) for j in qs[: max(1, int(limit))]]
+
+
+def claim_next_job(worker_id: str) -> Optional[IngestionJob]:
+    """
+    Ambil 1 job queued secara atomic (UPDATE ... WHERE status=queued), aman dipakai
+    banyak proses worker di DB apa pun tanpa select_for_update.
+    Return None jika antrian kosong atau job running sudah mencapai batas concurrency.
+    """
+    if IngestionJob.objects.filter(status=IngestionJob.STATUS_RUNNING).count() >= max_concurrent_jobs():
+        return None
+
+    candidates = (
+        IngestionJob.objects.filter(status=IngestionJob.STATUS_QUEUED)
+        .order_by("created_at", "id")
+        .values_list("id", flat=True)[:10]
+    )
+    for job_id in candidates:
+        claimed = IngestionJob.objects.filter(id=job_id, status=IngestionJob.STATUS_QUEUED).update(
+            status=IngestionJob.STATUS_RUNNING,
+            started_at=timezone.now(),
+            worker=worker_id[:128],
+            attempts=F("attempts") + 1,
+            stage="claimed",
+        )
+        if claimed:
+            return IngestionJob.objects.select_related("document", "user").get(id=job_id)
+    return None
+
+
+def requeue_stale_jobs(timeout_seconds: Optional[int] = None) -> int:
+    """
+    Job running yang terlalu lama (worker mati) dikembalikan ke antrian,
+    atau ditandai gagal jika sudah melewati batas percobaan.
+    """
+    timeout_seconds = timeout_seconds or max(60, _env_int("RAG_INGEST_JOB_TIMEOUT", 1800))
+    max_attempts = max(1, _env_int("RAG_INGEST_MAX_ATTEMPTS", 2))
+    cutoff = timezone.now() - timedelta(seconds=timeout_seconds)
+    stale = IngestionJob.objects.filter(status=IngestionJob.STATUS_RUNNING, started_at__lt=cutoff)
+
+    failed = stale.filter(attempts__gte=max_attempts).update(
+        status=IngestionJob.STATUS_FAILED,
+        error="Timeout: worker berhenti sebelum ingest selesai.",
+        finished_at=timezone.now(),
+    )
+    requeued = stale.filter(attempts__lt=max_attempts).update(
+        status=IngestionJob.STATUS_QUEUED,
+        stage="requeued",
+        worker="",
+    )
+    if failed or requeued:
+        logger.warning("ingest queue: stale jobs requeued=%s failed=%s", requeued, failed)
+    return requeued
+
+
+def _update_progress(job: IngestionJob, pct: int, stage: str) -> None:
+    pct = max(0, min(100, int(pct)))
+    IngestionJob.objects.filter(id=job.id).update(progress=pct, stage=stage[:32])
+    if job.document_id:
+        AcademicDocument.objects.filter(id=job.document_id).update(ingest_progress=pct)
+
+
+def _finish(job: IngestionJob, status: str, error: str = "") -> None:
+    IngestionJob.objects.filter(id=job.id).update(
+        status=status,
+        error=error,
+        progress=100 if status == IngestionJob.STATUS_DONE else F("progress"),
+        stage="done" if status == IngestionJob.STATUS_DONE else "failed",
+        finished_at=timezone.now(),
+    )
+
+
+def run_job(job: IngestionJob) -> bool:
+    """
+    Jalankan 1 job (dipanggil worker). Semantik sama dengan jalur inline:
+    - upload gagal parsing -> record + file dihapus agar DB bersih
+    - reingest -> upsert diff chunk (RAG_INCREMENTAL_REINGEST=1), atau hapus vector lama dulu
+    """
+    doc = job.document
+    if doc is None:
+        _finish(job, IngestionJob.STATUS_FAILED, "Dokumen sudah dihapus.")
+        return False
+
+    AcademicDocument.objects.filter(id=doc.id).update(
+        ingest_status=AcademicDocument.INGEST_PROCESSING,
+        ingest_progress=0,
+        ingest_error="",
+    )
+    logger.info("ingest job start job_id=%s doc_id=%s kind=%s", job.id, doc.id, job.kind)
+
+    try:
+        if job.kind == IngestionJob.KIND_REINGEST and not incremental_reingest_enabled():
+            delete_vectors_for_doc(user_id=str(doc.user_id), doc_id=str(doc.id), source=getattr(doc, "title", None))
+
+        ok = process_document(doc, progress_callback=lambda pct, stage: _update_progress(job, pct, stage))
+    except Exception as e:
+        logger.error("ingest job crash job_id=%s err=%r", job.id, e, exc_info=True)
+        ok = False
+        error = f"System Error: {e!r}"[:500]
+    else:
+        error = "" if ok else "Gagal Parsing"
+
+    if ok:
+        AcademicDocument.objects.filter(id=doc.id).update(
+            is_embedded=True,
+            ingest_status=AcademicDocument.INGEST_READY,
+            ingest_progress=100,
+            ingest_error="",
+        )
+        _finish(job, IngestionJob.STATUS_DONE)
+        logger.info("ingest job done job_id=%s doc_id=%s", job.id, doc.id)
+        return True
+
+    _finish(job, IngestionJob.STATUS_FAILED, error)
+    if job.kind == IngestionJob.KIND_UPLOAD:
+        try:
+            doc.file.delete(save=False)
+        except Exception:
+            pass
+        doc.delete()
+    else:
+        AcademicDocument.objects.filter(id=doc.id).update(
+            is_embedded=False,
+            ingest_status=AcademicDocument.INGEST_FAILED,
+            ingest_error=error,
+        )
+    logger.warning("ingest job failed job_id=%s doc_id=%s err=%s", job.id, job.document_id, error)
+    return False
@@ -0,0 +1,94 @@
+from __future__ import annotations
+
+import threading
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from core.ingest_jobs import (
+    claim_next_job,
+    default_worker_id,
+    max_concurrent_jobs,
+    requeue_stale_jobs,
+    run_job,
+)
+from core.models import IngestionJob
+
+
+class Command(BaseCommand):
+    help = (
+        "Worker antrian ingest (DB-backed). Contoh: python manage.py ingest_worker "
+        "atau python manage.py ingest_worker --once untuk memproses antrian lalu keluar"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--concurrency",
+            type=int,
+            default=0,
+            help="Jumlah job paralel di proses ini (default: RAG_INGEST_MAX_CONCURRENCY / jumlah core)",
+        )
+        parser.add_argument(
+            "--poll-interval",
+            type=float,
+            default=2.0,
+            help="Jeda (detik) saat antrian kosong",
+        )
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Proses job yang ada sampai antrian kosong, lalu keluar",
+        )
+
+    def handle(self, *args, **options):
+        concurrency = int(options.get("concurrency") or 0) or max_concurrent_jobs()
+        poll_interval = max(0.1, float(options.get("poll_interval") or 2.0))
+        once = bool(options.get("once"))
+
+        self.stdout.write(self.style.SUCCESS(f"Ingest worker start: concurrency={concurrency} once={once}"))
+        requeue_stale_jobs()
+
+        stop = threading.Event()
+        counters = {"ok": 0, "fail": 0}
+        lock = threading.Lock()
+
+        def _loop():
+            worker_id = default_worker_id()
+            while not stop.is_set():
+                close_old_connections()
+                job = claim_next_job(worker_id)
+                if job is None:
+                    if once and not IngestionJob.objects.filter(status=IngestionJob.STATUS_QUEUED).exists():
+                        break
+                    stop.wait(poll_interval)
+                    continue
+
+                self.stdout.write(f"[job {job.id}] {job.kind} doc_id={job.document_id} '{job.filename}'")
+                ok = run_job(job)
+                with lock:
+                    counters["ok" if ok else "fail"] += 1
+                if ok:
+                    self.stdout.write(self.style.SUCCESS(f"  ✅ OK job_id={job.id}"))
+                else:
+                    self.stdout.write(self.style.ERROR(f"  ❌ FAIL job_id={job.id}"))
+            close_old_connections()
+
+        threads = [threading.Thread(target=_loop, name=f"ingest-worker-{i}", daemon=True) for i in range(concurrency)]
+        for t in threads:
+            t.start()
+
+        try:
+            last_stale_check = time.monotonic()
+            while any(t.is_alive() for t in threads):
+                time.sleep(0.5)
+                if time.monotonic() - last_stale_check > 60:
+                    requeue_stale_jobs()
+                    last_stale_check = time.monotonic()
+        except KeyboardInterrupt:
+            self.stdout.write(self.style.WARNING("Menghentikan worker... (menunggu job berjalan selesai)"))
+            stop.set()
+            for t in threads:
+                t.join()
+
+        self.stdout.write(self.style.SUCCESS(f"Selesai. OK={counters['ok']} FAIL={counters['fail']}"))
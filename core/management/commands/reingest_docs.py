@@ -6,8 +6,7 @@ from django.core.management.base import BaseCommand, CommandError
 from django.contrib.auth import get_user_model
 
 from core.models import AcademicDocument
-from core.ai_engine.ingest import process_document
-from core.ai_engine.vector_ops import delete_vectors_for_doc
+from core.ai_engine.bulk_ingest import bulk_workers, reingest_documents
 
 
 User = get_user_model()
@@ -45,6 +44,17 @@ class Command(BaseCommand):
             action="store_true",
             help="(Opsional) hanya tampilkan dokumen yang akan diproses, tanpa delete/ingest",
         )
+        parser.add_argument(
+            "--reparse",
+            action="store_true",
+            help="(Opsional) abaikan extraction cache, parse ulang file + LLM repair",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=0,
+            help="(Opsional) jumlah parser paralel (default: RAG_BULK_REINGEST_WORKERS)",
+        )
 
     def handle(self, *args, **options):
         user_id: int = options["user"]
@@ -52,6 +62,8 @@ class Command(BaseCommand):
         doc_ids_raw: str = (options.get("doc_ids") or "").strip()
         limit: int = int(options.get("limit") or 0)
         dry_run: bool = bool(options.get("dry_run"))
+        reparse: bool = bool(options.get("reparse"))
+        workers: int = int(options.get("workers") or 0) or bulk_workers()
 
         # validate user
         try:
@@ -73,7 +85,7 @@ class Command(BaseCommand):
         if not do_all and not doc_ids:
             raise CommandError("Wajib pilih salah satu: --all atau --doc-ids 1,2,3")
 
-        qs = AcademicDocument.objects.filter(user=user).order_by("-uploaded_at")
+        qs = AcademicDocument.objects.filter(user=user).select_related("user").order_by("-uploaded_at")
         if doc_ids:
             qs = qs.filter(id__in=doc_ids)
 
@@ -85,40 +97,35 @@ class Command(BaseCommand):
             self.stdout.write(self.style.WARNING("Tidak ada dokumen untuk diproses."))
             return
 
-        self.stdout.write(self.style.SUCCESS(f"Re-ingest start: user={user.username} (id={user.id}), docs={total}, dry_run={dry_run}"))
-
-        ok_count = 0
-        fail_count = 0
-
-        for idx, doc in enumerate(qs, start=1):
-            title = getattr(doc, "title", None) or getattr(doc.file, "name", f"doc-{doc.id}")
-            self.stdout.write(f"[{idx}/{total}] doc_id={doc.id} title='{title}' file='{getattr(doc.file, 'name', '-')}'")
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Re-ingest start: user={user.username} (id={user.id}), docs={total}, workers={workers}, dry_run={dry_run}"
+            )
+        )
 
-            if dry_run:
-                continue
+        docs = list(qs)
+        if dry_run:
+            for idx, doc in enumerate(docs, start=1):
+                title = getattr(doc, "title", None) or getattr(doc.file, "name", f"doc-{doc.id}")
+                self.stdout.write(f"[{idx}/{total}] doc_id={doc.id} title='{title}' file='{getattr(doc.file, 'name', '-')}'")
+            self.stdout.write("")
+            self.stdout.write(self.style.WARNING("Dry-run selesai (tidak ada perubahan)."))
+            return
 
-            try:
-                # 1) delete lama (aman: by doc_id; fallback: source)
-                delete_vectors_for_doc(user_id=str(user.id), doc_id=str(doc.id), source=title)
+        def _progress(stage: str, done: int, total_docs: int, detail: str) -> None:
+            self.stdout.write(f"[{stage} {done}/{total_docs}] {detail}")
 
-                # 2) ingest ulang
-                ok = process_document(doc)
-                if ok:
-                    doc.is_embedded = True
-                    doc.save(update_fields=["is_embedded"])
-                    ok_count += 1
-                    self.stdout.write(self.style.SUCCESS(f"  ✅ OK re-ingest doc_id={doc.id}"))
-                else:
-                    fail_count += 1
-                    self.stdout.write(self.style.ERROR(f"  ❌ FAIL parsing/ingest doc_id={doc.id}"))
+        # parse paralel -> 1 delete/diff batch per user -> upsert batch besar -> 1 bulk_update status
+        result = reingest_documents(docs, use_extraction_cache=not reparse, workers=workers, progress=_progress)
 
-            except Exception as e:
-                fail_count += 1
-                self.stdout.write(self.style.ERROR(f"  ❌ ERROR doc_id={doc.id}: {repr(e)}"))
+        for doc_id in result["failed_ids"]:
+            self.stdout.write(self.style.ERROR(f"  ❌ FAIL parsing/ingest doc_id={doc_id}"))
 
         self.stdout.write("")
-        if dry_run:
-            self.stdout.write(self.style.WARNING("Dry-run selesai (tidak ada perubahan)."))
-            return
-
-        self.stdout.write(self.style.SUCCESS(f"Selesai. OK={ok_count} FAIL={fail_count} (total={total})"))
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"✅ Selesai. OK={len(result['ok_ids'])} FAIL={len(result['failed_ids'])} (total={total}) "
+                f"chunks added={result['added']} deleted={result['deleted']} kept={result['kept']} "
+                f"ms={result['elapsed_ms']}"
+            )
+        )
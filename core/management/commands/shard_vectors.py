@@ -0,0 +1,93 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.contrib.auth.models import User
+
+from core.ai_engine.config import DEFAULT_COLLECTION, collection_for_user, get_vectorstore, sharding_mode
+
+
+class Command(BaseCommand):
+    help = (
+        "Pindahkan chunk per-user dari collection dasar ke shard user (RAG_VECTOR_SHARDING). "
+        "Embedding dipakai ulang, tidak ada re-embed. Contoh: python manage.py shard_vectors --user 1"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--user",
+            type=int,
+            default=0,
+            help="(Opsional) hanya pindahkan vector milik user ini (default: semua user)",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=500,
+            help="(Opsional) jumlah chunk per batch get/upsert (default 500)",
+        )
+        parser.add_argument(
+            "--keep-source",
+            action="store_true",
+            help="(Opsional) jangan hapus chunk dari collection dasar setelah dipindah",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="(Opsional) hanya hitung chunk yang akan dipindah",
+        )
+
+    def handle(self, *args, **options):
+        if sharding_mode() == "off":
+            raise CommandError("❌ RAG_VECTOR_SHARDING=off. Set ke 'user' atau 'bucket' dulu.")
+
+        batch_size = max(1, int(options.get("batch_size") or 500))
+        keep_source = bool(options.get("keep_source"))
+        dry_run = bool(options.get("dry_run"))
+
+        user_ids = list(User.objects.values_list("id", flat=True))
+        if options.get("user"):
+            user_ids = [uid for uid in user_ids if uid == options["user"]]
+            if not user_ids:
+                raise CommandError(f"User id={options['user']} tidak ditemukan.")
+
+        # chunk bersama (user_id=SHARED_OWNER) tidak ikut dipindah: tetap di collection dasar
+        source = get_vectorstore(DEFAULT_COLLECTION)._collection
+        total = 0
+        for uid in user_ids:
+            target_name = collection_for_user(uid)
+            where = {"user_id": str(uid)}
+            if dry_run:
+                count = len(source.get(where=where, include=[]).get("ids") or [])
+                self.stdout.write(f"- user_id={uid} -> {target_name} chunks={count}")
+                total += count
+                continue
+
+            target = get_vectorstore(target_name)._collection
+            moved = 0
+            offset = 0
+            while True:
+                got = source.get(
+                    where=where,
+                    limit=batch_size,
+                    offset=offset,
+                    include=["embeddings", "documents", "metadatas"],
+                )
+                ids = list(got.get("ids") or [])
+                if not ids:
+                    break
+                target.upsert(
+                    ids=ids,
+                    embeddings=got.get("embeddings"),
+                    documents=got.get("documents"),
+                    metadatas=got.get("metadatas"),
+                )
+                if keep_source:
+                    offset += len(ids)
+                else:
+                    source.delete(ids=ids)
+                moved += len(ids)
+            total += moved
+            self.stdout.write(f"- user_id={uid} -> {target_name} moved={moved}")
+
+        verb = "akan dipindah" if dry_run else "dipindah"
+        self.stdout.write(
+            self.style.SUCCESS(f"✅ Selesai: {total} chunk {verb} dari {len(user_ids)} user.")
+        )
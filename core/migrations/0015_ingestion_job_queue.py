@@ -0,0 +1,112 @@
+# Generated manually for DB-backed ingestion job queue
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def _mark_existing_documents(apps, schema_editor):
+    AcademicDocument = apps.get_model("core", "AcademicDocument")
+    AcademicDocument.objects.filter(is_embedded=True).update(ingest_status="ready", ingest_progress=100)
+    AcademicDocument.objects.filter(is_embedded=False).update(ingest_status="failed")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ("core", "0014_rename_core_userlo_is_acti_1f1838_idx_core_userlo_is_acti_22952d_idx_and_more"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="academicdocument",
+            name="ingest_status",
+            field=models.CharField(
+                choices=[
+                    ("pending", "Pending"),
+                    ("processing", "Processing"),
+                    ("ready", "Ready"),
+                    ("failed", "Failed"),
+                ],
+                default="pending",
+                max_length=16,
+            ),
+        ),
+        migrations.AddField(
+            model_name="academicdocument",
+            name="ingest_progress",
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="academicdocument",
+            name="ingest_error",
+            field=models.TextField(blank=True, default=""),
+        ),
+        migrations.RunPython(_mark_existing_documents, migrations.RunPython.noop),
+        migrations.CreateModel(
+            name="IngestionJob",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("filename", models.CharField(blank=True, default="", max_length=255)),
+                (
+                    "kind",
+                    models.CharField(
+                        choices=[("upload", "Upload"), ("reingest", "Reingest")],
+                        default="upload",
+                        max_length=16,
+                    ),
+                ),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("queued", "Queued"),
+                            ("running", "Running"),
+                            ("done", "Done"),
+                            ("failed", "Failed"),
+                        ],
+                        default="queued",
+                        max_length=16,
+                    ),
+                ),
+                ("progress", models.PositiveSmallIntegerField(default=0)),
+                ("stage", models.CharField(blank=True, default="", max_length=32)),
+                ("error", models.TextField(blank=True, default="")),
+                ("attempts", models.PositiveSmallIntegerField(default=0)),
+                ("worker", models.CharField(blank=True, default="", max_length=128)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("started_at", models.DateTimeField(blank=True, null=True)),
+                ("finished_at", models.DateTimeField(blank=True, null=True)),
+                (
+                    "document",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="ingestion_jobs",
+                        to="core.academicdocument",
+                    ),
+                ),
+                (
+                    "user",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="ingestion_jobs",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ["-created_at"],
+            },
+        ),
+        migrations.AddIndex(
+            model_name="ingestionjob",
+            index=models.Index(fields=["status", "created_at"], name="core_ingest_status_8c1f0a_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="ingestionjob",
+            index=models.Index(fields=["user", "status"], name="core_ingest_user_id_5b7e2d_idx"),
+        ),
+    ]
@@ -0,0 +1,16 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0015_ingestion_job_queue"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="academicdocument",
+            name="pdf_table_preview",
+            field=models.JSONField(blank=True, default=list),
+        ),
+    ]
@@ -0,0 +1,29 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0016_academicdocument_pdf_table_preview"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ExtractionCache",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("content_hash", models.CharField(max_length=64)),
+                ("parser_version", models.CharField(max_length=64)),
+                ("file_type", models.CharField(blank=True, default="", max_length=16)),
+                ("payload", models.JSONField(default=dict)),
+                ("hits", models.PositiveIntegerField(default=0)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("last_used_at", models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                "constraints": [
+                    models.UniqueConstraint(fields=("content_hash", "parser_version"), name="uniq_extraction_cache_key"),
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,16 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0017_extractioncache"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="academicdocument",
+            name="content_hash",
+            field=models.CharField(blank=True, db_index=True, default="", max_length=64),
+        ),
+    ]
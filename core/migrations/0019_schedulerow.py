@@ -0,0 +1,58 @@
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0018_academicdocument_content_hash"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ScheduleRow",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("row_index", models.PositiveIntegerField(default=0)),
+                ("hari", models.CharField(blank=True, default="", max_length=16)),
+                ("sesi", models.CharField(blank=True, default="", max_length=32)),
+                ("jam", models.CharField(blank=True, default="", max_length=32)),
+                ("kode", models.CharField(blank=True, default="", max_length=32)),
+                ("mata_kuliah", models.CharField(blank=True, default="", max_length=255)),
+                ("sks", models.CharField(blank=True, default="", max_length=8)),
+                ("kelas", models.CharField(blank=True, default="", max_length=32)),
+                ("ruang", models.CharField(blank=True, default="", max_length=64)),
+                ("dosen", models.CharField(blank=True, default="", max_length=255)),
+                ("semester", models.PositiveSmallIntegerField(blank=True, null=True)),
+                ("page", models.PositiveIntegerField(blank=True, null=True)),
+                ("extra", models.JSONField(blank=True, default=dict)),
+                (
+                    "document",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="schedule_rows",
+                        to="core.academicdocument",
+                    ),
+                ),
+                (
+                    "user",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="schedule_rows",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ["document_id", "row_index"],
+                "indexes": [
+                    models.Index(
+                        fields=["user", "document", "hari", "semester", "kode"],
+                        name="schedule_row_lookup_idx",
+                    )
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,22 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0021_corpusversion"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="LlmModelHealth",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("model_name", models.CharField(max_length=200, unique=True)),
+                ("samples", models.JSONField(default=list)),
+                ("consecutive_failures", models.PositiveIntegerField(default=0)),
+                ("open_until", models.FloatField(default=0.0)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
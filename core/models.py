@@ -5,12 +5,31 @@ import os
 
 
 class AcademicDocument(models.Model):
+    INGEST_PENDING = "pending"
+    INGEST_PROCESSING = "processing"
+    INGEST_READY = "ready"
+    INGEST_FAILED = "failed"
+    INGEST_STATUS_CHOICES = [
+        (INGEST_PENDING, "Pending"),
+        (INGEST_PROCESSING, "Processing"),
+        (INGEST_READY, "Ready"),
+        (INGEST_FAILED, "Failed"),
+    ]
+
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     title = models.CharField(max_length=255, blank=True)
     # File akan disimpan di media/documents/tahun/bulan/
     file = models.FileField(upload_to="documents/%Y/%m/")
     uploaded_at = models.DateTimeField(auto_now_add=True)
     is_embedded = models.BooleanField(default=False)
+    # Status ingest (diisi worker antrian ingest; 0-100)
+    ingest_status = models.CharField(max_length=16, choices=INGEST_STATUS_CHOICES, default=INGEST_PENDING)
+    ingest_progress = models.PositiveSmallIntegerField(default=0)
+    ingest_error = models.TextField(blank=True, default="")
+    # Baris awal tabel PDF (kandidat header), diisi saat ingest untuk planner
+    pdf_table_preview = models.JSONField(default=list, blank=True)
+    # sha256 isi file; referensi ke chunk bersama (RAG_SHARED_DOCS) + extraction cache
+    content_hash = models.CharField(max_length=64, blank=True, default="", db_index=True)
 
     def save(self, *args, **kwargs):
         # Auto-fill title dari nama file jika kosong
@@ -22,6 +41,168 @@ class AcademicDocument(models.Model):
         return f"{self.user.username} - {self.title}"
 
 
+class IngestionJob(models.Model):
+    """
+    Antrian ingest berbasis DB (tanpa broker eksternal).
+    Diproses oleh `python manage.py ingest_worker`.
+    """
+
+    KIND_UPLOAD = "upload"
+    KIND_REINGEST = "reingest"
+    KIND_CHOICES = [
+        (KIND_UPLOAD, "Upload"),
+        (KIND_REINGEST, "Reingest"),
+    ]
+
+    STATUS_QUEUED = "queued"
+    STATUS_RUNNING = "running"
+    STATUS_DONE = "done"
+    STATUS_FAILED = "failed"
+    STATUS_CHOICES = [
+        (STATUS_QUEUED, "Queued"),
+        (STATUS_RUNNING, "Running"),
+        (STATUS_DONE, "Done"),
+        (STATUS_FAILED, "Failed"),
+    ]
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="ingestion_jobs")
+    document = models.ForeignKey(
+        AcademicDocument,
+        null=True,
+        blank=True,
+        on_delete=models.SET_NULL,
+        related_name="ingestion_jobs",
+    )
+    filename = models.CharField(max_length=255, blank=True, default="")
+    kind = models.CharField(max_length=16, choices=KIND_CHOICES, default=KIND_UPLOAD)
+    status = models.CharField(max_length=16, choices=STATUS_CHOICES, default=STATUS_QUEUED)
+    progress = models.PositiveSmallIntegerField(default=0)
+    stage = models.CharField(max_length=32, blank=True, default="")
+    error = models.TextField(blank=True, default="")
+    attempts = models.PositiveSmallIntegerField(default=0)
+    worker = models.CharField(max_length=128, blank=True, default="")
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["status", "created_at"], name="core_ingest_status_8c1f0a_idx"),
+            models.Index(fields=["user", "status"], name="core_ingest_user_id_5b7e2d_idx"),
+        ]
+        ordering = ["-created_at"]
+
+    @property
+    def is_terminal(self) -> bool:
+        return self.status in {self.STATUS_DONE, self.STATUS_FAILED}
+
+    def __str__(self):
+        return f"{self.user.username} [{self.kind}:{self.status}] {self.filename}"
+
+
+class ExtractionCache(models.Model):
+    """
+    Hasil parsing + LLM row repair per isi file (content-addressed).
+    Key: sha256 file + versi parser; dipakai ulang saat reingest / upload file identik.
+    """
+
+    content_hash = models.CharField(max_length=64)
+    parser_version = models.CharField(max_length=64)
+    file_type = models.CharField(max_length=16, blank=True, default="")
+    payload = models.JSONField(default=dict)
+    hits = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    last_used_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["content_hash", "parser_version"], name="uniq_extraction_cache_key"),
+        ]
+
+    def __str__(self):
+        return f"{self.content_hash[:12]} ({self.file_type}, v{self.parser_version}) hits={self.hits}"
+
+
+class RowRepairMemo(models.Model):
+    """
+    Memo hasil LLM row repair per fingerprint row (isi row ter-normalisasi + issues).
+    Row rusak yang sama muncul di setiap salinan jadwal fakultas & setiap reingest;
+    LLM hanya dipanggil untuk fingerprint yang belum ada di sini.
+    """
+
+    fingerprint = models.CharField(max_length=64, unique=True)
+    repaired = models.JSONField(default=dict)
+    hits = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    last_used_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.fingerprint[:12]} hits={self.hits}"
+
+
+class CorpusVersion(models.Model):
+    """
+    Versi korpus per user; naik setiap upload/reingest/delete yang menyentuh vector user.
+    Disimpan di DB supaya terbaca semua proses (web worker, ingest_worker, management command).
+    """
+
+    user_key = models.CharField(max_length=64, unique=True)
+    version = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.user_key} v{self.version}"
+
+
+class LlmModelHealth(models.Model):
+    """
+    Scoreboard kesehatan per model OpenRouter (sampel window + circuit breaker).
+    Disimpan di DB supaya semua worker memakai status circuit yang sama.
+    """
+
+    model_name = models.CharField(max_length=200, unique=True)
+    samples = models.JSONField(default=list)
+    consecutive_failures = models.PositiveIntegerField(default=0)
+    open_until = models.FloatField(default=0.0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.model_name} failures={self.consecutive_failures}"
+
+
+class ScheduleRow(models.Model):
+    """
+    Satu baris jadwal kuliah hasil ekstraksi tabel dokumen (ingest + LLM repair).
+    Dipakai lookup jadwal eksak (planner / retrieval) tanpa vector search.
+    """
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="schedule_rows")
+    document = models.ForeignKey(AcademicDocument, on_delete=models.CASCADE, related_name="schedule_rows")
+    row_index = models.PositiveIntegerField(default=0)
+    hari = models.CharField(max_length=16, blank=True, default="")
+    sesi = models.CharField(max_length=32, blank=True, default="")
+    jam = models.CharField(max_length=32, blank=True, default="")
+    kode = models.CharField(max_length=32, blank=True, default="")
+    mata_kuliah = models.CharField(max_length=255, blank=True, default="")
+    sks = models.CharField(max_length=8, blank=True, default="")
+    kelas = models.CharField(max_length=32, blank=True, default="")
+    ruang = models.CharField(max_length=64, blank=True, default="")
+    dosen = models.CharField(max_length=255, blank=True, default="")
+    semester = models.PositiveSmallIntegerField(null=True, blank=True)
+    page = models.PositiveIntegerField(null=True, blank=True)
+    # kolom non-canonical dari tabel sumber
+    extra = models.JSONField(default=dict, blank=True)
+
+    class Meta:
+        ordering = ["document_id", "row_index"]
+        indexes = [
+            models.Index(fields=["user", "document", "hari", "semester", "kode"], name="schedule_row_lookup_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.hari} {self.jam} {self.kode} {self.mata_kuliah}".strip()
+
+
 class ChatSession(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     title = models.CharField(max_length=255, default="Chat Baru")
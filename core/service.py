@@ -1,20 +1,27 @@
 # core/service.py
 import time
 import logging
-from typing import Any, Dict, List, Tuple
+from typing import Any, Dict, Iterator, List, Tuple
 
+from asgiref.sync import sync_to_async
 from django.contrib.auth.models import User
 from django.core.files.uploadedfile import UploadedFile
 
-from .models import AcademicDocument, ChatHistory, ChatSession, PlannerHistory, UserQuota
+from . import ingest_jobs
+from .models import AcademicDocument, ChatHistory, ChatSession, IngestionJob, PlannerHistory, UserQuota
+from .ai_engine.bulk_ingest import reingest_documents as bulk_reingest_documents
 from .ai_engine.ingest import process_document
-from .ai_engine.retrieval import ask_bot
-from .ai_engine.vector_ops import delete_vectors_for_doc, delete_vectors_for_doc_strict
+from .ai_engine.retrieval import aask_bot, ask_bot, ask_bot_stream
+from .ai_engine.retrieval.main import dense_vectorstores
+from .ai_engine.vector_ops import delete_vectors_for_doc_strict
 from .ai_engine.config import get_vectorstore
+from .ai_engine.shared_docs import release_if_unreferenced, shared_docs_enabled, user_visibility_filter
 from .ai_engine.retrieval.llm import (
+    HedgedInvokeError,
     build_llm,
     get_backup_models,
     get_runtime_openrouter_config,
+    invoke_hedged,
     invoke_text,
 )
 from .ai_engine.retrieval.prompt import PLANNER_OUTPUT_TEMPLATE
@@ -76,6 +83,8 @@ def serialize_documents_for_user(user: User, limit: int = 50) -> Tuple[List[Dict
             "id": d.id,
             "title": d.title,
             "is_embedded": d.is_embedded,
+            "ingest_status": d.ingest_status,
+            "ingest_progress": d.ingest_progress,
             "uploaded_at": d.uploaded_at.strftime("%Y-%m-%d %H:%M"),
             "size_bytes": size,
         })
@@ -231,7 +240,9 @@ def upload_files_batch(user: User, files: List[UploadedFile], quota_bytes: int)
             ok = process_document(doc)
             if ok:
                 doc.is_embedded = True
-                doc.save(update_fields=["is_embedded"])
+                doc.ingest_status = AcademicDocument.INGEST_READY
+                doc.ingest_progress = 100
+                doc.save(update_fields=["is_embedded", "ingest_status", "ingest_progress"])
                 success_count += 1
             else:
                 doc.delete()
@@ -251,6 +262,47 @@ def upload_files_batch(user: User, files: List[UploadedFile], quota_bytes: int)
         return {"status": "error", "msg": f"Gagal semua. Detail: {', '.join(errors)}"}
 
 
+def enqueue_upload_batch(user: User, files: List[UploadedFile], quota_bytes: int) -> Dict[str, Any]:
+    """
+    [USE-CASE: UPLOAD + ANTRIAN INGEST]
+    Sama seperti upload_files_batch(), tetapi ingest tidak dijalankan di request:
+      1) Validasi kuota + simpan file ke AcademicDocument (status pending)
+      2) Buat IngestionJob per file -> diproses `manage.py ingest_worker`
+      3) Return job id agar frontend bisa polling /api/ingest/jobs/
+    """
+    queued: List[Dict[str, Any]] = []
+    errors: List[str] = []
+
+    _, total_bytes = serialize_documents_for_user(user, limit=100000)
+    remaining_bytes = max(0, int(quota_bytes) - int(total_bytes))
+
+    for file_obj in files:
+        file_size = getattr(file_obj, "size", 0) or 0
+        if not ingest_jobs.is_supported_filename(file_obj.name):
+            errors.append(f"{file_obj.name} (Format tidak didukung)")
+            continue
+        if (total_bytes + file_size) > quota_bytes:
+            errors.append(
+                f"{file_obj.name} (Melebihi kuota. Sisa {bytes_to_human(remaining_bytes)}, file {bytes_to_human(file_size)})"
+            )
+            continue
+        try:
+            doc = AcademicDocument.objects.create(user=user, file=file_obj)
+            total_bytes += file_size
+            remaining_bytes = max(0, int(quota_bytes) - int(total_bytes))
+            queued.append(ingest_jobs.serialize_job(ingest_jobs.enqueue_document(doc, IngestionJob.KIND_UPLOAD)))
+        except Exception:
+            logger.error("enqueue upload gagal user_id=%s file=%s", user.id, getattr(file_obj, "name", "-"), exc_info=True)
+            errors.append(f"{file_obj.name} (System Error)")
+
+    if queued:
+        msg = f"{len(queued)} file masuk antrian proses."
+        if errors:
+            msg += f" (Gagal: {len(errors)})"
+        return {"status": "success", "msg": msg, "jobs": queued, "errors": errors}
+    return {"status": "error", "msg": f"Gagal semua. Detail: {', '.join(errors)}", "jobs": [], "errors": errors}
+
+
 def _maybe_update_session_title(session: ChatSession, message: str) -> None:
     if not session or not message:
         return
@@ -338,8 +390,15 @@ def _append_verified_grade_rescue(
 
 def _planner_context_for_user(user: User, query: str) -> str:
     try:
-        vectorstore = get_vectorstore()
-        docs = vectorstore.similarity_search(query or "rencana studi", k=8, filter={"user_id": str(user.id)})
+        # shard user + collection dasar (chunk bersama) seperti retrieval utama
+        scored = []
+        for vectorstore in dense_vectorstores(user.id):
+            scored.extend(
+                vectorstore.similarity_search_with_score(
+                    query or "rencana studi", k=8, filter=user_visibility_filter(user.id)
+                )
+            )
+        docs = [d for d, _ in sorted(scored, key=lambda x: x[1])]
     except Exception:
         return ""
 
@@ -383,19 +442,15 @@ def _generate_planner_with_llm(
         str(runtime_cfg.get("model") or ""),
         runtime_cfg.get("backup_models"),
     )
-    last_error = ""
-    for model_name in backup_models:
-        try:
-            llm = build_llm(model_name, runtime_cfg)
-            answer = invoke_text(llm, prompt).strip()
-            if answer:
-                return answer
-        except Exception as e:
-            last_error = str(e)
-            continue
 
-    if last_error:
-        logger.warning("planner llm failed request_id=%s err=%s", request_id, last_error)
+    def _call(model_name: str) -> str:
+        return invoke_text(build_llm(model_name, runtime_cfg), prompt).strip()
+
+    try:
+        _, _, answer = invoke_hedged(backup_models, _call, cfg=runtime_cfg, request_id=request_id, label="planner LLM")
+        return answer
+    except HedgedInvokeError as e:
+        logger.warning("planner llm failed request_id=%s err=%s", request_id, e.last_error)
     return ""
 
 
@@ -415,17 +470,44 @@ def chat_and_save(user: User, message: str, request_id: str = "-", session_id: i
     """
     session = get_or_create_chat_session(user=user, session_id=session_id)
 
-    parsed_grade = extract_grade_calc_input(message) if is_grade_rescue_query(message) else None
-    if parsed_grade:
-        calc = calculate_required_score(
-            achieved_components=parsed_grade.get("achieved_components") or [],
-            target_final_score=float(parsed_grade.get("target_final_score", 70) or 70),
-            remaining_weight=float(parsed_grade.get("remaining_weight", 0) or 0),
-        )
-        result: Dict[str, Any] = {"answer": _build_grade_rescue_response(parsed_grade, calc), "sources": []}
-    else:
+    result = _grade_rescue_result(message)
+    if result is None:
         result = ask_bot(user.id, message, request_id=request_id)
 
+    return _save_chat_result(user, session, message, result)
+
+
+async def achat_and_save(user: User, message: str, request_id: str = "-", session_id: int | None = None) -> Dict[str, Any]:
+    """
+    [USE-CASE: CHAT RAG ASYNC]
+    Versi async chat_and_save untuk view ASGI: akses DB lewat sync_to_async,
+    retrieval + LLM lewat aask_bot() sehingga worker tidak parkir menunggu OpenRouter.
+    """
+    session = await sync_to_async(get_or_create_chat_session)(user=user, session_id=session_id)
+
+    result = _grade_rescue_result(message)
+    if result is None:
+        result = await aask_bot(user.id, message, request_id=request_id)
+
+    return await sync_to_async(_save_chat_result)(user, session, message, result)
+
+
+def _grade_rescue_result(message: str) -> Dict[str, Any] | None:
+    """
+    Jawaban deterministik untuk query hitung nilai (tanpa RAG). None jika bukan query grade rescue.
+    """
+    parsed_grade = extract_grade_calc_input(message) if is_grade_rescue_query(message) else None
+    if not parsed_grade:
+        return None
+    calc = calculate_required_score(
+        achieved_components=parsed_grade.get("achieved_components") or [],
+        target_final_score=float(parsed_grade.get("target_final_score", 70) or 70),
+        remaining_weight=float(parsed_grade.get("remaining_weight", 0) or 0),
+    )
+    return {"answer": _build_grade_rescue_response(parsed_grade, calc), "sources": []}
+
+
+def _save_chat_result(user: User, session: ChatSession, message: str, result: Any) -> Dict[str, Any]:
     # Normalisasi output (biar backward compatible kalau suatu saat ask_bot return string)
     if isinstance(result, dict):
         answer = result.get("answer", "")
@@ -443,6 +525,47 @@ def chat_and_save(user: User, message: str, request_id: str = "-", session_id: i
     return {"answer": answer, "sources": sources, "session_id": session.id}
 
 
+def chat_and_save_stream(
+    user: User,
+    message: str,
+    request_id: str = "-",
+    session_id: int | None = None,
+) -> Iterator[Dict[str, Any]]:
+    """
+    [USE-CASE: CHAT RAG STREAMING]
+    Dipanggil oleh endpoint POST /api/chat/?stream=1
+    Yield event dari ask_bot_stream() (sources -> token... -> done).
+    ChatHistory disimpan saat stream selesai; event "done" ditambah session_id.
+    """
+    session = get_or_create_chat_session(user=user, session_id=session_id)
+
+    rescue = _grade_rescue_result(message)
+    if rescue is not None:
+        answer = rescue["answer"]
+        events: Iterator[Dict[str, Any]] = iter(
+            [
+                {"type": "sources", "sources": []},
+                {"type": "token", "delta": answer},
+                {"type": "done", "answer": answer, "sources": []},
+            ]
+        )
+    else:
+        events = ask_bot_stream(user.id, message, request_id=request_id)
+
+    for event in events:
+        if event.get("type") != "done":
+            yield event
+            continue
+
+        answer = str(event.get("answer") or "")
+        ChatHistory.objects.create(user=user, session=session, question=message, answer=answer)
+        _maybe_update_session_title(session, message)
+        if session:
+            session.save(update_fields=["updated_at"])
+        yield {**event, "session_id": session.id}
+        return
+
+
 def list_sessions(user: User, limit: int = 50, page: int = 1) -> Dict[str, Any]:
     page = max(int(page), 1)
     limit = max(int(limit), 1)
@@ -633,48 +756,62 @@ def get_session_timeline(user: User, session_id: int, page: int = 1, page_size:
 
 def reingest_documents_for_user(user: User, doc_ids: List[int] | None = None) -> Dict[str, Any]:
     """
-    Re-ingest dokumen milik user tanpa upload ulang.
-    - Hapus embedding lama dulu (by doc_id)
-    - Jalankan process_document lagi
+    Re-ingest dokumen milik user tanpa upload ulang (bulk, lihat ai_engine/bulk_ingest.py).
+    - Parse ulang semua dokumen paralel
+    - Vector lama seluruh set dihapus / di-diff dalam 1 operasi, chunk baru di-upsert per batch besar
+    - Status dokumen diperbarui dengan 1 bulk_update; progress per dokumen terlihat di ingest_progress
     """
-    qs = AcademicDocument.objects.filter(user=user).order_by("-uploaded_at")
+    qs = AcademicDocument.objects.filter(user=user).select_related("user").order_by("-uploaded_at")
     if doc_ids:
         qs = qs.filter(id__in=doc_ids)
 
-    total = qs.count()
+    docs = list(qs)
+    total = len(docs)
     if total == 0:
         return {"status": "error", "msg": "Tidak ada dokumen untuk di-reingest."}
 
-    ok_count = 0
-    fail_count = 0
-    fails: List[str] = []
-
-    for doc in qs:
-        try:
-            #  delete embeddings lama
-            delete_vectors_for_doc(user_id=str(user.id), doc_id=str(doc.id), source=getattr(doc, "title", None))
-
-            #  ingest ulang
-            ok = process_document(doc)
-            if ok:
-                doc.is_embedded = True
-                doc.save(update_fields=["is_embedded"])
-                ok_count += 1
-            else:
-                fail_count += 1
-                fails.append(f"{doc.title} (Gagal Parsing)")
+    try:
+        result = bulk_reingest_documents(docs)
+    except Exception:
+        logger.error(" [REINGEST] bulk gagal user_id=%s", user.id, exc_info=True)
+        return {"status": "error", "msg": "Gagal re-ingest semua dokumen. Detail: System Error"}
 
-        except Exception:
-            fail_count += 1
-            fails.append(f"{doc.title} (System Error)")
+    ok_ids = set(result.get("ok_ids") or [])
+    ok_count = len(ok_ids)
+    fail_count = total - ok_count
+    fails = [f"{d.title} (Gagal Parsing)" for d in docs if d.id not in ok_ids]
+    progress = {
+        "total": total,
+        "ok": ok_count,
+        "failed": fail_count,
+        "elapsed_ms": result.get("elapsed_ms", 0),
+        "docs": [{"id": d.id, "title": d.title, "ingest_status": d.ingest_status} for d in docs],
+    }
 
     if ok_count > 0:
         msg = f"Re-ingest berhasil: {ok_count}/{total} dokumen."
         if fail_count > 0:
             msg += f" Gagal: {fail_count} ({', '.join(fails[:5])}{'...' if len(fails) > 5 else ''})"
-        return {"status": "success", "msg": msg}
+        return {"status": "success", "msg": msg, "progress": progress}
+
+    return {"status": "error", "msg": f"Gagal re-ingest semua dokumen. Detail: {', '.join(fails)}", "progress": progress}
+
+
+def enqueue_reingest_for_user(user: User, doc_ids: List[int] | None = None) -> Dict[str, Any]:
+    """
+    Versi antrian dari reingest_documents_for_user(): buat IngestionJob per dokumen.
+    Delete vector lama + ingest ulang dilakukan worker.
+    """
+    qs = AcademicDocument.objects.filter(user=user).order_by("-uploaded_at")
+    if doc_ids:
+        qs = qs.filter(id__in=doc_ids)
+
+    docs = list(qs)
+    if not docs:
+        return {"status": "error", "msg": "Tidak ada dokumen untuk di-reingest.", "jobs": []}
 
-    return {"status": "error", "msg": f"Gagal re-ingest semua dokumen. Detail: {', '.join(fails)}"}
+    jobs = [ingest_jobs.serialize_job(ingest_jobs.enqueue_document(doc, IngestionJob.KIND_REINGEST)) for doc in docs]
+    return {"status": "success", "msg": f"Re-ingest {len(jobs)} dokumen masuk antrian.", "jobs": jobs}
 
 
 def delete_document_for_user(user: User, doc_id: int) -> bool:
@@ -697,7 +834,11 @@ def delete_document_for_user(user: User, doc_id: int) -> bool:
             doc.file.delete(save=False)
     except Exception:
         pass
+    content_hash = doc.content_hash
     doc.delete()
+    # mode dokumen bersama: lepas chunk bersama jika tidak ada user lain yang memakainya
+    if content_hash and shared_docs_enabled():
+        release_if_unreferenced(getattr(get_vectorstore(), "_collection", None), content_hash)
     return True
 
 
@@ -0,0 +1,12 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .ai_engine.retrieval.llm import invalidate_runtime_openrouter_config
+from .models import LLMConfiguration
+
+
+@receiver(post_save, sender=LLMConfiguration)
+@receiver(post_delete, sender=LLMConfiguration)
+def invalidate_llm_config_cache(sender, **kwargs):
+    # config LLM berubah -> request berikutnya baca ulang dari DB
+    invalidate_runtime_openrouter_config()
@@ -0,0 +1,35 @@
+"""Fake vectorstore Chroma in-memory yang dipakai bersama beberapa modul test."""
+from core.ai_engine.sparse_index import _match_where
+
+
+class FakeCollection:
+    def __init__(self):
+        self.items = []
+
+    def get(self, where=None, limit=None, include=None):
+        hits = [(i, m) for i, _, m in self.items if _match_where(m, where)][: limit or None]
+        return {"ids": [i for i, _ in hits], "metadatas": [dict(m) for _, m in hits]}
+
+    def update(self, ids, metadatas):
+        new_meta = dict(zip(ids, metadatas))
+        self.items = [(i, t, dict(new_meta.get(i, m))) for i, t, m in self.items]
+
+    def delete(self, ids=None, where=None):
+        if ids is not None:
+            self.items = [x for x in self.items if x[0] not in set(ids)]
+        else:
+            self.items = [x for x in self.items if not _match_where(x[2], where)]
+
+
+class FakeChromaStore:
+    def __init__(self):
+        self._collection = FakeCollection()
+        self.add_calls = 0
+        self.added_texts = []
+
+    def add_texts(self, texts, metadatas, ids):
+        self.add_calls += 1
+        self.added_texts.extend(texts)
+        for cid, t, m in zip(ids, texts, metadatas):
+            self._collection.items.append((cid, t, dict(m)))
+        return list(ids)
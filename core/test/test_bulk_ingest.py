@@ -0,0 +1,85 @@
+import os
+import tempfile
+from unittest.mock import patch
+
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+
+from core.ai_engine import bulk_ingest
+from core.models import AcademicDocument
+from core.test.fakes import FakeChromaStore
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp())
+@patch.dict(
+    os.environ,
+    {
+        "RAG_SHARED_DOCS": "0",
+        "RAG_EXTRACTION_CACHE": "0",
+        "RAG_BULK_REINGEST_WORKERS": "1",
+        "RAG_EMBED_BATCH_SIZE": "1",
+        "RAG_BULK_EMBED_BATCH_SIZE": "4",
+    },
+)
+@patch("core.ai_engine.ingest.sparse_index.add_document_chunks", return_value=0)
+class BulkReingestTests(TestCase):
+    def setUp(self):
+        self.vs = FakeChromaStore()
+        self.user = User.objects.create_user(username="alice", password="pass123")
+        text = "\n\n".join(f"Paragraf {i} tentang kurikulum." * 30 for i in range(3)).encode()
+        self.docs = [
+            AcademicDocument.objects.create(user=self.user, file=SimpleUploadedFile(f"catatan{i}.txt", text + bytes([65 + i])))
+            for i in range(2)
+        ]
+        self.empty = AcademicDocument.objects.create(user=self.user, file=SimpleUploadedFile("kosong.txt", b"   "))
+
+    def _run(self):
+        events = []
+        with patch("core.ai_engine.bulk_ingest.get_vectorstore", return_value=self.vs), patch(
+            "core.ai_engine.vector_ops.get_vectorstore", return_value=self.vs
+        ):
+            result = bulk_ingest.reingest_documents(
+                self.docs + [self.empty], progress=lambda *args: events.append(args)
+            )
+        return result, events
+
+    def test_set_written_in_large_batches_and_status_bulk_updated(self, _):
+        result, events = self._run()
+        self.assertEqual(result["ok_ids"], [d.id for d in self.docs])
+        self.assertEqual(result["failed_ids"], [self.empty.id])
+
+        items = self.vs._collection.items
+        self.assertEqual({m["doc_id"] for _, _, m in items}, {str(d.id) for d in self.docs})
+        self.assertEqual(self.vs.add_calls, (len(items) + 3) // 4)
+        self.assertEqual([e[0] for e in events].count("parse"), 3)
+        self.assertEqual(events[-1][0], "done")
+
+        for doc in self.docs:
+            doc.refresh_from_db()
+            self.assertTrue(doc.is_embedded)
+            self.assertEqual((doc.ingest_status, doc.ingest_progress), (AcademicDocument.INGEST_READY, 100))
+        self.empty.refresh_from_db()
+        self.assertEqual(self.empty.ingest_status, AcademicDocument.INGEST_FAILED)
+
+        self.vs.added_texts.clear()
+        again, _events = self._run()
+        self.assertEqual(self.vs.added_texts, [])
+        self.assertEqual(again["kept"], len(items))
+
+    @patch.dict(os.environ, {"RAG_INCREMENTAL_REINGEST": "0"})
+    @patch("core.ai_engine.vector_ops.sparse_index.remove_document", return_value=0)
+    def test_full_mode_deletes_only_parsed_documents(self, _remove, _):
+        self.vs._collection.items = [
+            ("lama-1", "x", {"user_id": str(self.user.id), "doc_id": str(self.docs[0].id)}),
+            ("lama-kosong", "x", {"user_id": str(self.user.id), "doc_id": str(self.empty.id)}),
+        ]
+        self._run()
+        ids = {i for i, _, _ in self.vs._collection.items}
+        self.assertNotIn("lama-1", ids)
+        self.assertIn("lama-kosong", ids, "vector dokumen yang gagal parse tidak boleh hilang")
+
+    def test_workers_default_to_one_on_sqlite(self, _):
+        with patch.dict(os.environ, {}, clear=False):
+            os.environ.pop("RAG_BULK_REINGEST_WORKERS", None)
+            self.assertEqual(bulk_ingest.bulk_workers(), 1)
@@ -0,0 +1,47 @@
+import os
+import tempfile
+from unittest.mock import MagicMock, patch
+
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+
+from core.ai_engine import ingest as ingest_mod
+from core.models import AcademicDocument, ExtractionCache
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp())
+@patch("core.ai_engine.ingest.sparse_index.add_document_chunks", return_value=0)
+@patch("core.ai_engine.ingest.get_vectorstore", return_value=MagicMock())
+class ExtractionCacheTests(TestCase):
+    def setUp(self):
+        self.user_a = User.objects.create_user(username="alice", password="pass123")
+        self.user_b = User.objects.create_user(username="bob", password="pass123")
+
+    def _doc(self, user, content=b"col1,col2\n1,2\n"):
+        return AcademicDocument.objects.create(user=user, file=SimpleUploadedFile("data.csv", content))
+
+    def test_reingest_and_duplicate_upload_skip_parsing(self, *_):
+        with patch.object(ingest_mod, "_parse_document_file", wraps=ingest_mod._parse_document_file) as parse:
+            self.assertTrue(ingest_mod.process_document(self._doc(self.user_a)))
+            doc_b = self._doc(self.user_b)
+            self.assertTrue(ingest_mod.process_document(doc_b))
+            self.assertTrue(ingest_mod.process_document(doc_b))
+        self.assertEqual(parse.call_count, 1)
+        entry = ExtractionCache.objects.get()
+        self.assertEqual(entry.hits, 2)
+        self.assertEqual(entry.payload["detected_columns"], ["col1", "col2"])
+
+    def test_changed_file_or_reparse_flag_parses_again(self, *_):
+        with patch.object(ingest_mod, "_parse_document_file", wraps=ingest_mod._parse_document_file) as parse:
+            doc = self._doc(self.user_a)
+            ingest_mod.process_document(doc)
+            ingest_mod.process_document(self._doc(self.user_a, content=b"col1,col3\n1,2\n"))
+            ingest_mod.process_document(doc, use_extraction_cache=False)
+        self.assertEqual(parse.call_count, 3)
+        self.assertEqual(ExtractionCache.objects.count(), 2)
+
+    @patch.dict(os.environ, {"RAG_EXTRACTION_CACHE": "0"})
+    def test_cache_disabled_by_env(self, *_):
+        ingest_mod.process_document(self._doc(self.user_a))
+        self.assertFalse(ExtractionCache.objects.exists())
@@ -0,0 +1,112 @@
+import json
+import os
+import tempfile
+from unittest.mock import patch
+
+from asgiref.sync import async_to_sync
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import AsyncRequestFactory, Client, TestCase, override_settings
+
+from core import ingest_jobs, views
+from core.models import AcademicDocument, IngestionJob, UserQuota
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp())
+@patch.dict(os.environ, {"RAG_INGEST_QUEUE": "1", "RAG_INGEST_MAX_CONCURRENCY": "1"})
+class IngestionJobQueueTests(TestCase):
+    def setUp(self):
+        self.client = Client()
+        self.user = User.objects.create_user(username="alice", password="pass123")
+        UserQuota.objects.update_or_create(user=self.user, defaults={"quota_bytes": 10 * 1024 * 1024})
+        self.client.force_login(self.user)
+
+    def _upload(self, name="jadwal.txt", content=b"hello"):
+        resp = self.client.post("/api/upload/", {"files": [SimpleUploadedFile(name, content)]})
+        return resp, json.loads(resp.content.decode())
+
+    @patch("core.service.process_document")
+    def test_upload_returns_job_without_inline_ingest(self, mock_process):
+        resp, body = self._upload()
+        self.assertEqual(resp.status_code, 200)
+        mock_process.assert_not_called()
+        self.assertEqual(len(body["jobs"]), 1)
+        job = IngestionJob.objects.get(id=body["jobs"][0]["job_id"])
+        self.assertEqual(job.status, IngestionJob.STATUS_QUEUED)
+        self.assertEqual(job.document.ingest_status, AcademicDocument.INGEST_PENDING)
+
+    def test_unsupported_file_not_queued(self):
+        resp, _ = self._upload(name="malware.exe")
+        self.assertEqual(resp.status_code, 400)
+        self.assertEqual(IngestionJob.objects.count(), 0)
+        self.assertEqual(AcademicDocument.objects.count(), 0)
+
+    def test_worker_runs_job_and_reports_progress(self):
+        _, body = self._upload()
+        job_id = body["jobs"][0]["job_id"]
+
+        def _fake_process(doc, progress_callback=None):
+            progress_callback(50, "chunking")
+            self.assertEqual(IngestionJob.objects.get(id=job_id).progress, 50)
+            return True
+
+        with patch("core.ingest_jobs.process_document", side_effect=_fake_process):
+            job = ingest_jobs.claim_next_job("w1")
+            self.assertEqual(job.id, job_id)
+            self.assertIsNone(ingest_jobs.claim_next_job("w2"), "throttle: max 1 job running")
+            self.assertTrue(ingest_jobs.run_job(job))
+
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.progress, job.attempts), (IngestionJob.STATUS_DONE, 100, 1))
+        doc = AcademicDocument.objects.get(id=job.document_id)
+        self.assertTrue(doc.is_embedded)
+        self.assertEqual(doc.ingest_status, AcademicDocument.INGEST_READY)
+
+        resp = self.client.get(f"/api/ingest/jobs/?ids={job_id}")
+        self.assertEqual(json.loads(resp.content.decode())["jobs"][0]["status"], "done")
+
+    @patch("core.ingest_jobs.process_document", return_value=False)
+    def test_failed_upload_job_removes_document(self, _):
+        _, body = self._upload()
+        job = ingest_jobs.claim_next_job("w1")
+        self.assertFalse(ingest_jobs.run_job(job))
+        job.refresh_from_db()
+        self.assertEqual(job.status, IngestionJob.STATUS_FAILED)
+        self.assertEqual(AcademicDocument.objects.count(), 0)
+
+    @patch.dict(os.environ, {"RAG_INCREMENTAL_REINGEST": "0"})
+    @patch("core.ingest_jobs.process_document", return_value=True)
+    @patch("core.ingest_jobs.delete_vectors_for_doc", return_value=1)
+    def test_reingest_job_deletes_old_vectors(self, mock_del, _):
+        doc = AcademicDocument.objects.create(user=self.user, file=SimpleUploadedFile("a.txt", b"hello"))
+        resp = self.client.post("/api/reingest/", data=json.dumps({"doc_ids": [doc.id]}), content_type="application/json")
+        self.assertEqual(resp.status_code, 200)
+        mock_del.assert_not_called()
+
+        job = ingest_jobs.claim_next_job("w1")
+        self.assertEqual(job.kind, IngestionJob.KIND_REINGEST)
+        self.assertTrue(ingest_jobs.run_job(job))
+        mock_del.assert_called_once()
+
+    def test_job_status_isolated_per_user(self):
+        _, body = self._upload()
+        other = User.objects.create_user(username="bob", password="pass123")
+        self.client.force_login(other)
+        resp = self.client.get(f"/api/ingest/jobs/{body['jobs'][0]['job_id']}/")
+        self.assertEqual(resp.status_code, 404)
+
+    @patch("core.views.time.sleep", side_effect=AssertionError("ASGI stream tidak boleh time.sleep"))
+    def test_asgi_jobs_stream_is_async(self, _):
+        _, body = self._upload()
+        job_id = body["jobs"][0]["job_id"]
+        IngestionJob.objects.filter(id=job_id).update(status=IngestionJob.STATUS_DONE, progress=100)
+
+        request = AsyncRequestFactory().get(f"/api/ingest/jobs/?ids={job_id}&stream=1")
+        resp = views._ingest_jobs_stream_response(request, user=self.user, job_ids=[job_id])
+        self.assertTrue(resp.is_async)
+
+        async def _collect():
+            return [chunk.decode() async for chunk in resp.streaming_content]
+
+        chunks = async_to_sync(_collect)()
+        self.assertEqual([c.split("\n", 1)[0] for c in chunks], ["event: jobs", "event: done"])
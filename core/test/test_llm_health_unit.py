@@ -0,0 +1,93 @@
+import os
+from unittest.mock import patch
+
+from django.test import TestCase
+
+from core.ai_engine.retrieval import model_health
+from core.ai_engine.retrieval.llm import (
+    build_llm,
+    clear_llm_clients,
+    get_backup_models,
+    get_runtime_openrouter_config,
+    hedge_delay_for,
+    invalidate_runtime_openrouter_config,
+)
+from core.models import LLMConfiguration
+
+
+class ModelHealthUnitTests(TestCase):
+    @patch.dict(os.environ, {"RAG_LLM_CB_FAILURES": "2", "RAG_LLM_CB_COOLDOWN": "60"}, clear=False)
+    def test_consecutive_failures_open_circuit_and_reorder(self):
+        model_health.record_result("a", 1.0, ok=False, error="Error code: 429 rate limit")
+        self.assertEqual(model_health.get_model_stats("a")["state"], model_health.STATE_CLOSED)
+        model_health.record_result("a", 1.0, ok=False, error="timeout")
+
+        stats = model_health.get_model_stats("a")
+        self.assertEqual(stats["state"], model_health.STATE_OPEN)
+        self.assertEqual(stats["rate_limited"], 1)
+        self.assertEqual(stats["error_rate"], 1.0)
+        self.assertEqual(get_backup_models("a", ["b", "c"]), ["b", "c", "a"])
+
+    def test_success_closes_circuit_and_tracks_latency(self):
+        for lat in (0.5, 1.0, 2.0):
+            model_health.record_result("m", lat, ok=True)
+        stats = model_health.get_model_stats("m")
+        self.assertEqual(stats["state"], model_health.STATE_CLOSED)
+        self.assertEqual(stats["calls"], 3)
+        self.assertEqual(stats["p50_ms"], 1000)
+        self.assertEqual(stats["p95_ms"], 2000)
+        self.assertEqual([row["model"] for row in model_health.get_scoreboard()], ["m"])
+
+    @patch.dict(os.environ, {"RAG_LLM_CB_FAILURES": "1"}, clear=False)
+    def test_order_models_loads_health_in_one_query(self):
+        model_health.record_result("a", 1.0, ok=False, error="boom")
+        model_health.record_result("b", 0.5, ok=True)
+        with self.assertNumQueries(1):
+            ordered = model_health.order_models(["a", "b", "baru"])
+        self.assertEqual(ordered, ["b", "baru", "a"])
+
+    def test_hedge_delay_from_p95_or_timeout(self):
+        cfg = {"hedge_delay": None, "timeout": 40}
+        self.assertEqual(hedge_delay_for("m", cfg), 32.0)
+        for lat in (2.0, 3.0, 4.0, 5.0, 6.0):
+            model_health.record_result("m", lat, ok=True)
+        self.assertEqual(hedge_delay_for("m", cfg), 6.0)
+        self.assertEqual(hedge_delay_for("m", {**cfg, "hedge_delay": 1.5}), 1.5)
+
+    @patch.dict(os.environ, {"RAG_LLM_HEALTH_ROUTING": "0"}, clear=False)
+    def test_routing_can_be_disabled(self):
+        for _ in range(5):
+            model_health.record_result("a", 1.0, ok=False, error="boom")
+        self.assertEqual(get_backup_models("a", ["b"]), ["a", "b"])
+
+
+class RuntimeConfigCacheTests(TestCase):
+    def setUp(self):
+        invalidate_runtime_openrouter_config()
+        clear_llm_clients()
+
+    def tearDown(self):
+        invalidate_runtime_openrouter_config()
+        clear_llm_clients()
+
+    def test_config_cached_and_invalidated_on_save(self):
+        LLMConfiguration.objects.create(name="A", openrouter_api_key="key-a", openrouter_model="m-a")
+        first = get_runtime_openrouter_config()
+        self.assertEqual(first["model"], "m-a")
+
+        with self.assertNumQueries(0):
+            again = get_runtime_openrouter_config()
+        self.assertEqual(again, first)
+
+        LLMConfiguration.objects.create(name="B", openrouter_api_key="key-b", openrouter_model="m-b")
+        self.assertEqual(get_runtime_openrouter_config()["model"], "m-b")
+
+    def test_build_llm_reuses_client_per_key(self):
+        cfg = {"api_key": "k", "timeout": 10, "temperature": 0.2, "max_retries": 1}
+        with patch("core.ai_engine.retrieval.llm.ChatOpenAI", side_effect=lambda **kw: object()) as ctor:
+            a = build_llm("m", cfg)
+            b = build_llm("m", cfg)
+            c = build_llm("m", {**cfg, "temperature": 0.5})
+        self.assertIs(a, b)
+        self.assertIsNot(a, c)
+        self.assertEqual(ctor.call_count, 2)
@@ -0,0 +1,81 @@
+import asyncio
+import threading
+import time
+from unittest.mock import patch
+
+from django.test import SimpleTestCase
+
+from core.ai_engine.retrieval.llm import HedgedInvokeError, ainvoke_hedged, invoke_hedged
+
+
+class InvokeHedgedUnitTests(SimpleTestCase):
+    def test_first_failure_triggers_next_model_immediately(self):
+        calls = []
+
+        def _call(model):
+            calls.append(model)
+            if model == "a":
+                raise RuntimeError("a down")
+            return f"ok-{model}"
+
+        t0 = time.monotonic()
+        model, idx, out = invoke_hedged(["a", "b", "c"], _call, cfg={"hedge_delay": 5, "hedge_max_parallel": 3})
+        self.assertLess(time.monotonic() - t0, 2)
+        self.assertEqual((model, idx, out), ("b", 1, "ok-b"))
+        self.assertEqual(calls, ["a", "b"])
+
+    def test_slow_model_is_hedged_after_delay(self):
+        release = threading.Event()
+
+        def _call(model):
+            if model == "slow":
+                release.wait(5)
+                return "late"
+            return "fast"
+
+        try:
+            model, idx, out = invoke_hedged(["slow", "fast"], _call, cfg={"hedge_delay": 0.05, "hedge_max_parallel": 2})
+        finally:
+            release.set()
+        self.assertEqual((model, idx, out), ("fast", 1, "fast"))
+
+    def test_all_invalid_raises_with_last_error(self):
+        def _call(model):
+            if model == "a":
+                return ""
+            raise RuntimeError("b down")
+
+        with self.assertRaises(HedgedInvokeError) as ctx:
+            invoke_hedged(["a", "b"], _call, cfg={"hedge_delay": 0.01})
+        self.assertIn("b down", ctx.exception.last_error)
+
+    def test_hedge_threads_close_db_connections(self):
+        closed_in = []
+        with patch("core.ai_engine.retrieval.llm.connections") as mock_conns:
+            mock_conns.close_all.side_effect = lambda: closed_in.append(threading.current_thread().name)
+            invoke_hedged(["a"], lambda model: "ok", cfg={"hedge_delay": 1})
+        self.assertEqual(len(closed_in), 1)
+        self.assertTrue(closed_in[0].startswith("llm-hedge"))
+
+
+class AsyncInvokeHedgedUnitTests(SimpleTestCase):
+    def test_slow_task_is_cancelled_when_backup_wins(self):
+        cancelled = []
+
+        async def _call(model):
+            if model == "slow":
+                try:
+                    await asyncio.sleep(5)
+                except asyncio.CancelledError:
+                    cancelled.append(model)
+                    raise
+                return "late"
+            return "fast"
+
+        async def _run():
+            out = await ainvoke_hedged(["slow", "fast"], _call, cfg={"hedge_delay": 0.05, "hedge_max_parallel": 2})
+            await asyncio.sleep(0)
+            return out
+
+        self.assertEqual(asyncio.run(_run()), ("fast", 1, "fast"))
+        self.assertEqual(cancelled, ["slow"])
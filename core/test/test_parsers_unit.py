@@ -1,4 +1,10 @@
+import json
+import os
+import re
+import threading
+import time
 import unittest
+from unittest.mock import patch
 
 from core.ai_engine import ingest as ingest_mod
 
@@ -70,3 +76,119 @@ class TestParserChunkingProfile(unittest.TestCase):
     def test_ocr_like_row_still_normalized_time(self):
         s = ingest_mod._normalize_time_range("0 5 :7 0-0 0 :7 0")
         self.assertEqual(s, "07:00-07:50")
+
+    def test_merge_pdf_pages_carries_slot_across_pages_in_page_order(self):
+        header = ["HARI", "SESI", "JAM", "KODE", "MATA KULIAH", "KELAS"]
+        page1 = (1, [[header, ["SENIN", "I", "07:00-07:50", "IF101", "Algoritma", "A"]]], "")
+        page2 = (2, [[header, ["", "", "", "IF102", "Struktur Data", "B"]]], "")
+
+        _, cols, rows = ingest_mod._merge_pdf_pages([page2, page1])
+        self.assertEqual(ingest_mod._merge_pdf_pages([page1, page2])[2], rows)
+        by_kode = {r.get("kode"): r for r in rows}
+        self.assertEqual(by_kode["IF102"]["jam"], "07:00-07:50")
+        self.assertEqual(by_kode["IF102"]["page"], 2)
+        self.assertTrue(cols)
+
+    def test_pdf_page_ranges_cover_all_pages_once(self):
+        from core.ai_engine.pdf_pages import _page_ranges
+
+        ranges = _page_ranges(37, 4)
+        pages = [i for s, e in ranges for i in range(s, e)]
+        self.assertEqual(pages, list(range(37)))
+
+    def test_page_artifact_parses_once_and_releases_layout_cache(self):
+        from core.ai_engine.pdf_pages import extract_page_artifact
+
+        class _Page:
+            def __init__(self):
+                self.calls = []
+
+            def extract_tables(self):
+                self.calls.append("tables")
+                return [[["Hari", "Jam"], ["Senin", "07:00-07:50"]]]
+
+            def extract_text(self):
+                self.calls.append("text")
+                return " Senin 07:00-07:50 "
+
+            def flush_cache(self):
+                self.calls.append("flush")
+
+        page = _Page()
+        art = extract_page_artifact(page, 3)
+        self.assertEqual((art.page, art.text), (3, "Senin 07:00-07:50"))
+        self.assertEqual(page.calls, ["tables", "text", "flush"])
+
+
+class _FakeRepairLLM:
+    """Balas setiap batch dengan jam yang diperbaiki; batch pertama gagal sekali (uji retry)."""
+
+    def __init__(self, delay=0.05, slow_idx=None):
+        self.delay = delay
+        self.slow_idx = slow_idx
+        self.calls = 0
+        self.active = 0
+        self.max_active = 0
+        self._lock = threading.Lock()
+        self._failed_once = False
+        self.timeouts = []
+
+    def invoke(self, prompt, timeout=None):
+        self.timeouts.append(timeout)
+        payload = json.loads(re.search(r"Input rows:\n(.*)$", prompt, re.DOTALL).group(1))
+        idxs = [p["idx"] for p in payload]
+        with self._lock:
+            self.calls += 1
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+            fail = 0 in idxs and not self._failed_once
+            self._failed_once = self._failed_once or fail
+        try:
+            if self.slow_idx in idxs:
+                # seperti client HTTP: call lambat berhenti saat timeout per call
+                time.sleep(min(5, timeout or 5))
+                raise TimeoutError("timeout")
+            time.sleep(self.delay)
+            if fail:
+                raise TimeoutError("timeout")
+            # idx di luar batch harus diabaikan oleh merge
+            return json.dumps([{"idx": i, "jam": "07:00-07:50"} for i in idxs] + [{"idx": 999, "jam": "x"}])
+        finally:
+            with self._lock:
+                self.active -= 1
+
+
+@patch.dict(
+    os.environ,
+    {
+        "PDF_HYBRID_LLM_REPAIR": "1",
+        "INGEST_REPAIR_BATCH_SIZE": "2",
+        "INGEST_REPAIR_CONCURRENCY": "3",
+        "INGEST_REPAIR_BACKOFF_SEC": "0.01",
+        "RAG_REPAIR_MEMO": "0",
+    },
+)
+class TestConcurrentRowRepair(unittest.TestCase):
+    def _rows(self, n=6):
+        return [{"hari": "Senin", "mata_kuliah": f"MK {i}", "jam": "07"} for i in range(n)]
+
+    def test_batches_run_concurrently_with_retry_and_merge_by_idx(self):
+        llm = _FakeRepairLLM()
+        with patch.object(ingest_mod, "_build_repair_llm", return_value=llm):
+            rows, stats = ingest_mod._repair_rows_with_llm(self._rows(), "jadwal.pdf")
+        self.assertEqual([r["jam"] for r in rows], ["07:00-07:50"] * 6)
+        self.assertEqual((stats["batches"], stats["batches_ok"], stats["repaired"]), (3, 3, 6))
+        self.assertEqual(llm.calls, 4)
+        self.assertGreater(llm.max_active, 1)
+
+    @patch.dict(os.environ, {"INGEST_REPAIR_BUDGET_SEC": "1"})
+    def test_time_budget_keeps_unrepaired_rows(self):
+        llm = _FakeRepairLLM(slow_idx=4)
+        t0 = time.monotonic()
+        with patch.object(ingest_mod, "_build_repair_llm", return_value=llm):
+            rows, stats = ingest_mod._repair_rows_with_llm(self._rows(), "jadwal.pdf")
+        self.assertLess(time.monotonic() - t0, 3)
+        self.assertEqual(stats["batches_timed_out"], 1)
+        self.assertTrue(all(0 < t <= 1 for t in llm.timeouts))
+        self.assertEqual([r["jam"] for r in rows[4:]], ["07", "07"])
+        self.assertEqual(rows[0]["jam"], "07:00-07:50")
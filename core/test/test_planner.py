@@ -1,5 +1,5 @@
 import json
-from unittest.mock import patch
+from unittest.mock import AsyncMock, patch
 
 from django.contrib.auth.models import User
 from django.test import TestCase
@@ -287,7 +287,7 @@ class PlannerApiTests(TestCase):
         self.assertIn("Software Engineer", labels)
 
     @patch("core.academic.profile_extractor.pdfplumber.open")
-    @patch("core.academic.profile_extractor.get_vectorstore")
+    @patch("core.ai_engine.retrieval.main.get_vectorstore")
     def test_planner_flow_dynamic_question_for_campus_pdf_format_indonesia(self, vs_mock, pdf_open_mock):
         vs_mock.return_value.similarity_search.return_value = []
         pdf_open_mock.return_value = _FakePdfDoc(
@@ -337,7 +337,7 @@ class PlannerApiTests(TestCase):
         self.assertIn("jam", fields)
 
     @patch("core.academic.profile_extractor.pdfplumber.open")
-    @patch("core.academic.profile_extractor.get_vectorstore")
+    @patch("core.ai_engine.retrieval.main.get_vectorstore")
     def test_planner_flow_dynamic_question_for_campus_pdf_format_english_headers(self, vs_mock, pdf_open_mock):
         vs_mock.return_value.similarity_search.return_value = []
         pdf_open_mock.return_value = _FakePdfDoc(
@@ -599,7 +599,11 @@ class PlannerApiTests(TestCase):
         )
         self.assertEqual(resp.status_code, 400)
 
-    @patch("core.views.service.chat_and_save", return_value={"answer": "ok", "sources": [], "session_id": 1})
+    @patch(
+        "core.views.service.achat_and_save",
+        new_callable=AsyncMock,
+        return_value={"answer": "ok", "sources": [], "session_id": 1},
+    )
     def test_chat_mode_still_works(self, _chat_mock):
         resp = self.client.post(
             "/api/chat/",
@@ -1,3 +1,4 @@
+import os
 from unittest.mock import MagicMock, patch
 
 from django.contrib.auth.models import User
@@ -12,7 +13,7 @@ class ProfileExtractorTests(TestCase):
     def setUp(self):
         self.user = User.objects.create_user(username="profile_u", password="pass123")
 
-    @patch("core.academic.profile_extractor.get_vectorstore")
+    @patch("core.ai_engine.retrieval.main.get_vectorstore")
     def test_profile_extractor_detects_major_from_explicit_prodi(self, vs_mock):
         AcademicDocument.objects.create(
             user=self.user,
@@ -31,7 +32,28 @@ class ProfileExtractorTests(TestCase):
         self.assertIn(hints.get("confidence_summary"), {"medium", "high"})
         self.assertIn("question_candidates", hints)
 
-    @patch("core.academic.profile_extractor.get_vectorstore")
+    @patch.dict(os.environ, {"RAG_VECTOR_SHARDING": "user", "RAG_SHARED_DOCS": "1"})
+    @patch("core.ai_engine.retrieval.main.get_vectorstore")
+    def test_profile_extractor_reads_shared_chunks_from_base_collection(self, vs_mock):
+        AcademicDocument.objects.create(
+            user=self.user,
+            title="Kurikulum.pdf",
+            file=SimpleUploadedFile("k.pdf", b"x"),
+            is_embedded=True,
+        )
+        shard, base = MagicMock(), MagicMock()
+        shard.similarity_search.return_value = []
+        doc = MagicMock()
+        doc.page_content = "Program Studi: Teknik Informatika"
+        doc.metadata = {"source": "kurikulum.pdf"}
+        base.similarity_search.return_value = [doc]
+        vs_mock.side_effect = lambda name="academic_rag": shard if name.endswith(f"_u{self.user.id}") else base
+
+        hints = extract_profile_hints(self.user)
+        majors = hints.get("major_candidates", [])
+        self.assertTrue(any(m.get("value") == "Teknik Informatika" for m in majors))
+
+    @patch("core.ai_engine.retrieval.main.get_vectorstore")
     def test_profile_extractor_detects_career_from_keywords(self, vs_mock):
         AcademicDocument.objects.create(
             user=self.user,
@@ -48,7 +70,7 @@ class ProfileExtractorTests(TestCase):
         careers = hints.get("career_candidates", [])
         self.assertTrue(any(c.get("value") == "Software Engineer" for c in careers))
 
-    @patch("core.academic.profile_extractor.get_vectorstore")
+    @patch("core.ai_engine.retrieval.main.get_vectorstore")
     def test_profile_extractor_low_confidence_when_no_relevant_signal(self, vs_mock):
         AcademicDocument.objects.create(
             user=self.user,
@@ -65,7 +87,7 @@ class ProfileExtractorTests(TestCase):
         self.assertEqual(hints.get("confidence_summary"), "low")
         self.assertIsNotNone(hints.get("warning"))
 
-    @patch("core.academic.profile_extractor.get_vectorstore")
+    @patch("core.ai_engine.retrieval.main.get_vectorstore")
     def test_profile_extractor_conflict_candidates_sets_warning(self, vs_mock):
         AcademicDocument.objects.create(
             user=self.user,
@@ -86,7 +108,7 @@ class ProfileExtractorTests(TestCase):
         self.assertGreaterEqual(len(majors), 2)
         self.assertIsNotNone(hints.get("warning"))
 
-    @patch("core.academic.profile_extractor.get_vectorstore")
+    @patch("core.ai_engine.retrieval.main.get_vectorstore")
     def test_profile_extractor_detects_schedule_fields_from_tabular_text(self, vs_mock):
         AcademicDocument.objects.create(
             user=self.user,
@@ -104,3 +126,21 @@ class ProfileExtractorTests(TestCase):
         self.assertIn("hari", fields)
         self.assertIn("jam", fields)
         self.assertTrue(any((q.get("step") == "preferences_time") for q in (hints.get("question_candidates") or [])))
+
+    @patch("core.academic.profile_extractor.pdfplumber.open")
+    @patch("core.ai_engine.retrieval.main.get_vectorstore")
+    def test_profile_extractor_uses_stored_pdf_table_preview(self, vs_mock, pdf_open_mock):
+        AcademicDocument.objects.create(
+            user=self.user,
+            title="Jadwal Kampus.pdf",
+            file=SimpleUploadedFile("jadwal-kampus.pdf", b"%PDF-1.4"),
+            is_embedded=True,
+            pdf_table_preview=[["Hari", "Jam", "Ruang"], ["Senin", "08:00-09:40", "A1"]],
+        )
+        vs_mock.return_value.similarity_search.return_value = []
+
+        hints = extract_profile_hints(self.user)
+        fields = hints.get("detected_fields") or []
+        self.assertIn("hari", fields)
+        self.assertIn("jam", fields)
+        pdf_open_mock.assert_not_called()
@@ -1,4 +1,5 @@
-from unittest.mock import patch
+import threading
+from unittest.mock import MagicMock, patch
 
 from django.test import SimpleTestCase
 
@@ -24,3 +25,127 @@ class RagConfigUnitTests(SimpleTestCase):
             emb = cfg.get_embedding_function()
         self.assertEqual(emb, "legacy-embedder")
         self.assertEqual(build_mock.call_count, 2)
+
+
+class QueryEmbeddingCacheUnitTests(SimpleTestCase):
+    def test_lru_eviction_and_counters(self):
+        cache = cfg.QueryEmbeddingCache(max_size=2, ttl_seconds=0)
+        cache.set(("m", True, "query: a"), [1.0])
+        cache.set(("m", True, "query: b"), [2.0])
+        self.assertEqual(cache.get(("m", True, "query: a")), [1.0])
+        cache.set(("m", True, "query: c"), [3.0])
+
+        self.assertIsNone(cache.get(("m", True, "query: b")))
+        self.assertEqual(cache.get(("m", True, "query: c")), [3.0])
+        stats = cache.stats()
+        self.assertEqual(stats["hits"], 2)
+        self.assertEqual(stats["misses"], 1)
+        self.assertEqual(stats["evictions"], 1)
+
+    def test_key_separates_model_and_normalize(self):
+        cache = cfg.QueryEmbeddingCache(max_size=8, ttl_seconds=0)
+        cache.set(("model-a", True, "query: jadwal"), [1.0])
+        self.assertIsNone(cache.get(("model-b", True, "query: jadwal")))
+        self.assertIsNone(cache.get(("model-a", False, "query: jadwal")))
+
+    @patch("core.ai_engine.config.time.monotonic")
+    def test_ttl_expiry(self, mono_mock):
+        cache = cfg.QueryEmbeddingCache(max_size=8, ttl_seconds=10)
+        mono_mock.return_value = 100.0
+        cache.set(("m", True, "query: x"), [1.0])
+        mono_mock.return_value = 111.0
+        self.assertIsNone(cache.get(("m", True, "query: x")))
+
+
+@patch("core.ai_engine.config.get_embedding_function", return_value="embedder")
+@patch("core.ai_engine.config.Chroma", side_effect=lambda **kw: MagicMock(kwargs=kw))
+@patch("core.ai_engine.config._get_chroma_client")
+class VectorstoreRegistryUnitTests(SimpleTestCase):
+    def setUp(self):
+        cfg.reset_vectorstores()
+
+    def tearDown(self):
+        cfg.reset_vectorstores()
+
+    def test_one_wrapper_per_collection_across_threads(self, client_mock, chroma_mock, _emb):
+        seen = []
+        threads = [threading.Thread(target=lambda: seen.append(cfg.get_vectorstore())) for _ in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(len({id(v) for v in seen}), 1)
+        self.assertEqual(chroma_mock.call_count, 1)
+        self.assertIsNot(cfg.get_vectorstore("lain"), seen[0])
+        self.assertEqual(chroma_mock.call_args.kwargs["client"], client_mock.return_value)
+
+    def test_reset_after_fork_and_close(self, client_mock, chroma_mock, _emb):
+        first = cfg.get_vectorstore()
+        with patch("core.ai_engine.config.os.getpid", return_value=cfg._VS_PID + 1):
+            self.assertIsNot(cfg.get_vectorstore(), first)
+
+        with patch("chromadb.api.shared_system_client.SharedSystemClient.clear_system_cache") as clear_mock:
+            cfg.reset_vectorstores()
+        clear_mock.assert_called_once()
+        client = MagicMock()
+        cfg._CHROMA_CLIENTS["x"] = client
+        cfg.close_vectorstores()
+        client.close.assert_called_once()
+        self.assertEqual(cfg._VECTORSTORES, {})
+
+
+class ChromaBackendUnitTests(SimpleTestCase):
+    def setUp(self):
+        cfg.reset_vectorstores()
+
+    def tearDown(self):
+        cfg.reset_vectorstores()
+
+    def test_embedded_mode_is_default(self):
+        with patch.dict("os.environ", {"RAG_CHROMA_MODE": ""}, clear=False):
+            self.assertEqual(cfg.chroma_settings(), {"mode": "embedded", "path": cfg.CHROMA_PERSIST_DIR})
+
+    def test_http_mode_uses_http_client_from_env(self):
+        fake_chromadb = MagicMock()
+        env = {
+            "RAG_CHROMA_MODE": "http",
+            "RAG_CHROMA_HOST": "chroma.local",
+            "RAG_CHROMA_PORT": "9000",
+            "RAG_CHROMA_AUTH_TOKEN": "rahasia",
+        }
+        with patch.dict("os.environ", env, clear=False), patch.dict("sys.modules", {"chromadb": fake_chromadb}):
+            conf = cfg.chroma_settings()
+            client = cfg._get_chroma_client(conf)
+            self.assertIs(cfg._get_chroma_client(conf), client)
+
+        fake_chromadb.PersistentClient.assert_not_called()
+        fake_chromadb.HttpClient.assert_called_once_with(
+            host="chroma.local", port=9000, ssl=False, headers={"Authorization": "Bearer rahasia"}
+        )
+        self.assertIn("http://chroma.local:9000", cfg._CHROMA_CLIENTS)
+
+
+class VectorShardingUnitTests(SimpleTestCase):
+    def test_collection_routing_per_mode(self):
+        with patch.dict("os.environ", {"RAG_VECTOR_SHARDING": "off"}, clear=False):
+            self.assertEqual(cfg.collection_for_user(7), cfg.DEFAULT_COLLECTION)
+        with patch.dict("os.environ", {"RAG_VECTOR_SHARDING": "user"}, clear=False):
+            self.assertEqual(cfg.collection_for_user(7), "academic_rag_u7")
+        with patch.dict("os.environ", {"RAG_VECTOR_SHARDING": "bucket", "RAG_VECTOR_SHARD_BUCKETS": "4"}, clear=False):
+            name = cfg.collection_for_user(7)
+            self.assertEqual(name, cfg.collection_for_user("7"))
+            self.assertIn(name, {f"academic_rag_b{i:03d}" for i in range(4)})
+
+    @patch.dict("os.environ", {"RAG_VECTOR_SHARDING": "user"}, clear=False)
+    @patch("core.ai_engine.vector_ops.bump_corpus_version")
+    @patch("core.ai_engine.vector_ops.sparse_index")
+    @patch("core.ai_engine.vector_ops.get_vectorstore")
+    def test_purge_user_shard_deletes_ids_without_metadata_scan(self, vs_mock, _sparse, _bump):
+        from core.ai_engine.vector_ops import purge_vectors_for_user
+
+        col = vs_mock.return_value._collection
+        col.get.return_value = {"ids": ["a", "b", "c"]}
+        self.assertEqual(purge_vectors_for_user(7), 3)
+        vs_mock.assert_called_once_with("academic_rag_u7")
+        col.get.assert_called_once_with(include=[])
+        col.delete.assert_called_once_with(ids=["a", "b", "c"])
@@ -3,7 +3,7 @@ from unittest.mock import patch
 
 from django.test import SimpleTestCase
 
-from core.ai_engine.retrieval.hybrid import fuse_rrf, retrieve_sparse_bm25
+from core.ai_engine.retrieval.hybrid import fuse_rrf, retrieve_dense_multi, retrieve_sparse_bm25
 from core.ai_engine.retrieval.rerank import rerank_documents
 
 
@@ -40,3 +40,36 @@ class RagHybridUnitTests(SimpleTestCase):
         out = rerank_documents(query="jadwal", docs=docs, model_name="x", top_n=2)
         self.assertEqual(len(out), 2)
         self.assertEqual(out[0].page_content, "A")
+
+    def test_dense_multi_embeds_once_and_queries_batched(self):
+        class FakeEmbedding:
+            def __init__(self):
+                self.batches = []
+
+            def embed_queries(self, texts):
+                self.batches.append(list(texts))
+                return [[float(i)] for i, _ in enumerate(texts)]
+
+        class FakeCollection:
+            def __init__(self):
+                self.calls = []
+
+            def query(self, **kwargs):
+                self.calls.append(kwargs)
+                n = len(kwargs["query_embeddings"])
+                return {
+                    "documents": [[f"doc-{i}"] for i in range(n)],
+                    "metadatas": [[{"doc_id": str(i)}] for i in range(n)],
+                    "distances": [[0.1 * (i + 1)] for i in range(n)],
+                }
+
+        emb = FakeEmbedding()
+        col = FakeCollection()
+        vs = SimpleNamespace(embeddings=emb, _collection=col)
+
+        out = retrieve_dense_multi(vs, ["jadwal senin", "jadwal senin waktu kuliah"], k=5, filter_where={"user_id": "1"})
+        self.assertEqual(len(emb.batches), 1)
+        self.assertEqual(len(col.calls), 1)
+        self.assertEqual(col.calls[0]["where"], {"user_id": "1"})
+        self.assertEqual([len(x) for x in out], [1, 1])
+        self.assertEqual(out[1][0][0].page_content, "doc-1")
@@ -2,16 +2,21 @@ import os
 from types import SimpleNamespace
 from unittest.mock import MagicMock, patch
 
-from django.test import SimpleTestCase
+from django.core.cache import cache
+from django.test import TestCase
 
-from core.ai_engine.retrieval.main import ask_bot
+from core.ai_engine.corpus import bump_corpus_version
+from core.ai_engine.retrieval.main import _answer_cache_scope, ask_bot
 
 
 def _doc(text: str, source: str = "jadwal.pdf", doc_id: str = "1", page: int = 1):
     return SimpleNamespace(page_content=text, metadata={"source": source, "doc_id": doc_id, "page": page})
 
 
-class RagRetrievalFlowTests(SimpleTestCase):
+class RagRetrievalFlowTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
     @patch("core.ai_engine.retrieval.main.get_runtime_openrouter_config")
     def test_missing_api_key_returns_config_message(self, cfg_mock):
         cfg_mock.return_value = {"api_key": "", "model": "x", "backup_models": []}
@@ -144,3 +149,43 @@ class RagRetrievalFlowTests(SimpleTestCase):
         out = ask_bot(user_id=1, query="jadwal senin", request_id="t5")
         self.assertIn("[source:", out.get("answer", ""))
         invoke_mock.assert_called()
+
+    @patch("core.ai_engine.retrieval.main.create_stuff_documents_chain")
+    @patch("core.ai_engine.retrieval.main.build_llm")
+    @patch("core.ai_engine.retrieval.main.get_backup_models")
+    @patch("core.ai_engine.retrieval.main.retrieve_dense")
+    @patch("core.ai_engine.retrieval.main.get_vectorstore")
+    @patch("core.ai_engine.retrieval.main.get_runtime_openrouter_config")
+    def test_answer_cache_hit_and_invalidated_by_corpus_version(
+        self,
+        cfg_mock,
+        _vs_mock,
+        dense_mock,
+        backup_mock,
+        _build_llm_mock,
+        chain_mock,
+    ):
+        cfg_mock.return_value = {"api_key": "key", "model": "m", "backup_models": ["m"]}
+        backup_mock.return_value = ["m"]
+        dense_mock.return_value = [(_doc("jadwal rabu"), 0.2)]
+
+        fake_chain = MagicMock()
+        fake_chain.invoke.return_value = {"answer": "Rabu pagi [source: jadwal.pdf]"}
+        chain_mock.return_value = fake_chain
+
+        first = ask_bot(user_id=9, query="Jadwal  hari Rabu?", request_id="t6")
+        second = ask_bot(user_id=9, query="jadwal hari rabu", request_id="t7")
+        self.assertEqual(first, second)
+        self.assertEqual(fake_chain.invoke.call_count, 1)
+
+        # user lain tidak berbagi cache
+        ask_bot(user_id=10, query="jadwal hari rabu", request_id="t8")
+        self.assertEqual(fake_chain.invoke.call_count, 2)
+
+        bump_corpus_version(9)
+        ask_bot(user_id=9, query="jadwal hari rabu", request_id="t9")
+        self.assertEqual(fake_chain.invoke.call_count, 3)
+
+    def test_stream_answers_cached_in_separate_scope(self):
+        cfg = {"api_key": "key", "model": "m", "backup_models": ["m"]}
+        self.assertNotEqual(_answer_cache_scope(9, cfg), _answer_cache_scope(9, cfg, stream=True))
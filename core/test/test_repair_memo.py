@@ -0,0 +1,71 @@
+import os
+from unittest.mock import MagicMock, patch
+
+from django.test import TestCase
+
+from core.ai_engine import ingest as ingest_mod
+from core.ai_engine import repair_memo
+from core.models import RowRepairMemo
+
+
+def _rows():
+    return [
+        {"hari": "Senin", "mata_kuliah": "Basis Dat", "jam": "07", "page": 1},
+        {"hari": "Selasa", "mata_kuliah": "Jaringan", "jam": "0900", "page": 2},
+    ]
+
+
+def _fake_llm():
+    llm = MagicMock()
+    llm.invoke.return_value = MagicMock(
+        content='[{"idx": 0, "jam": "07:00-07:50", "mata_kuliah": "Basis Data"}, {"idx": 1, "jam": "09:00-09:50"}]'
+    )
+    return llm
+
+
+@patch.dict(os.environ, {"PDF_HYBRID_LLM_REPAIR": "1", "RAG_REPAIR_MEMO": "1"})
+class RowRepairMemoTests(TestCase):
+    def test_second_run_repairs_from_memo_without_llm(self):
+        llm = _fake_llm()
+        with patch.object(ingest_mod, "_build_repair_llm", return_value=llm):
+            first, stats1 = ingest_mod._repair_rows_with_llm(_rows(), "a.pdf")
+            # salinan lain: halaman berbeda, isi row sama -> fingerprint sama
+            copy = _rows()
+            copy[0]["page"] = 9
+            second, stats2 = ingest_mod._repair_rows_with_llm(copy, "b.pdf")
+
+        self.assertEqual(llm.invoke.call_count, 1)
+        self.assertEqual((stats1["memo_hits"], stats1["memo_misses"]), (0, 2))
+        self.assertEqual((stats2["memo_hits"], stats2["memo_misses"], stats2["batches"]), (2, 0, 0))
+        self.assertEqual([r["jam"] for r in second], [r["jam"] for r in first])
+        self.assertEqual(second[0]["mata_kuliah"], "Basis Data")
+        self.assertEqual(sorted(RowRepairMemo.objects.values_list("hits", flat=True)), [1, 1])
+
+    def test_fingerprint_depends_on_issues(self):
+        payload = {"row": {"hari": "Senin", "page": 1}, "issues": ["invalid_jam"]}
+        same = {"row": {"hari": "Senin", "page": 4}, "issues": ["invalid_jam"]}
+        other = {"row": {"hari": "Senin", "page": 1}, "issues": ["missing_dosen"]}
+        self.assertEqual(repair_memo.row_fingerprint(payload), repair_memo.row_fingerprint(same))
+        self.assertNotEqual(repair_memo.row_fingerprint(payload), repair_memo.row_fingerprint(other))
+        self.assertNotEqual(repair_memo.row_fingerprint(payload, "model-a"), repair_memo.row_fingerprint(payload, "model-b"))
+
+    def test_only_repairs_that_raise_confidence_are_memoized(self):
+        llm = MagicMock()
+        # idx 1: jawaban LLM tidak memperbaiki apa pun -> tidak boleh masuk memo
+        llm.invoke.return_value = MagicMock(
+            content='[{"idx": 0, "jam": "07:00-07:50", "mata_kuliah": "Basis Data"}, {"idx": 1, "jam": "0900"}]'
+        )
+        with patch.object(ingest_mod, "_build_repair_llm", return_value=llm):
+            _rows_out, stats = ingest_mod._repair_rows_with_llm(_rows(), "a.pdf")
+        self.assertEqual(stats["repaired"], 1)
+        self.assertEqual(RowRepairMemo.objects.count(), 1)
+
+    @patch.dict(os.environ, {"INGEST_REPAIR_BUDGET_SEC": "5", "RAG_REPAIR_MEMO": "0"})
+    def test_llm_call_timeout_bounded_by_remaining_budget(self):
+        llm = _fake_llm()
+        llm.max_retries = 1
+        with patch.object(ingest_mod, "_build_repair_llm", return_value=llm):
+            ingest_mod._repair_rows_with_llm(_rows(), "a.pdf")
+        timeout = llm.invoke.call_args.kwargs["timeout"]
+        self.assertGreater(timeout, 0)
+        self.assertLessEqual(timeout, 2.5)
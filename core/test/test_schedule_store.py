@@ -0,0 +1,124 @@
+import os
+import tempfile
+from unittest.mock import MagicMock, patch
+
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from core.ai_engine import ingest as ingest_mod
+from core.ai_engine import schedule_store
+from core.ai_engine.retrieval import main as ret_main
+from core.ai_engine.retrieval.schedule_answer import parse_lookup
+from core.models import AcademicDocument, ScheduleRow
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp())
+@patch.dict(os.environ, {"RAG_EXTRACTION_CACHE": "0"})
+@patch("core.ai_engine.ingest.sparse_index.add_document_chunks", return_value=0)
+class ScheduleRowStoreTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="alice", password="pass123")
+        self.other = User.objects.create_user(username="bob", password="pass123")
+        self.doc = AcademicDocument.objects.create(user=self.user, file=SimpleUploadedFile("jadwal.pdf", b"x"))
+        self.rows = [
+            {"hari": "SENIN", "jam": "07:00-08:40", "kode": "IF301", "mata_kuliah": "Basis Data", "semester": "3"},
+            {"hari": "Selasa", "jam": "09:00-10:40", "kode": "IF302", "mata_kuliah": "Jaringan", "semester": "3"},
+            {"hari": "Senin", "jam": "13:00-14:40", "kode": "IF501", "mata_kuliah": "Kecerdasan Buatan", "semester": "5"},
+        ]
+
+    def _ingest(self, rows):
+        vs = MagicMock()
+        vs._collection.get.return_value = {"ids": [], "metadatas": []}
+        parsed = {"text_content": "Jadwal kuliah semester ganjil.", "schedule_rows": rows}
+        with patch.object(ingest_mod, "_parse_document_file", return_value=parsed), patch(
+            "core.ai_engine.ingest.get_vectorstore", return_value=vs
+        ):
+            self.assertTrue(ingest_mod.process_document(self.doc))
+        return [call.kwargs["metadatas"] for call in vs.add_texts.call_args_list]
+
+    def test_ingest_fills_table_and_chunks_only_reference_it(self, _):
+        batches = self._ingest(self.rows)
+        metas = [m for batch in batches for m in batch]
+        self.assertTrue(metas)
+        self.assertTrue(all(m["schedule_rows_ref"] == str(self.doc.id) for m in metas))
+
+        rows = schedule_store.query_rows(self.user.id, hari="senin", semester=3)
+        self.assertEqual([r.kode for r in rows], ["IF301"])
+        self.assertEqual(rows[0].hari, "Senin")
+        self.assertEqual(schedule_store.query_rows(self.other.id, hari="Senin"), [])
+
+        self._ingest(self.rows[:1])
+        self.assertEqual(ScheduleRow.objects.filter(document=self.doc).count(), 1)
+
+    @patch("core.ai_engine.retrieval.main.retrieve_dense")
+    @patch("core.ai_engine.retrieval.main.get_vectorstore")
+    def test_day_lookup_skips_vector_search(self, vs_mock, dense_mock, _):
+        self._ingest(self.rows)
+        docs = ret_main._retrieve_docs(self.user.id, "jadwal hari senin semester 5")
+        vs_mock.assert_not_called()
+        dense_mock.assert_not_called()
+        self.assertEqual(len(docs), 1)
+        self.assertIn("Kecerdasan Buatan", docs[0].page_content)
+        self.assertEqual(docs[0].metadata["source"], self.doc.title)
+
+
+class ScheduleLookupParseTests(SimpleTestCase):
+    def test_parses_day_semester_class_code_and_lecturer(self):
+        self.assertEqual(
+            schedule_store.lookup_filters("jadwal hari Jum'at semester 3 kelas b"),
+            {"hari": "Jumat", "semester": 3, "kelas": "B"},
+        )
+        self.assertEqual(schedule_store.lookup_filters("jam berapa kelas IF 301?")["kode"], "IF301")
+        self.assertNotIn("kode", schedule_store.lookup_filters("jadwal senin jam 0700"))
+        self.assertEqual(schedule_store.lookup_filters("jadwal pak Budi Santoso hari rabu")["dosen"], "Budi Santoso")
+
+    def test_reasoning_questions_skip_fast_path(self):
+        self.assertIsNone(parse_lookup("kenapa jadwal senin bentrok?"))
+        self.assertIsNone(parse_lookup("apa itu machine learning"))
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp())
+@patch("core.ai_engine.retrieval.main.get_runtime_openrouter_config")
+class ScheduleFastPathTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="alice", password="pass123")
+        self.doc = AcademicDocument.objects.create(user=self.user, file=SimpleUploadedFile("jadwal.pdf", b"x"))
+        schedule_store.replace_rows(
+            self.doc,
+            [
+                {"hari": "Senin", "jam": "13:00-14:40", "kode": "IF 501", "mata_kuliah": "Kecerdasan Buatan", "semester": "5"},
+                {"hari": "Senin", "jam": "07:00-08:40", "kode": "IF 503", "mata_kuliah": "Data Mining", "semester": "5"},
+                {"hari": "Rabu", "jam": "07:00-08:40", "kode": "IF 301", "mata_kuliah": "Basis Data", "semester": "3"},
+            ],
+        )
+
+    @patch("core.ai_engine.retrieval.main.get_vectorstore")
+    @patch("core.ai_engine.retrieval.main.build_llm")
+    def test_lookup_answers_table_without_llm_or_vectors(self, llm_mock, vs_mock, cfg_mock):
+        cfg_mock.return_value = {"api_key": "key", "model": "m", "backup_models": ["m"]}
+        out = ret_main.ask_bot(user_id=self.user.id, query="jadwal hari senin semester 5")
+        llm_mock.assert_not_called()
+        vs_mock.assert_not_called()
+        answer = out["answer"]
+        self.assertIn("| Hari | Jam | Kode | Mata Kuliah |", answer)
+        self.assertLess(answer.index("Data Mining"), answer.index("Kecerdasan Buatan"))
+        self.assertNotIn("Basis Data", answer)
+        self.assertIn(f"[source: {self.doc.title}]", answer)
+        self.assertEqual(out["sources"][0]["source"], self.doc.title)
+
+    @patch.dict(os.environ, {"RAG_SCHEDULE_FAST_PATH_MAX_ROWS": "1"})
+    @patch("core.ai_engine.retrieval.main.build_llm")
+    def test_truncated_lookup_keeps_earliest_rows(self, llm_mock, cfg_mock):
+        cfg_mock.return_value = {"api_key": "key", "model": "m", "backup_models": ["m"]}
+        answer = ret_main.ask_bot(user_id=self.user.id, query="jadwal hari senin semester 5")["answer"]
+        self.assertIn("Data Mining", answer)
+        self.assertNotIn("Kecerdasan Buatan", answer)
+
+    @patch("core.ai_engine.retrieval.main.build_llm")
+    def test_stream_uses_fast_path_for_course_code(self, llm_mock, cfg_mock):
+        cfg_mock.return_value = {"api_key": "key", "model": "m", "backup_models": ["m"]}
+        events = list(ret_main.ask_bot_stream(user_id=self.user.id, query="jadwal kelas IF301"))
+        llm_mock.assert_not_called()
+        self.assertEqual([e["type"] for e in events], ["sources", "token", "done"])
+        self.assertIn("Basis Data", events[-1]["answer"])
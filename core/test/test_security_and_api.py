@@ -1,17 +1,19 @@
 import json
 import os
 import tempfile
-from unittest.mock import patch
+from unittest.mock import AsyncMock, patch
 
+from asgiref.sync import async_to_sync
 from django.contrib.auth.models import User
 from django.core.files.uploadedfile import SimpleUploadedFile
-from django.test import Client, TestCase, override_settings, RequestFactory
+from django.test import AsyncRequestFactory, Client, RequestFactory, SimpleTestCase, TestCase, override_settings
 
 from core.models import AcademicDocument, ChatSession, ChatHistory, UserQuota, SystemSetting, UserLoginPresence
 from core.ai_engine.ingest import process_document
 from core import views
 from core.ai_engine.retrieval.main import ask_bot
 from core.ai_engine.retrieval.prompt import LLM_FIRST_TEMPLATE
+from core.test.fakes import FakeChromaStore
 from django.core.exceptions import RequestDataTooBig
 
 
@@ -20,9 +22,9 @@ class _FakeVectorStore:
         self.metadatas = []
         self.filters = []
 
-    def add_texts(self, texts, metadatas):
+    def add_texts(self, texts, metadatas, ids=None):
         self.metadatas.extend(metadatas)
-        return []
+        return list(ids or [])
 
     def similarity_search_with_score(self, query, k=4, filter=None):
         self.filters.append(filter)
@@ -166,7 +168,7 @@ class SecurityAndApiTests(TestCase):
         resp = self.client.post("/api/chat/", data="not-json", content_type="application/json")
         self.assertEqual(resp.status_code, 400)
 
-    @patch("core.service.ask_bot", return_value={"answer": "ok", "sources": []})
+    @patch("core.service.aask_bot", new_callable=AsyncMock, return_value={"answer": "ok", "sources": []})
     def test_chat_history_saved_to_session(self, _):
         self._announce("Chat history saved to session")
         self.client.force_login(self.user_a)
@@ -179,6 +181,41 @@ class SecurityAndApiTests(TestCase):
         self.assertEqual(resp.status_code, 200)
         self.assertTrue(ChatHistory.objects.filter(user=self.user_a, session=session).exists())
 
+    @patch.dict(os.environ, {"RAG_ASYNC_CHAT": "0"})
+    @patch("core.service.ask_bot", return_value={"answer": "ok-sync", "sources": []})
+    def test_chat_sync_path_still_saves_history(self, mock_ask):
+        self._announce("Chat RAG_ASYNC_CHAT=0 uses sync chat_and_save")
+        self.client.force_login(self.user_a)
+        resp = self.client.post("/api/chat/", data=json.dumps({"message": "hi"}), content_type="application/json")
+        self.assertEqual(resp.status_code, 200)
+        mock_ask.assert_called_once()
+        self.assertTrue(ChatHistory.objects.filter(user=self.user_a, answer="ok-sync").exists())
+
+    @patch("core.service.ask_bot_stream")
+    def test_chat_stream_sse_saves_history(self, mock_stream):
+        self._announce("Chat stream=1 returns SSE and saves history")
+        mock_stream.return_value = iter(
+            [
+                {"type": "sources", "sources": []},
+                {"type": "token", "delta": "o"},
+                {"type": "token", "delta": "k"},
+                {"type": "done", "answer": "ok", "sources": []},
+            ]
+        )
+        self.client.force_login(self.user_a)
+        session = ChatSession.objects.create(user=self.user_a, title="S1")
+        resp = self.client.post(
+            "/api/chat/?stream=1",
+            data=json.dumps({"message": "hi", "session_id": session.id}),
+            content_type="application/json",
+        )
+        self.assertEqual(resp.status_code, 200)
+        self.assertTrue(resp["Content-Type"].startswith("text/event-stream"))
+        body = b"".join(resp.streaming_content).decode("utf-8")
+        self.assertLess(body.index("event: sources"), body.index("event: token"))
+        self.assertLess(body.index("event: token"), body.index("event: done"))
+        self.assertTrue(ChatHistory.objects.filter(user=self.user_a, session=session, answer="ok").exists())
+
     def test_auto_create_user_quota_on_register(self):
         self._announce("Register auto-creates UserQuota (default 10MB)")
         payload = {
@@ -242,7 +279,7 @@ class SecurityAndApiTests(TestCase):
         self.assertEqual(AcademicDocument.objects.filter(user=self.user_a).count(), 0)
 
     @override_settings(MEDIA_ROOT=tempfile.mkdtemp())
-    @patch("core.service.delete_vectors_for_doc", return_value=1)
+    @patch("core.service.delete_vectors_for_doc_strict", return_value=(True, 0))
     def test_delete_file_removes_storage(self, _):
         self._announce("Delete document removes file from storage")
         self.client.force_login(self.user_a)
@@ -257,18 +294,42 @@ class SecurityAndApiTests(TestCase):
         self.assertFalse(os.path.exists(file_path))
         self.assertFalse(AcademicDocument.objects.filter(id=doc.id).exists())
 
-    @patch("core.service.process_document", return_value=True)
-    @patch("core.service.delete_vectors_for_doc", return_value=1)
-    def test_reingest_deletes_and_reingests(self, mock_del, _):
+    @override_settings(MEDIA_ROOT=tempfile.mkdtemp())
+    @patch.dict(
+        os.environ,
+        {"RAG_SHARED_DOCS": "0", "RAG_EXTRACTION_CACHE": "0", "RAG_INCREMENTAL_REINGEST": "0", "RAG_VECTOR_SHARDING": "off"},
+    )
+    @patch("core.ai_engine.vector_ops.sparse_index.remove_document", return_value=0)
+    @patch("core.ai_engine.ingest.sparse_index.add_document_chunks", return_value=0)
+    def test_reingest_deletes_and_reingests(self, _add_sparse, _remove_sparse):
         self._announce("Reingest deletes old embeddings and re-ingests")
         self.client.force_login(self.user_a)
         doc = AcademicDocument.objects.create(
             user=self.user_a,
-            file=SimpleUploadedFile("a.txt", b"hello"),
+            file=SimpleUploadedFile("a.txt", b"hello reingest"),
         )
-        resp = self.client.post("/api/reingest/", data=json.dumps({"doc_ids": [doc.id]}), content_type="application/json")
+        other = AcademicDocument.objects.create(user=self.user_a, file=SimpleUploadedFile("b.txt", b"lain"))
+        uid = str(self.user_a.id)
+        vs = FakeChromaStore()
+        vs._collection.items = [
+            ("lama-1", "teks lama", {"user_id": uid, "doc_id": str(doc.id), "source": doc.title}),
+            # data lama sebelum ada doc_id: dicocokkan lewat source
+            ("legacy-1", "teks lama", {"user_id": uid, "source": doc.title}),
+            ("lain-1", "teks lain", {"user_id": uid, "doc_id": str(other.id), "source": other.title}),
+        ]
+        with patch("core.ai_engine.bulk_ingest.get_vectorstore", return_value=vs), patch(
+            "core.ai_engine.vector_ops.get_vectorstore", return_value=vs
+        ):
+            resp = self.client.post("/api/reingest/", data=json.dumps({"doc_ids": [doc.id]}), content_type="application/json")
         self.assertEqual(resp.status_code, 200)
-        mock_del.assert_called()
+        self.assertEqual(json.loads(resp.content.decode())["progress"]["ok"], 1)
+
+        ids = {i for i, _, _ in vs._collection.items}
+        self.assertFalse({"lama-1", "legacy-1"} & ids, "vector lama dokumen harus diganti")
+        self.assertIn("lain-1", ids)
+        new_texts = [t for _, t, m in vs._collection.items if m.get("doc_id") == str(doc.id)]
+        self.assertTrue(new_texts)
+        self.assertTrue(all("hello reingest" in t for t in new_texts))
 
     @override_settings(MEDIA_ROOT=tempfile.mkdtemp())
     @patch("core.ai_engine.ingest.get_vectorstore")
@@ -314,7 +375,7 @@ class SecurityAndApiTests(TestCase):
                 break
         self.assertTrue(found, "Middleware log entry not found for /api/documents/")
 
-    @patch("core.service.chat_and_save", side_effect=Exception("boom"))
+    @patch("core.service.achat_and_save", new_callable=AsyncMock, side_effect=Exception("boom"))
     def test_ai_engine_error_handling(self, _):
         self._announce("AI error handling returns 500 with safe message")
         self.client.force_login(self.user_a)
@@ -550,6 +611,15 @@ class SecurityAndApiTests(TestCase):
         self.assertIn("active_online_non_staff_count", body["summary"])
         self.assertGreaterEqual(body["summary"]["active_online_non_staff_count"], 1)
 
+    def test_admin_dashboard_renders_llm_health_panel(self):
+        self._announce("Admin dashboard renders LLM model health panel")
+        staff = User.objects.create_superuser(username="staff_health", password="pass123", email="")
+        self.client.force_login(staff)
+        resp = self.client.get("/admin/")
+        self.assertEqual(resp.status_code, 200)
+        self.assertContains(resp, "LLM Model Health")
+        self.assertIn("kpi_llm_health", resp.context)
+
     def test_maintenance_login_blocked(self):
         self._announce("Maintenance blocks login page and post")
         SystemSetting.objects.update_or_create(
@@ -664,3 +734,20 @@ class SecurityAndApiTests(TestCase):
         body = json.loads(resp.content.decode())
         self.assertEqual(body.get("code"), "MAINTENANCE_MODE")
         self.assertIn("maintenance", body)
+
+
+class ChatStreamAsgiTests(SimpleTestCase):
+    @patch("core.views.service.chat_and_save_stream")
+    def test_asgi_stream_is_async_and_not_buffered(self, mock_stream):
+        mock_stream.return_value = iter([{"type": "token", "delta": "o"}, {"type": "done", "answer": "o", "sources": []}])
+        request = AsyncRequestFactory().post("/api/chat/?stream=1")
+        user = User(id=1, username="alice")
+        resp = views._chat_stream_response(request, user=user, query="hi", session_id=None)
+        self.assertTrue(resp.is_async)
+
+        async def _collect():
+            return [chunk async for chunk in resp.streaming_content]
+
+        chunks = async_to_sync(_collect)()
+        self.assertEqual(len(chunks), 2)
+        self.assertTrue(chunks[0].decode().startswith("event: token"))
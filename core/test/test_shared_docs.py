@@ -0,0 +1,149 @@
+import os
+import tempfile
+from unittest.mock import patch
+
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from langchain_core.documents import Document
+
+from core import service
+from core.ai_engine import ingest as ingest_mod
+from core.ai_engine import shared_docs
+from core.ai_engine.ingest import process_document
+from core.ai_engine.retrieval import main as ret_main
+from core.ai_engine.sparse_index import _match_where
+from core.models import AcademicDocument
+from core.test.fakes import FakeChromaStore
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp())
+@patch.dict(os.environ, {"RAG_SHARED_DOCS": "1"})
+@patch("core.ai_engine.ingest.sparse_index.add_document_chunks", return_value=0)
+class SharedDocumentTests(TestCase):
+    def setUp(self):
+        self.vs = FakeChromaStore()
+        self.user_a = User.objects.create_user(username="alice", password="pass123")
+        self.user_b = User.objects.create_user(username="bob", password="pass123")
+        self.user_c = User.objects.create_user(username="carol", password="pass123")
+
+    def _ingest(self, user, content=b"hari,jam\nSenin,07:00-07:50\n"):
+        doc = AcademicDocument.objects.create(user=user, file=SimpleUploadedFile("jadwal.csv", content))
+        with patch("core.ai_engine.ingest.get_vectorstore", return_value=self.vs):
+            self.assertTrue(process_document(doc))
+        doc.refresh_from_db()
+        return doc
+
+    def test_identical_uploads_embed_once_and_stay_isolated(self, _):
+        doc_a = self._ingest(self.user_a)
+        doc_b = self._ingest(self.user_b)
+
+        self.assertEqual(self.vs.add_calls, 1)
+        self.assertEqual(doc_a.content_hash, doc_b.content_hash)
+        metas = [m for _, _, m in self.vs._collection.items]
+        self.assertTrue(all(m["user_id"] == shared_docs.SHARED_OWNER for m in metas))
+
+        chunk_meta = metas[0]
+        self.assertTrue(_match_where(chunk_meta, shared_docs.user_visibility_filter(self.user_b.id)))
+        self.assertFalse(_match_where(chunk_meta, shared_docs.user_visibility_filter(self.user_c.id)))
+        self.assertEqual(ret_main._build_chroma_filter(self.user_c.id, "tes"), {"user_id": str(self.user_c.id)})
+
+    def test_shared_chunks_labelled_with_requesting_users_document(self, _):
+        doc_a = self._ingest(self.user_a)
+        AcademicDocument.objects.filter(id=doc_a.id).update(title="Jadwal Semester 3.csv")
+        doc_b = self._ingest(self.user_b)
+        AcademicDocument.objects.filter(id=doc_b.id).update(title="jadwal-ku.csv")
+
+        meta = self.vs._collection.items[0][2]
+        self.assertNotIn("source", meta)
+        self.assertNotIn("semester", meta)
+
+        for user, source, semester in ((self.user_a, "Jadwal Semester 3.csv", 3), (self.user_b, "jadwal-ku.csv", None)):
+            doc = Document(page_content="x", metadata=dict(meta))
+            shared_docs.label_shared_docs(user.id, [doc])
+            self.assertEqual(doc.metadata["source"], source)
+            self.assertEqual(doc.metadata.get("semester"), semester)
+
+        where_a = ret_main._build_chroma_filter(self.user_a.id, "jadwal semester 3")
+        where_b = ret_main._build_chroma_filter(self.user_b.id, "jadwal semester 3")
+        self.assertTrue(_match_where(meta, where_a))
+        self.assertFalse(_match_where(meta, where_b))
+
+    @patch("core.service.delete_vectors_for_doc_strict", return_value=(True, 0))
+    def test_shared_chunks_released_with_last_reference(self, _del, _):
+        doc_a = self._ingest(self.user_a)
+        doc_b = self._ingest(self.user_b)
+
+        with patch("core.service.get_vectorstore", return_value=self.vs):
+            service.delete_document_for_user(self.user_a, doc_a.id)
+            self.assertTrue(self.vs._collection.items)
+            service.delete_document_for_user(self.user_b, doc_b.id)
+        self.assertEqual(self.vs._collection.items, [])
+
+    @patch.dict(os.environ, {"RAG_SHARED_DOCS": "0"})
+    def test_disabled_mode_keeps_per_user_chunks(self, _):
+        self._ingest(self.user_a)
+        self._ingest(self.user_b)
+        self.assertEqual(self.vs.add_calls, 2)
+        owners = {m["user_id"] for _, _, m in self.vs._collection.items}
+        self.assertEqual(owners, {str(self.user_a.id), str(self.user_b.id)})
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp())
+@patch.dict(os.environ, {"RAG_SHARED_DOCS": "0"})
+@patch("core.ai_engine.ingest.sparse_index.add_document_chunks", return_value=0)
+class IncrementalUpsertTests(TestCase):
+    def setUp(self):
+        self.vs = FakeChromaStore()
+        self.user = User.objects.create_user(username="alice", password="pass123")
+        self.doc = AcademicDocument.objects.create(user=self.user, file=SimpleUploadedFile("catatan.txt", b"x"))
+
+    def _ingest_text(self, text):
+        with open(self.doc.file.path, "w", encoding="utf-8") as f:
+            f.write(text)
+        with patch("core.ai_engine.ingest.get_vectorstore", return_value=self.vs):
+            self.assertTrue(process_document(self.doc))
+        return {i: t for i, t, _ in self.vs._collection.items}
+
+    def test_reingest_only_embeds_changed_chunks(self, _):
+        first = self._ingest_text("Paragraf satu tentang jadwal.\n\nParagraf dua tentang kelas.")
+        self.assertTrue(first)
+        self.vs.added_texts.clear()
+
+        again = self._ingest_text("Paragraf satu tentang jadwal.\n\nParagraf dua tentang kelas.")
+        self.assertEqual(again, first)
+        self.assertEqual(self.vs.added_texts, [])
+
+        changed = self._ingest_text("Paragraf baru sama sekali.")
+        self.assertTrue(all(i.startswith(f"{self.doc.id}:text:") for i in changed))
+        self.assertFalse(set(changed) & set(first), "chunk lama yang hilang harus dihapus")
+        self.assertEqual(self.vs.added_texts, list(changed.values()))
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp())
+@patch.dict(os.environ, {"RAG_SHARED_DOCS": "0", "RAG_EXTRACTION_CACHE": "0", "RAG_EMBED_BATCH_SIZE": "2"})
+@patch("core.ai_engine.ingest.sparse_index.add_document_chunks", return_value=0)
+class EmbeddingWriterTests(TestCase):
+    def setUp(self):
+        self.vs = FakeChromaStore()
+        self.user = User.objects.create_user(username="alice", password="pass123")
+        self.doc = AcademicDocument.objects.create(user=self.user, file=SimpleUploadedFile("jadwal.txt", b"x"))
+        self.rows = [{"hari": "Senin", "jam": f"0{i}:00-0{i}:50", "mata_kuliah": f"MK {i}"} for i in range(1, 6)]
+
+    def test_rows_stored_once_and_chunks_written_in_batches(self, _):
+        parsed = {
+            "text_content": "\n\n".join(f"Paragraf {i} tentang jadwal kuliah." * 40 for i in range(6)),
+            "schedule_rows": self.rows,
+        }
+        with patch.object(ingest_mod, "_parse_document_file", return_value=parsed), patch(
+            "core.ai_engine.ingest.get_vectorstore", return_value=self.vs
+        ):
+            self.assertTrue(process_document(self.doc))
+
+        items = self.vs._collection.items
+        self.assertGreater(len(items), 2)
+        self.assertEqual(self.vs.add_calls, (len(items) + 1) // 2)
+        metas = [m for _, _, m in items]
+        self.assertFalse(any("schedule_rows" in m for m in metas))
+        self.assertEqual({m["schedule_rows_ref"] for m in metas}, {str(self.doc.id)})
+        self.assertEqual(ingest_mod.load_schedule_rows(metas[0]["schedule_rows_ref"]), self.rows)
@@ -0,0 +1,70 @@
+import tempfile
+from unittest.mock import patch
+
+from django.test import SimpleTestCase
+
+from core.ai_engine import sparse_index
+from core.ai_engine.retrieval.hybrid import retrieve_sparse_bm25
+
+
+def _meta(doc_id: str, user_id: str = "7", **extra):
+    meta = {"user_id": user_id, "doc_id": doc_id, "source": f"doc-{doc_id}.pdf", "schedule_rows": "[...]"}
+    meta.update(extra)
+    return meta
+
+
+class SparseIndexUnitTests(SimpleTestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self._patch = patch.object(sparse_index, "BM25_INDEX_DIR", self._tmp.name)
+        self._patch.start()
+        sparse_index._CACHE.clear()
+
+    def tearDown(self):
+        self._patch.stop()
+        sparse_index._CACHE.clear()
+        self._tmp.cleanup()
+
+    def test_search_covers_whole_user_corpus(self):
+        sparse_index.add_document_chunks(
+            7,
+            "1",
+            ["hari senin jam 07:00 ruang A101", "hari selasa jam 13:00 ruang B202"],
+            [_meta("1"), _meta("1")],
+        )
+        sparse_index.add_document_chunks(7, "2", ["transkrip nilai ipk"], [_meta("2", doc_type="transcript")])
+
+        hits = sparse_index.search(7, "senin ruang", k=5)
+        self.assertGreaterEqual(len(hits), 1)
+        self.assertIn("senin", hits[0][0].page_content)
+        self.assertNotIn("schedule_rows", hits[0][0].metadata)
+
+        filtered = sparse_index.search(7, "ipk", k=5, filter_where={"$and": [{"user_id": "7"}, {"doc_type": "transcript"}]})
+        self.assertEqual(len(filtered), 1)
+        self.assertEqual(filtered[0][0].metadata.get("doc_id"), "2")
+
+    def test_reingest_replaces_and_delete_removes(self):
+        sparse_index.add_document_chunks(7, "1", ["jadwal lama"], [_meta("1")])
+        sparse_index.add_document_chunks(7, "1", ["jadwal baru"], [_meta("1")])
+        self.assertEqual(sparse_index.search(7, "lama", k=5), [])
+        self.assertEqual(len(sparse_index.search(7, "baru", k=5)), 1)
+
+        self.assertEqual(sparse_index.remove_document(7, doc_id="1"), 1)
+        self.assertFalse(sparse_index.has_index(7))
+
+    def test_users_are_isolated_and_purge(self):
+        sparse_index.add_document_chunks(1, "10", ["jadwal senin"], [_meta("10", user_id="1")])
+        sparse_index.add_document_chunks(2, "20", ["jadwal senin"], [_meta("20", user_id="2")])
+
+        hits = sparse_index.search(1, "senin", k=5)
+        self.assertEqual([d.metadata.get("user_id") for d, _ in hits], ["1"])
+
+        sparse_index.purge_user(1)
+        self.assertEqual(sparse_index.search(1, "senin", k=5), [])
+        self.assertEqual(len(sparse_index.search(2, "senin", k=5)), 1)
+
+    def test_retrieve_sparse_prefers_index_over_pool(self):
+        sparse_index.add_document_chunks(7, "1", ["kelas basis data kamis"], [_meta("1")])
+        hits = retrieve_sparse_bm25("kamis", docs_pool=[], k=3, user_id=7, filter_where={"user_id": "7"})
+        self.assertEqual(len(hits), 1)
+        self.assertIn("kamis", hits[0][0].page_content)
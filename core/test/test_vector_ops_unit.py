@@ -0,0 +1,42 @@
+import os
+from unittest.mock import patch
+
+from django.test import SimpleTestCase
+
+from core.ai_engine import vector_ops
+
+
+@patch.dict(os.environ, {"RAG_DELETE_BATCH_SIZE": "2", "RAG_VECTOR_SHARDING": "off"})
+@patch("core.ai_engine.vector_ops.bump_corpus_version")
+@patch("core.ai_engine.vector_ops.sparse_index")
+@patch("core.ai_engine.vector_ops.get_vectorstore")
+class StrictDeleteUnitTests(SimpleTestCase):
+    def test_single_pass_reads_ids_only_and_deletes_in_batches(self, vs_mock, sparse_mock, bump_mock):
+        col = vs_mock.return_value._collection
+        col.get.side_effect = [{"ids": ["a", "b", "c"]}, {"ids": []}]
+
+        ok, remaining = vector_ops.delete_vectors_for_doc_strict(user_id="1", doc_id="9", source="jadwal.pdf")
+
+        self.assertEqual((ok, remaining), (True, 0))
+        where = {"$and": [{"user_id": "1"}, {"doc_id": "9"}]}
+        self.assertEqual([c.kwargs for c in col.get.call_args_list], [{"where": where, "include": []}] * 2)
+        self.assertEqual([c.kwargs["ids"] for c in col.delete.call_args_list], [["a", "b"], ["c"]])
+        sparse_mock.remove_document.assert_called_once()
+        bump_mock.assert_called_once_with("1")
+
+    @patch("core.ai_engine.vector_ops.time.sleep")
+    def test_retries_only_leftover_ids(self, sleep_mock, vs_mock, sparse_mock, _bump):
+        col = vs_mock.return_value._collection
+        col.get.side_effect = [{"ids": ["a", "b"]}, {"ids": ["b"]}, {"ids": []}]
+
+        self.assertEqual(vector_ops.delete_vectors_for_doc_strict(user_id="1", doc_id="9"), (True, 0))
+        self.assertEqual([c.kwargs["ids"] for c in col.delete.call_args_list], [["a", "b"], ["b"]])
+        sleep_mock.assert_called_once()
+
+    def test_failure_reports_remaining(self, vs_mock, sparse_mock, _bump):
+        col = vs_mock.return_value._collection
+        col.get.return_value = {"ids": ["a"]}
+
+        with patch("core.ai_engine.vector_ops.time.sleep"):
+            self.assertEqual(vector_ops.delete_vectors_for_doc_strict(user_id="1", doc_id="9", retries=2), (False, 1))
+        sparse_mock.remove_document.assert_not_called()
@@ -16,6 +16,8 @@ urlpatterns = [
     path('api/documents/', views.documents_api, name='documents_api'),
     path('api/documents/<int:doc_id>/', views.document_detail_api, name='document_detail_api'),
     path('api/reingest/', views.reingest_api, name='reingest_api'),
+    path('api/ingest/jobs/', views.ingest_jobs_api, name='ingest_jobs_api'),
+    path('api/ingest/jobs/<int:job_id>/', views.ingest_job_detail_api, name='ingest_job_detail_api'),
     path('api/sessions/', views.sessions_api, name='sessions_api'),
     path('api/sessions/<int:session_id>/', views.session_detail_api, name='session_detail_api'),
     path('api/sessions/<int:session_id>/timeline/', views.session_timeline_api, name='session_timeline_api'),
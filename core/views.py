@@ -1,11 +1,17 @@
 ﻿# core/views.py
+import asyncio
 import json
 import logging
+import os
+import threading
 import time
 
+from asgiref.sync import sync_to_async
 from django.shortcuts import render, redirect
-from django.http import JsonResponse, HttpResponseServerError
+from django.http import JsonResponse, HttpResponseServerError, StreamingHttpResponse
 from django.core.exceptions import RequestDataTooBig
+from django.core.handlers.asgi import ASGIRequest
+from django.db import connections
 from django.views.decorators.csrf import csrf_exempt
 from django.contrib.auth.decorators import login_required
 from inertia import render as inertia_render
@@ -15,6 +21,7 @@ from django.contrib.auth.models import User
 from django.db import IntegrityError
 
 from . import service  #  business logic dipindah ke core/service.py
+from . import ingest_jobs
 from .models import UserQuota, ChatSession
 from .presence import (
     cleanup_stale_presence,
@@ -60,6 +67,79 @@ def _get_client_ip(request):
     return request.META.get("REMOTE_ADDR")
 
 
+def _wants_stream(request, data: dict) -> bool:
+    raw = request.GET.get("stream")
+    if raw is None:
+        raw = data.get("stream")
+    return str(raw or "").strip().lower() in {"1", "true", "yes", "on"}
+
+
+def _sse_event(event: dict) -> str:
+    name = str(event.get("type") or "message")
+    return f"event: {name}\ndata: {json.dumps(event, ensure_ascii=False)}\n\n"
+
+
+async def _aiter_in_thread(make_iter):
+    """
+    Jalankan generator sync di thread sendiri dan teruskan item satu per satu ke event loop.
+    Di ASGI Django menguras iterator sync dengan sync_to_async(list) (seluruh SSE ter-buffer);
+    dengan async generator tiap token langsung dikirim ke klien.
+    """
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue = asyncio.Queue()
+    done = object()
+
+    def _put(item) -> None:
+        try:
+            loop.call_soon_threadsafe(queue.put_nowait, item)
+        except RuntimeError:
+            # event loop sudah selesai (klien putus)
+            pass
+
+    def _pump() -> None:
+        try:
+            for item in make_iter():
+                _put(item)
+        finally:
+            connections.close_all()
+            _put(done)
+
+    threading.Thread(target=_pump, name="chat-stream", daemon=True).start()
+    while True:
+        item = await queue.get()
+        if item is done:
+            break
+        yield item
+
+
+def _chat_stream_response(request, user, query: str, session_id):
+    ip = _get_client_ip(request)
+
+    def _events():
+        try:
+            for event in service.chat_and_save_stream(
+                user=user, message=query, request_id=_rid(request), session_id=session_id
+            ):
+                if event.get("type") == "done":
+                    logger.info(
+                        f" [CHAT STREAM DONE] user={user.username}(id={user.id}) ip={ip} "
+                        f"len={len(event.get('answer') or '')} sources={len(event.get('sources') or [])}",
+                        extra=_log_extra(request),
+                    )
+                yield _sse_event(event)
+        except Exception as e:
+            logger.error(f" [CHAT STREAM CRASH] user={user.username}(id={user.id}) ip={ip} err={repr(e)}",
+                         extra=_log_extra(request), exc_info=True)
+            yield _sse_event({"type": "error", "error": "Terjadi kesalahan pada server AI."})
+
+    # ASGI: async iterator agar token tidak ter-buffer; WSGI: generator sync biasa
+    stream = _aiter_in_thread(_events) if isinstance(request, ASGIRequest) else _events()
+    response = StreamingHttpResponse(stream, content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"
+    return response
+
+
 def _planner_session_state(state: dict) -> dict:
     s = state or {}
     return {
@@ -571,7 +651,10 @@ def upload_api(request):
     logger.info(f" [BATCH START] user={user.username}(id={user.id}) ip={ip} files={len(files)}", extra=_log_extra(request))
     try:
         quota_bytes = service.get_user_quota_bytes(user=user, default_quota_bytes=QUOTA_BYTES)
-        payload = service.upload_files_batch(user=user, files=files, quota_bytes=quota_bytes)
+        if ingest_jobs.ingest_queue_enabled():
+            payload = service.enqueue_upload_batch(user=user, files=files, quota_bytes=quota_bytes)
+        else:
+            payload = service.upload_files_batch(user=user, files=files, quota_bytes=quota_bytes)
         logger.info(f" [BATCH END] user={user.username}(id={user.id}) ip={ip} status={payload.get('status')}", extra=_log_extra(request))
         total_size = sum([getattr(f, "size", 0) or 0 for f in files])
         names = [getattr(f, "name", "-") for f in files]
@@ -596,10 +679,48 @@ def upload_api(request):
         return JsonResponse({"status": "error", "msg": "Terjadi kesalahan server."}, status=500)
 
 
+def _async_chat_enabled() -> bool:
+    raw = str(os.environ.get("RAG_ASYNC_CHAT", "1")).strip().lower()
+    return raw in {"1", "true", "yes", "on"}
+
+
+def _chat_planner_payload(request, user, query, option_id, session_id) -> dict:
+    # akses request.session & DB (sync); dari view async dipanggil via sync_to_async
+    planner_session = service.get_or_create_chat_session(user=user, session_id=session_id)
+    state_map = dict(request.session.get("planner_state_by_session") or {})
+    planner_state = state_map.get(str(planner_session.id))
+    if not planner_state:
+        planner_state = request.session.get("planner_state")
+
+    if not planner_state:
+        payload, new_state = service.planner_start(user=user, session=planner_session)
+    else:
+        payload, new_state = service.planner_continue(
+            user=user,
+            session=planner_session,
+            planner_state=planner_state,
+            message=query or "",
+            option_id=option_id,
+            request_id=_rid(request),
+        )
+    payload = _normalize_planner_payload(payload, new_state)
+    payload.setdefault("session_id", planner_session.id)
+    state_map[str(planner_session.id)] = new_state
+    request.session["planner_state_by_session"] = state_map
+    request.session["planner_state"] = new_state
+    request.session.modified = True
+    return payload
+
+
 @csrf_exempt
 @login_required
-def chat_api(request):
-    user = request.user
+async def chat_api(request):
+    """
+    View async: di bawah server ASGI (uvicorn) satu proses bisa menahan banyak chat
+    in-flight karena menunggu OpenRouter tidak memblok thread worker.
+    Set RAG_ASYNC_CHAT=0 untuk memakai jalur sync (chat_and_save) via thread.
+    """
+    user = await request.auser()
     ip = _get_client_ip(request)
 
     if request.method != "POST":
@@ -637,31 +758,18 @@ def chat_api(request):
         )
 
         if mode == "planner":
-            planner_session = service.get_or_create_chat_session(user=user, session_id=session_id)
-            state_map = dict(request.session.get("planner_state_by_session") or {})
-            planner_state = state_map.get(str(planner_session.id))
-            if not planner_state:
-                planner_state = request.session.get("planner_state")
-
-            if not planner_state:
-                payload, new_state = service.planner_start(user=user, session=planner_session)
+            payload = await sync_to_async(_chat_planner_payload)(request, user, query, option_id, session_id)
+        elif _wants_stream(request, data):
+            return _chat_stream_response(request, user=user, query=query, session_id=session_id)
+        else:
+            if _async_chat_enabled():
+                payload = await service.achat_and_save(
+                    user=user, message=query, request_id=_rid(request), session_id=session_id
+                )
             else:
-                payload, new_state = service.planner_continue(
-                    user=user,
-                    session=planner_session,
-                    planner_state=planner_state,
-                    message=query or "",
-                    option_id=option_id,
-                    request_id=_rid(request),
+                payload = await sync_to_async(service.chat_and_save)(
+                    user=user, message=query, request_id=_rid(request), session_id=session_id
                 )
-            payload = _normalize_planner_payload(payload, new_state)
-            payload.setdefault("session_id", planner_session.id)
-            state_map[str(planner_session.id)] = new_state
-            request.session["planner_state_by_session"] = state_map
-            request.session["planner_state"] = new_state
-            request.session.modified = True
-        else:
-            payload = service.chat_and_save(user=user, message=query, request_id=_rid(request), session_id=session_id)
             if isinstance(payload, dict):
                 payload.setdefault("type", "chat")
 
@@ -703,7 +811,10 @@ def reingest_api(request):
 
         logger.info(f" [REINGEST START] user={user.username}(id={user.id}) ip={ip} doc_ids={doc_ids}", extra=_log_extra(request))
 
-        payload = service.reingest_documents_for_user(user=user, doc_ids=doc_ids)
+        if ingest_jobs.ingest_queue_enabled():
+            payload = service.enqueue_reingest_for_user(user=user, doc_ids=doc_ids)
+        else:
+            payload = service.reingest_documents_for_user(user=user, doc_ids=doc_ids)
 
         logger.info(f" [REINGEST END] user={user.username}(id={user.id}) ip={ip} status={payload.get('status')}", extra=_log_extra(request))
         audit_logger.info(
@@ -725,6 +836,98 @@ def reingest_api(request):
         return JsonResponse({"status": "error", "msg": "Terjadi kesalahan server."}, status=500)
 
 
+# =========================
+# INGEST JOBS API
+# =========================
+def _parse_job_ids(raw: str | None) -> list[int]:
+    return [int(x) for x in str(raw or "").split(",") if x.strip().isdigit()][:100]
+
+
+def _ingest_jobs_stream_response(request, user, job_ids: list[int]):
+    poll_s = 1.0
+    max_s = 600.0
+
+    def _step(state: dict, jobs: list[dict]) -> tuple[list[str], bool]:
+        out = []
+        if jobs != state.get("last"):
+            out.append(_sse_event({"type": "jobs", "jobs": jobs}))
+            state["last"] = jobs
+        finished = all(j["status"] in {"done", "failed"} for j in jobs) or (time.monotonic() - state["t0"]) > max_s
+        if finished:
+            out.append(_sse_event({"type": "done", "jobs": jobs}))
+        return out, finished
+
+    async def _aevents():
+        # ASGI: polling pakai asyncio.sleep, tidak menahan thread worker selama stream terbuka
+        state = {"t0": time.monotonic()}
+        list_jobs = sync_to_async(ingest_jobs.list_jobs_for_user)
+        while True:
+            out, finished = _step(state, await list_jobs(user=user, job_ids=job_ids))
+            for chunk in out:
+                yield chunk
+            if finished:
+                return
+            await asyncio.sleep(poll_s)
+
+    def _events():
+        state = {"t0": time.monotonic()}
+        while True:
+            out, finished = _step(state, ingest_jobs.list_jobs_for_user(user=user, job_ids=job_ids))
+            yield from out
+            if finished:
+                return
+            time.sleep(poll_s)
+
+    # ASGI: async generator; WSGI: generator sync biasa (sama seperti chat stream)
+    stream = _aevents() if isinstance(request, ASGIRequest) else _events()
+    response = StreamingHttpResponse(stream, content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"
+    return response
+
+
+@csrf_exempt
+@login_required
+def ingest_jobs_api(request):
+    """
+    GET /api/ingest/jobs/?ids=1,2,3 -> status + progress job ingest milik user.
+    Tambahkan ?stream=1 untuk SSE (update dikirim sampai semua job selesai).
+    """
+    user = request.user
+    ip = _get_client_ip(request)
+
+    if request.method != "GET":
+        logger.warning(f" [INGEST JOBS] Method not allowed method={request.method} ip={ip}", extra=_log_extra(request))
+        return JsonResponse({"status": "error", "msg": "Method not allowed"}, status=405)
+
+    job_ids = _parse_job_ids(request.GET.get("ids"))
+    try:
+        if job_ids and _wants_stream(request, {}):
+            return _ingest_jobs_stream_response(request, user=user, job_ids=job_ids)
+        jobs = ingest_jobs.list_jobs_for_user(user=user, job_ids=job_ids or None)
+        return JsonResponse({"status": "success", "jobs": jobs})
+    except Exception as e:
+        logger.error(f" [INGEST JOBS ERROR] user={user.username}(id={user.id}) ip={ip} err={repr(e)}",
+                     extra=_log_extra(request), exc_info=True)
+        return JsonResponse({"status": "error", "msg": "Terjadi kesalahan server."}, status=500)
+
+
+@csrf_exempt
+@login_required
+def ingest_job_detail_api(request, job_id: int):
+    user = request.user
+    ip = _get_client_ip(request)
+
+    if request.method != "GET":
+        logger.warning(f" [INGEST JOB] Method not allowed method={request.method} ip={ip}", extra=_log_extra(request))
+        return JsonResponse({"status": "error", "msg": "Method not allowed"}, status=405)
+
+    jobs = ingest_jobs.list_jobs_for_user(user=user, job_ids=[job_id], limit=1)
+    if not jobs:
+        return JsonResponse({"status": "error", "msg": "Job tidak ditemukan."}, status=404)
+    return JsonResponse({"status": "success", "job": jobs[0]})
+
+
 # =========================
 # CHAT SESSIONS API
 # =========================